@@ -18,12 +18,63 @@ class Config:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 24 * 60))
 
+    # Password hashing pool
+    PASSWORD_WORKERS: int = int(os.getenv("PASSWORD_WORKERS", "4"))
+    PASSWORD_MAX_QUEUE: int = int(os.getenv("PASSWORD_MAX_QUEUE", "100"))
+
+    # Validated token cache
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL: float = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
     # Server Configuration
     HOST_URL: str = os.getenv("HOST_URL", "127.0.0.1")
     HOST_PORT: int = int(os.getenv("HOST_PORT", "3000"))
 
     # Database Configuration (for future use)
     DATABASE_URL: str = os.getenv("DATABASE_URL", None)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+    # WebSocket Configuration
+    # Seconds without a message before an outfits socket is closed, 0 disables the timeout
+    WS_IDLE_TIMEOUT: float = float(os.getenv("WS_IDLE_TIMEOUT", "0"))
+    # "memory" fans outfit changes out within one process, "postgres" across workers via LISTEN/NOTIFY
+    OUTFIT_HUB_BACKEND: str = os.getenv("OUTFIT_HUB_BACKEND", "memory")
+
+    # Days a deleted outfit's tombstone is kept, clients that last synced before that reload every outfit
+    OUTFIT_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("OUTFIT_TOMBSTONE_RETENTION_DAYS", "30"))
+
+    # Catalog import Configuration
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", os.cpu_count() or 1))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+
+    # Catalog snapshot
+    # Seconds between reloads that pick up catalog changes made by other workers, 0 disables them
+    CATALOG_REFRESH_INTERVAL: float = float(os.getenv("CATALOG_REFRESH_INTERVAL", "300"))
+
+    # Wardrobe page
+    # Items rendered with the page and fetched per scroll step
+    WARDROBE_PAGE_SIZE: int = int(os.getenv("WARDROBE_PAGE_SIZE", "60"))
+    # Stream the rendered page so the header is sent before the item grid is done
+    WARDROBE_STREAM_TEMPLATE: bool = os.getenv("WARDROBE_STREAM_TEMPLATE", "false").lower() in ("1", "true", "yes")
+
+    # Wardrobe bitmaps cached for facet queries
+    FACET_CACHE_SIZE: int = int(os.getenv("FACET_CACHE_SIZE", "1000"))
+    FACET_CACHE_TTL: float = float(os.getenv("FACET_CACHE_TTL", "60"))
+
+    # Clothing image thumbnails
+    THUMBNAIL_DIR: str = os.getenv("THUMBNAIL_DIR", "data/thumbnails")
+    THUMBNAIL_CACHE_BYTES: int = int(os.getenv("THUMBNAIL_CACHE_BYTES", str(512 * 1024 * 1024)))
+    THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", os.cpu_count() or 1))
+    # "http" downloads originals, "file" reads them from THUMBNAIL_SOURCE_DIR by URL path
+    THUMBNAIL_FETCHER: str = os.getenv("THUMBNAIL_FETCHER", "http")
+    THUMBNAIL_SOURCE_DIR: str = os.getenv("THUMBNAIL_SOURCE_DIR", "data/images")
+    THUMBNAIL_FETCH_TIMEOUT: float = float(os.getenv("THUMBNAIL_FETCH_TIMEOUT", "10"))
+    THUMBNAIL_MAX_SOURCE_BYTES: int = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", str(10 * 1024 * 1024)))
+
+    # Admin background jobs
+    ADMIN_JOB_CONCURRENCY: int = int(os.getenv("ADMIN_JOB_CONCURRENCY", "2"))
 
     # CORS Configuration (for future use)
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
@@ -1,88 +1,203 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from app.database.models import User, Clothing
-import random
-
+from sqlalchemy import select, func, text
+from app.database.models import User, Outfit, user_clothing
+from app.crud.wardrobe import next_wardrobe_version, touch_wardrobes
+from app.services.catalog_columns import catalog_columns
+from app.services.facets import catalog_facets
+from typing import Callable, Optional
+
+# Users shown per page of the admin listing
+ADMIN_USERS_PAGE_SIZE = 50
+
+# Ownership rows per INSERT round trip
+ASSIGN_BATCH_SIZE = 10000
+
+# Users whose current ownings are loaded and sampled together
+ASSIGN_USER_CHUNK_SIZE = 5000
+
+
+async def get_users_with_stats(
+        db: AsyncSession,
+        after_id: Optional[int] = None,
+        search: Optional[str] = None,
+        limit: int = ADMIN_USERS_PAGE_SIZE
+):
+    """
+    Get one page of users with their owned clothes and outfit counts for admin display.
+    Uses keyset pagination on users.id and counts only the rows of the page,
+    so the cost does not depend on the total number of users.
+    Returns (rows, next_after_id); rows have id, username, owned_count and outfit_count.
+    """
+    page_stmt = select(User.id, User.username).order_by(User.id).limit(limit + 1)
+    if after_id is not None:
+        page_stmt = page_stmt.where(User.id > after_id)
+    if search:
+        page_stmt = page_stmt.where(User.username.startswith(search, autoescape=True))
+    page = page_stmt.subquery("page")
+
+    # Counted per page row, so each count is a range scan of one user's index entries
+    owned_count = (
+        select(func.count()).select_from(user_clothing)
+        .where(user_clothing.c.user_id == page.c.id)
+        .scalar_subquery()
+    )
+    outfit_count = (
+        select(func.count()).select_from(Outfit.__table__)
+        .where(Outfit.user_id == page.c.id)
+        .scalar_subquery()
+    )
 
-async def get_users_with_stats(db: AsyncSession):
-    """Get all users with their relationships eagerly loaded for admin display"""
-    stmt = select(User).options(
-        selectinload(User.owned_clothes),
-        selectinload(User.outfits)
+    stmt = (
+        select(
+            page.c.id,
+            page.c.username,
+            owned_count.label("owned_count"),
+            outfit_count.label("outfit_count"),
+        )
+        .order_by(page.c.id)
     )
     result = await db.execute(stmt)
-    return result.scalars().all()
+    rows = result.all()
+
+    next_after_id = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1].id
+    return rows, next_after_id
+
+
+# Pairs are sampled from this worker's catalog snapshot, which may still hold items
+# deleted by another worker; joining against the tables drops those instead of
+# failing the whole fill on a foreign key error
+INSERT_OWNERSHIPS_SQL = text(
+    "INSERT INTO user_clothing (user_id, clothing_id, version) "
+    "SELECT pairs.user_id, pairs.clothing_id, :version "
+    "FROM unnest(CAST(:user_ids AS integer[]), CAST(:clothing_ids AS integer[])) AS pairs(user_id, clothing_id) "
+    "JOIN clothing ON clothing.id = pairs.clothing_id "
+    "JOIN users ON users.id = pairs.user_id "
+    "ON CONFLICT DO NOTHING"
+)
+
+
+async def insert_ownerships(db: AsyncSession, version: int, user_ids: list, clothing_ids: list) -> int:
+    """
+    Insert (user_id, clothing_id) pairs in one round trip, ignoring existing pairs
+    and clothes or users that no longer exist. Returns the number of rows inserted.
+    """
+    if not user_ids:
+        return 0
+
+    result = await db.execute(
+        INSERT_OWNERSHIPS_SQL,
+        {"version": version, "user_ids": user_ids, "clothing_ids": clothing_ids}
+    )
+    return result.rowcount
 
 
-async def assign_random_clothes_to_user(db: AsyncSession, user_id: int, item_count: int):
+async def assign_random_clothes_to_user(
+        db: AsyncSession,
+        user_id: int,
+        item_count: int,
+        progress: Optional[Callable] = None
+):
     """Assign random clothes to a specific user"""
-    # Get user with relationships
-    stmt_user = select(User).where(User.id == user_id).options(
-        selectinload(User.owned_clothes)
-    )
-    result_user = await db.execute(stmt_user)
-    user = result_user.scalar_one_or_none()
-
-    if not user:
+    result_user = await db.execute(select(User.id).where(User.id == user_id))
+    if result_user.scalar_one_or_none() is None:
         return None, "User not found"
 
-    # Get all available clothes
-    stmt_clothes = select(Clothing)
-    result_clothes = await db.execute(stmt_clothes)
-    all_clothes = result_clothes.scalars().all()
+    # Sampling runs vectorized over the in-memory columnar catalog
+    catalog = await catalog_columns.get()
 
-    if len(all_clothes) < item_count:
-        return None, f"Not enough clothes in master list. Only {len(all_clothes)} available."
+    if catalog.size < item_count:
+        return None, f"Not enough clothes in master list. Only {catalog.size} available."
 
     # Get currently owned clothing IDs
-    owned_ids = {clothing.id for clothing in user.owned_clothes}
-
-    # Filter available clothes
-    available_clothes = [clothing for clothing in all_clothes if clothing.id not in owned_ids]
+    result_owned = await db.execute(
+        select(user_clothing.c.clothing_id).where(user_clothing.c.user_id == user_id)
+    )
+    owned_ids = result_owned.scalars().all()
 
-    if len(available_clothes) < item_count:
-        return None, f"Not enough available clothes. Only {len(available_clothes)} available that user doesn't already own."
+    available_count = catalog.size - len(catalog.positions(owned_ids))
+    if available_count < item_count:
+        return None, f"Not enough available clothes. Only {available_count} available that user doesn't already own."
 
     # Randomly select and assign
-    selected_clothes = random.sample(available_clothes, item_count)
-    for clothing in selected_clothes:
-        user.owned_clothes.append(clothing)
+    selected_ids = catalog.sample(item_count, owned_ids).tolist()
+    version = await next_wardrobe_version(db)
+    assigned_count = await insert_ownerships(db, version, [user_id] * len(selected_ids), selected_ids)
+    await touch_wardrobes(db, version, [user_id])
 
     await db.commit()
-    return len(selected_clothes), None
-
-
-async def assign_random_clothes_to_all_users(db: AsyncSession, item_count: int):
-    """Assign random clothes to all users"""
-    # Get all users with relationships
-    stmt_users = select(User).options(selectinload(User.owned_clothes))
-    result_users = await db.execute(stmt_users)
-    all_users = result_users.scalars().all()
-
-    # Get all available clothes
-    stmt_clothes = select(Clothing)
-    result_clothes = await db.execute(stmt_clothes)
-    all_clothes = result_clothes.scalars().all()
-
-    if len(all_clothes) < item_count:
-        return 0, f"Not enough clothes in master list. Only {len(all_clothes)} available."
+    if progress:
+        progress(assigned_count, item_count)
+    return assigned_count, None
+
+
+async def assign_random_clothes_to_all_users(
+        db: AsyncSession,
+        item_count: int,
+        progress: Optional[Callable] = None
+):
+    """
+    Assign random clothes to all users.
+    Samples from the in-memory columnar catalog, current ownings are loaded
+    per chunk of users and new rows are inserted in batches. Every batch is
+    committed with its own wardrobe version, so the wardrobe version lock is
+    only held for one batch and the users' wardrobes update as the run goes.
+    """
+    catalog = await catalog_columns.get()
+
+    if catalog.size < item_count:
+        return 0, f"Not enough clothes in master list. Only {catalog.size} available."
+
+    result_users = await db.execute(select(User.id).order_by(User.id))
+    user_ids = list(result_users.scalars().all())
+    # Ends the read transaction, the batches take their own
+    await db.commit()
 
     assigned_count = 0
-    for user in all_users:
-        # Get currently owned clothing IDs
-        owned_ids = {clothing.id for clothing in user.owned_clothes}
-
-        # Filter available clothes
-        available_clothes = [clothing for clothing in all_clothes if clothing.id not in owned_ids]
-
-        # Use available clothes (might be less than requested)
-        actual_count = min(item_count, len(available_clothes))
-        if actual_count > 0:
-            selected_clothes = random.sample(available_clothes, actual_count)
-            for clothing in selected_clothes:
-                user.owned_clothes.append(clothing)
-                assigned_count += 1
-
-    await db.commit()
-    return assigned_count, None
\ No newline at end of file
+    pending_users = []
+    pending_clothes = []
+    batch_user_ids = []
+
+    async def write_batch() -> int:
+        if not batch_user_ids:
+            return 0
+        version = await next_wardrobe_version(db)
+        inserted = await insert_ownerships(db, version, pending_users, pending_clothes)
+        await touch_wardrobes(db, version, batch_user_ids)
+        await db.commit()
+        for user_id in batch_user_ids:
+            catalog_facets.invalidate_user(user_id)
+        return inserted
+
+    for start in range(0, len(user_ids), ASSIGN_USER_CHUNK_SIZE):
+        chunk_ids = user_ids[start:start + ASSIGN_USER_CHUNK_SIZE]
+
+        # Get currently owned clothing IDs for this chunk of users
+        owned_by_user = {user_id: set() for user_id in chunk_ids}
+        result_owned = await db.execute(
+            select(user_clothing.c.user_id, user_clothing.c.clothing_id)
+            .where(user_clothing.c.user_id.in_(chunk_ids))
+        )
+        for user_id, clothing_id in result_owned:
+            owned_by_user[user_id].add(clothing_id)
+
+        for user_id in chunk_ids:
+            # Use available clothes (might be less than requested)
+            selected_ids = catalog.sample(item_count, owned_by_user[user_id]).tolist()
+            pending_users.extend([user_id] * len(selected_ids))
+            pending_clothes.extend(selected_ids)
+            batch_user_ids.append(user_id)
+
+            if len(pending_clothes) >= ASSIGN_BATCH_SIZE:
+                assigned_count += await write_batch()
+                pending_users = []
+                pending_clothes = []
+                batch_user_ids = []
+
+        if progress:
+            progress(start + len(chunk_ids), len(user_ids))
+
+    assigned_count += await write_batch()
+    return assigned_count, None
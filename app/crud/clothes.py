@@ -0,0 +1,277 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database.models import Clothing, CatalogSource, outfit_clothing, user_clothing
+from app.crud.outfits import bump_outfits
+from app.crud.wardrobe import next_wardrobe_version, touch_wardrobes
+from datetime import datetime
+from typing import AsyncIterable, Callable, Dict, List, Optional, Tuple
+import os
+import time
+
+# Rows per INSERT/UPDATE/DELETE round trip during catalog imports
+IMPORT_BATCH_SIZE = 5000
+
+
+class ImportStats:
+    """Counters collected while importing clothes from a catalog dump"""
+
+    def __init__(self):
+        self.imported = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        # Entries left out: IDs already in the catalog (import only), repeats of an
+        # earlier entry's ID, and entries whose ID or fields could not be parsed
+        self.existing = 0
+        self.duplicates = 0
+        self.malformed = 0
+        self.source_unchanged = False
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def processed(self) -> int:
+        return self.imported + self.updated + self.unchanged + self.existing + self.duplicates + self.malformed
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+def file_fingerprint(path) -> str:
+    """Size and modification time of a file, which change whenever it is rewritten"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+async def get_existing_clothing_ids(db: AsyncSession) -> set:
+    """Load every clothing ID in a single query"""
+    result = await db.execute(select(Clothing.id))
+    return set(result.scalars().all())
+
+
+async def get_clothing_hashes(db: AsyncSession) -> dict:
+    """Load {clothing_id: content_hash} for the whole catalog in a single query"""
+    result = await db.execute(select(Clothing.id, Clothing.content_hash))
+    return dict(result.all())
+
+
+async def bulk_insert_clothes(db: AsyncSession, rows: list) -> int:
+    """Insert a batch of clothing rows in one executemany round trip, ignoring ID conflicts"""
+    if not rows:
+        return 0
+
+    stmt = pg_insert(Clothing.__table__).on_conflict_do_nothing(index_elements=['id'])
+    await db.execute(stmt, rows)
+    return len(rows)
+
+
+async def reset_owner_wardrobes(db: AsyncSession, clothing_ids: list):
+    """Make owners of changed or removed items reload their whole wardrobe"""
+    owners = select(user_clothing.c.user_id).where(user_clothing.c.clothing_id.in_(clothing_ids))
+    await touch_wardrobes(db, await next_wardrobe_version(db), owners, reset=True)
+
+
+async def bulk_update_clothes(db: AsyncSession, rows: list) -> int:
+    """Update a batch of clothing rows by primary key in one executemany round trip"""
+    if not rows:
+        return 0
+
+    await reset_owner_wardrobes(db, [row["id"] for row in rows])
+
+    table = Clothing.__table__
+    stmt = update(table).where(table.c.id == bindparam('clothing_id'))
+    params = [
+        {"clothing_id": row["id"], **{key: value for key, value in row.items() if key != "id"}}
+        for row in rows
+    ]
+    await db.execute(stmt, params)
+    return len(rows)
+
+
+async def bulk_delete_clothes(db: AsyncSession, clothing_ids: list) -> int:
+    """Delete clothing rows together with their outfit and ownership associations"""
+    if not clothing_ids:
+        return 0
+
+    # Outfits that lose items get a new version so syncing clients refetch them
+    affected_outfits = select(outfit_clothing.c.outfit_id).where(outfit_clothing.c.clothing_id.in_(clothing_ids))
+    await bump_outfits(db, affected_outfits)
+    await reset_owner_wardrobes(db, clothing_ids)
+    await db.execute(delete(outfit_clothing).where(outfit_clothing.c.clothing_id.in_(clothing_ids)))
+    await db.execute(delete(user_clothing).where(user_clothing.c.clothing_id.in_(clothing_ids)))
+    await db.execute(delete(Clothing.__table__).where(Clothing.__table__.c.id.in_(clothing_ids)))
+    return len(clothing_ids)
+
+
+async def import_clothes(
+        db: AsyncSession,
+        chunks: AsyncIterable[Tuple[List[dict], int, List[int]]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+        progress: Optional[Callable] = None
+) -> ImportStats:
+    """
+    Import normalized (rows, malformed, malformed_ids) chunks produced by the catalog pipeline.
+    Existing IDs are loaded once up front and new rows are written in batches,
+    so the number of round trips grows with the number of batches, not items.
+    The last occurrence of an ID duplicated in the feed wins, as it did when
+    the whole file was loaded with json.load.
+    `progress(processed)` is called after every chunk.
+    """
+    stats = ImportStats()
+    existing_ids = await get_existing_clothing_ids(db)
+    seen_ids = set()
+
+    batch: Dict[int, dict] = {}
+    # Later occurrences of IDs whose first row was already inserted
+    rewrites: Dict[int, dict] = {}
+    async for rows, malformed, _ in chunks:
+        stats.malformed += malformed
+        for row in rows:
+            clothing_id = row["id"]
+            if clothing_id in seen_ids:
+                stats.duplicates += 1
+                if clothing_id in batch:
+                    batch[clothing_id] = row
+                elif clothing_id not in existing_ids:
+                    rewrites[clothing_id] = row
+                continue
+            seen_ids.add(clothing_id)
+
+            if clothing_id in existing_ids:
+                stats.existing += 1
+            else:
+                batch[clothing_id] = row
+
+        if len(batch) >= batch_size:
+            stats.imported += await bulk_insert_clothes(db, list(batch.values()))
+            batch = {}
+        if len(rewrites) >= batch_size:
+            await bulk_update_clothes(db, list(rewrites.values()))
+            rewrites = {}
+
+        if progress:
+            progress(stats.processed)
+
+    stats.imported += await bulk_insert_clothes(db, list(batch.values()))
+    await bulk_update_clothes(db, list(rewrites.values()))
+    await db.commit()
+
+    stats.finish()
+    return stats
+
+
+async def sync_clothes(
+        db: AsyncSession,
+        chunks: AsyncIterable[Tuple[List[dict], int, List[int]]],
+        source_path: str,
+        fingerprint: str,
+        digest,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        progress: Optional[Callable] = None
+) -> ImportStats:
+    """
+    Bring the clothing table in line with a catalog dump.
+    The run is skipped without reading the file when its fingerprint matches
+    the last sync. Otherwise the stored content hashes are diffed against the
+    feed in a single pass and only inserted, changed and vanished items are
+    written, in batches. `digest` is fed the file by the chunks' reader and its
+    checksum is recorded once they are exhausted.
+    The last occurrence of a duplicated ID in the feed wins. Items whose feed
+    entry is malformed are left untouched rather than deleted.
+    `progress(processed)` is called after every chunk.
+    """
+    stats = ImportStats()
+
+    source = await db.get(CatalogSource, source_path)
+    if source and source.fingerprint == fingerprint:
+        stats.source_unchanged = True
+        stats.finish()
+        return stats
+
+    # Hash of every item as the table will hold it once the pending batches are written
+    hashes = await get_clothing_hashes(db)
+    stored_ids = set(hashes)
+    seen_ids = set()
+    unchanged_ids = set()
+    # Entries the feed still lists but that could not be parsed
+    malformed_ids = set()
+    inserts: Dict[int, dict] = {}
+    updates: Dict[int, dict] = {}
+
+    async for rows, malformed, chunk_malformed_ids in chunks:
+        stats.malformed += malformed
+        malformed_ids.update(chunk_malformed_ids)
+        for row in rows:
+            clothing_id = row["id"]
+            content_hash = row["content_hash"]
+            if clothing_id in seen_ids:
+                stats.duplicates += 1
+                if hashes[clothing_id] == content_hash:
+                    continue
+                if clothing_id in inserts:
+                    inserts[clothing_id] = row
+                else:
+                    # Rewrites a pending update, or a row already written in this run
+                    updates[clothing_id] = row
+                    if clothing_id in unchanged_ids:
+                        unchanged_ids.discard(clothing_id)
+                        stats.unchanged -= 1
+                        stats.updated += 1
+                hashes[clothing_id] = content_hash
+                continue
+            seen_ids.add(clothing_id)
+
+            if clothing_id not in hashes:
+                inserts[clothing_id] = row
+            elif hashes[clothing_id] != content_hash:
+                updates[clothing_id] = row
+                stats.updated += 1
+            else:
+                unchanged_ids.add(clothing_id)
+                stats.unchanged += 1
+            hashes[clothing_id] = content_hash
+
+        if len(inserts) >= batch_size:
+            stats.imported += await bulk_insert_clothes(db, list(inserts.values()))
+            inserts = {}
+        if len(updates) >= batch_size:
+            await bulk_update_clothes(db, list(updates.values()))
+            updates = {}
+
+        if progress:
+            progress(stats.processed)
+
+    stats.imported += await bulk_insert_clothes(db, list(inserts.values()))
+    await bulk_update_clothes(db, list(updates.values()))
+
+    # Everything in the table that the feed no longer mentions is gone upstream
+    vanished_ids = [
+        clothing_id for clothing_id in stored_ids
+        if clothing_id not in seen_ids and clothing_id not in malformed_ids
+    ]
+    for start in range(0, len(vanished_ids), batch_size):
+        stats.deleted += await bulk_delete_clothes(db, vanished_ids[start:start + batch_size])
+
+    checksum = digest.hexdigest()
+    if source:
+        source.checksum = checksum
+        source.fingerprint = fingerprint
+        source.synced_at = datetime.utcnow()
+    else:
+        db.add(CatalogSource(path=source_path, checksum=checksum, fingerprint=fingerprint, synced_at=datetime.utcnow()))
+
+    await db.commit()
+
+    stats.finish()
+    return stats
@@ -1,117 +1,380 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from app.database.models import Outfit, Clothing
+from sqlalchemy import select, insert, update, delete, text
+from app.config import config
+from app.database.models import User, Outfit, OutfitTombstone, outfit_clothing
 from app.schemas.clothes import OutfitCreate
-from typing import List
+from app.services.catalog_cache import catalog_cache
+from typing import List, Optional, Tuple
 
+# Most clothing items an outfit may hold
+MAX_OUTFIT_ITEMS = 15
 
-async def create_outfit(
-        db: AsyncSession,
-        outfit_data: OutfitCreate,
-        user_id: int
-) -> Outfit:
-    # Verify that all clothing items exist
-    stmt = select(Clothing).where(Clothing.id.in_(outfit_data.clothing_ids))
-    result = await db.execute(stmt)
-    existing_clothes = result.scalars().all()
+# Gives every user owning outfits a new outfit version, for admin actions that
+# change all outfits at once. Callers stamp the outfits from the bumped rows.
+BUMP_OUTFIT_VERSIONS_CTE = (
+    "WITH bumped AS ("
+    "UPDATE users SET outfit_version = outfit_version + 1 "
+    "WHERE id IN (SELECT user_id FROM outfits) RETURNING id, outfit_version"
+    ") "
+)
+
+
+# Drops tombstones older than the retention period and remembers the newest
+# dropped version per user: a delta from before it would miss deletions.
+PRUNE_OUTFIT_TOMBSTONES_SQL = (
+    "WITH pruned AS ("
+    "DELETE FROM outfit_tombstones WHERE {condition} AND created_at < now() - make_interval(days => :days) "
+    "RETURNING user_id, version"
+    ") "
+    "UPDATE users SET outfit_reset_version = GREATEST(users.outfit_reset_version, pruned.version) "
+    "FROM (SELECT user_id, max(version) AS version FROM pruned GROUP BY user_id) AS pruned "
+    "WHERE users.id = pruned.user_id"
+)
+
+# Takes the user rows first, in the order every outfit write takes them
+LOCK_TOMBSTONE_OWNERS_SQL = (
+    "SELECT id FROM users WHERE id IN ("
+    "SELECT user_id FROM outfit_tombstones WHERE created_at < now() - make_interval(days => :days)"
+    ") ORDER BY id FOR UPDATE"
+)
+
+
+class OutfitRecord:
+    """Outfit with its clothing items resolved from the catalog snapshot"""
+
+    __slots__ = ("id", "user_id", "name", "version", "clothes")
+
+    def __init__(self, id, user_id, name, version, clothes):
+        self.id = id
+        self.user_id = user_id
+        self.name = name
+        self.version = version
+        self.clothes = clothes
 
-    # Check if we found all requested clothing items
-    found_ids = {clothing.id for clothing in existing_clothes}
-    missing_ids = set(outfit_data.clothing_ids) - found_ids
+
+async def finish_write(db: AsyncSession, commit: bool):
+    """Commit, or only flush when the caller batches several writes into one transaction"""
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+
+async def resolve_clothes(db: AsyncSession, clothing_ids: List[int]) -> list:
+    """Resolve clothing IDs from the catalog snapshot, failing on unknown IDs"""
+    # Ignore repeated IDs, keep the order they were given in
+    unique_ids = list(dict.fromkeys(clothing_ids))
+    clothes, missing_ids = await catalog_cache.get_items(db, unique_ids)
 
     if missing_ids:
-        raise ValueError(f"Clothing items not found: {missing_ids}")
+        raise ValueError(f"Clothing items not found: {set(missing_ids)}")
+    return clothes
 
+
+def check_outfit_size(item_count: int):
     # Check if we have between 1-15 items
-    if len(existing_clothes) < 1 or len(existing_clothes) > 15:
-        raise ValueError("Outfit must contain between 1 and 15 clothing items")
+    if item_count < 1 or item_count > MAX_OUTFIT_ITEMS:
+        raise ValueError(f"Outfit must contain between 1 and {MAX_OUTFIT_ITEMS} clothing items")
+
+
+async def insert_outfit_clothes(db: AsyncSession, outfit_id: int, clothing_ids: List[int]):
+    if clothing_ids:
+        await db.execute(
+            outfit_clothing.insert(),
+            [{"outfit_id": outfit_id, "clothing_id": clothing_id} for clothing_id in clothing_ids]
+        )
+
+
+async def delete_outfit_clothes(db: AsyncSession, outfit_id: int, clothing_ids: List[int]):
+    if clothing_ids:
+        await db.execute(
+            delete(outfit_clothing).where(
+                (outfit_clothing.c.outfit_id == outfit_id) & outfit_clothing.c.clothing_id.in_(clothing_ids)
+            )
+        )
+
+
+async def get_outfit_clothing_ids(db: AsyncSession, outfit_id: int) -> List[int]:
+    result = await db.execute(
+        select(outfit_clothing.c.clothing_id).where(outfit_clothing.c.outfit_id == outfit_id)
+    )
+    return list(result.scalars().all())
+
+
+async def lock_user_outfit(db: AsyncSession, outfit_id: int, user_id: int):
+    """Fetch (id, name) of a user's outfit, locking the row until the transaction ends"""
+    result = await db.execute(
+        select(Outfit.id, Outfit.name)
+        .where((Outfit.id == outfit_id) & (Outfit.user_id == user_id))
+        .with_for_update()
+    )
+    outfit = result.one_or_none()
+    if not outfit:
+        raise ValueError("Outfit not found")
+    return outfit
+
+
+async def next_outfit_version(db: AsyncSession, user_id: int) -> int:
+    """
+    Take the user's next outfit version.
+    The user row stays locked until the transaction ends, so a user's outfit
+    changes commit in version order and a client that synced to version V
+    never misses a lower version committed later.
+    """
+    users = User.__table__.c
+    result = await db.execute(
+        update(User.__table__)
+        .where(users.id == user_id)
+        .values(outfit_version=users.outfit_version + 1)
+        .returning(users.outfit_version)
+    )
+    return result.scalar_one()
+
+
+async def stamp_outfit(db: AsyncSession, outfit_id: int, version: int, **values):
+    """Apply column changes to an outfit together with the version taken for the change"""
+    await db.execute(
+        update(Outfit.__table__)
+        .where(Outfit.__table__.c.id == outfit_id)
+        .values(version=version, **values)
+    )
+
+
+async def prune_outfit_tombstones(db: AsyncSession, user_id: Optional[int] = None):
+    """
+    Drop tombstones older than OUTFIT_TOMBSTONE_RETENTION_DAYS, of one user or of everyone.
+    Clients that synced before a dropped tombstone get the full list on their next sync.
+    With a user_id, the caller must already hold that user's outfit version.
+    """
+    params = {"days": config.OUTFIT_TOMBSTONE_RETENTION_DAYS}
+    if user_id is None:
+        await db.execute(text(LOCK_TOMBSTONE_OWNERS_SQL), params)
+        condition = "TRUE"
+    else:
+        params["user_id"] = user_id
+        condition = "user_id = :user_id"
+    await db.execute(text(PRUNE_OUTFIT_TOMBSTONES_SQL.format(condition=condition)), params)
+
+
+async def bump_outfits(db: AsyncSession, outfit_ids):
+    """
+    Give outfits a new version of their owner, e.g. after catalog deletes.
+    `outfit_ids` is a list or a select of outfit IDs.
+    """
+    users = User.__table__.c
+    outfits = Outfit.__table__.c
+    bumped = (
+        update(User.__table__)
+        .where(users.id.in_(select(outfits.user_id).where(outfits.id.in_(outfit_ids))))
+        .values(outfit_version=users.outfit_version + 1)
+        .returning(users.id, users.outfit_version)
+        .cte("bumped")
+    )
+    await db.execute(
+        update(Outfit.__table__)
+        .where((outfits.user_id == bumped.c.id) & outfits.id.in_(outfit_ids))
+        .values(version=bumped.c.outfit_version)
+    )
+
+
+async def create_outfit(
+        db: AsyncSession,
+        outfit_data: OutfitCreate,
+        user_id: int,
+        commit: bool = True
+) -> OutfitRecord:
+    # Verify that all clothing items exist
+    clothes = await resolve_clothes(db, outfit_data.clothing_ids)
+    check_outfit_size(len(clothes))
 
     # Create the outfit
-    outfit = Outfit(
-        user_id=user_id,
-        name=outfit_data.name
+    version = await next_outfit_version(db, user_id)
+    result = await db.execute(
+        insert(Outfit.__table__)
+        .values(user_id=user_id, name=outfit_data.name, version=version)
+        .returning(Outfit.__table__.c.id)
     )
+    outfit_id = result.scalar_one()
 
     # Add the clothing items to the outfit
-    outfit.clothes.extend(existing_clothes)
+    await insert_outfit_clothes(db, outfit_id, [clothing.id for clothing in clothes])
+    await finish_write(db, commit)
 
-    db.add(outfit)
-    await db.commit()
-    await db.refresh(outfit)
+    return OutfitRecord(outfit_id, user_id, outfit_data.name, version, clothes)
 
-    # Reload the outfit with clothes relationship
-    stmt = select(Outfit).where(Outfit.id == outfit.id).options(
-        selectinload(Outfit.clothes)
+
+async def load_outfit_records(db: AsyncSession, user_id: int, since_version: Optional[int] = None) -> List[OutfitRecord]:
+    """Load a user's outfits, optionally only those changed after since_version"""
+    stmt = select(Outfit.id, Outfit.name, Outfit.version).where(Outfit.user_id == user_id)
+    if since_version is not None:
+        stmt = stmt.where(Outfit.version > since_version)
+    result = await db.execute(stmt.order_by(Outfit.id))
+    outfits = result.all()
+    if not outfits:
+        return []
+
+    result = await db.execute(
+        select(outfit_clothing.c.outfit_id, outfit_clothing.c.clothing_id)
+        .where(outfit_clothing.c.outfit_id.in_([outfit.id for outfit in outfits]))
     )
-    result = await db.execute(stmt)
-    return result.scalar_one()
+    clothing_ids_by_outfit = {outfit.id: [] for outfit in outfits}
+    for outfit_id, clothing_id in result:
+        clothing_ids_by_outfit[outfit_id].append(clothing_id)
+
+    # Item fields come from the in-memory catalog, not from a join
+    all_ids = {clothing_id for ids in clothing_ids_by_outfit.values() for clothing_id in ids}
+    items, _ = await catalog_cache.get_items(db, all_ids)
+    items_by_id = {item.id: item for item in items}
+
+    return [
+        OutfitRecord(
+            outfit.id,
+            user_id,
+            outfit.name,
+            outfit.version,
+            [items_by_id[clothing_id] for clothing_id in clothing_ids_by_outfit[outfit.id]
+             if clothing_id in items_by_id]
+        )
+        for outfit in outfits
+    ]
 
 
-async def get_user_outfits(db: AsyncSession, user_id: int) -> List[Outfit]:
+async def get_user_outfits(db: AsyncSession, user_id: int) -> List[OutfitRecord]:
     """Get all outfits for a user with their clothing items"""
-    stmt = select(Outfit).where(Outfit.user_id == user_id).options(
-        selectinload(Outfit.clothes)
-    )
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    return await load_outfit_records(db, user_id)
+
+
+async def get_outfits_version(db: AsyncSession, user_id: int) -> int:
+    """
+    Last outfit version given to a user, including deletions.
+    Read it before loading outfits: everything up to it is committed, and
+    changes committed in between are only sent again on the next sync.
+    """
+    result = await db.execute(select(User.outfit_version).where(User.id == user_id))
+    return result.scalar_one_or_none() or 0
+
+
+async def get_user_outfits_since(
+        db: AsyncSession,
+        user_id: int,
+        since_version: int
+) -> Optional[Tuple[List[OutfitRecord], List[int], int]]:
+    """
+    Get only what changed for a user after since_version.
+    Returns (changed or created outfits, deleted outfit IDs, current version),
+    or None when tombstones newer than since_version were pruned and the
+    client has to load the whole list instead.
+    """
+    result = await db.execute(select(User.outfit_version, User.outfit_reset_version).where(User.id == user_id))
+    row = result.one_or_none()
+    version, reset_version = row if row else (0, 0)
+    if since_version < reset_version:
+        return None
 
+    outfits = await load_outfit_records(db, user_id, since_version)
 
-async def get_outfit_by_id(db: AsyncSession, outfit_id: int, user_id: int) -> Outfit:
-    """Get a specific outfit by ID for a user"""
-    stmt = select(Outfit).where(
-        (Outfit.id == outfit_id) & (Outfit.user_id == user_id)
-    ).options(selectinload(Outfit.clothes))
-    result = await db.execute(stmt)
-    return result.scalar_one_or_none()
+    result = await db.execute(
+        select(OutfitTombstone.outfit_id, OutfitTombstone.version).where(
+            (OutfitTombstone.user_id == user_id) & (OutfitTombstone.version > since_version)
+        )
+    )
+    tombstones = result.all()
+    return outfits, [tombstone.outfit_id for tombstone in tombstones], version
 
 
 async def update_outfit(
         db: AsyncSession,
         outfit_id: int,
         user_id: int,
-        outfit_data: OutfitCreate
-) -> Outfit:
-    """Update an existing outfit"""
-    outfit = await get_outfit_by_id(db, outfit_id, user_id)
-    if not outfit:
-        raise ValueError("Outfit not found")
+        outfit_data: OutfitCreate,
+        commit: bool = True
+) -> OutfitRecord:
+    """Update an existing outfit, touching only the association rows that changed"""
+    # The user row is locked before the outfit row, in every outfit write
+    version = await next_outfit_version(db, user_id)
+    await lock_user_outfit(db, outfit_id, user_id)
 
     # Verify new clothing items exist
-    stmt = select(Clothing).where(Clothing.id.in_(outfit_data.clothing_ids))
-    result = await db.execute(stmt)
-    existing_clothes = result.scalars().all()
+    clothes = await resolve_clothes(db, outfit_data.clothing_ids)
+    check_outfit_size(len(clothes))
 
-    found_ids = {clothing.id for clothing in existing_clothes}
-    missing_ids = set(outfit_data.clothing_ids) - found_ids
+    current_ids = set(await get_outfit_clothing_ids(db, outfit_id))
+    new_ids = [clothing.id for clothing in clothes]
+    await delete_outfit_clothes(db, outfit_id, list(current_ids.difference(new_ids)))
+    await insert_outfit_clothes(db, outfit_id, [clothing_id for clothing_id in new_ids if clothing_id not in current_ids])
 
-    if missing_ids:
-        raise ValueError(f"Clothing items not found: {missing_ids}")
+    await stamp_outfit(db, outfit_id, version, name=outfit_data.name)
+
+    await finish_write(db, commit)
+    return OutfitRecord(outfit_id, user_id, outfit_data.name, version, clothes)
 
-    if len(existing_clothes) < 1 or len(existing_clothes) > 15:
-        raise ValueError("Outfit must contain between 1 and 15 clothing items")
 
-    # Update outfit
-    outfit.name = outfit_data.name
-    outfit.clothes = existing_clothes  # Replace all clothing items
+async def add_outfit_items(
+        db: AsyncSession,
+        outfit_id: int,
+        user_id: int,
+        clothing_ids: List[int],
+        commit: bool = True
+) -> OutfitRecord:
+    """Add specific clothing items to an outfit"""
+    version = await next_outfit_version(db, user_id)
+    outfit = await lock_user_outfit(db, outfit_id, user_id)
+    added = await resolve_clothes(db, clothing_ids)
+
+    current_ids = await get_outfit_clothing_ids(db, outfit_id)
+    current_set = set(current_ids)
+    new_ids = [clothing.id for clothing in added if clothing.id not in current_set]
+    check_outfit_size(len(current_ids) + len(new_ids))
 
-    await db.commit()
-    await db.refresh(outfit)
+    await insert_outfit_clothes(db, outfit_id, new_ids)
+    await stamp_outfit(db, outfit_id, version)
 
-    # Reload with clothes
-    stmt = select(Outfit).where(Outfit.id == outfit.id).options(
-        selectinload(Outfit.clothes)
-    )
-    result = await db.execute(stmt)
-    return result.scalar_one()
+    clothes, _ = await catalog_cache.get_items(db, current_ids + new_ids)
+    await finish_write(db, commit)
+    return OutfitRecord(outfit_id, user_id, outfit.name, version, clothes)
 
 
-async def delete_outfit(db: AsyncSession, outfit_id: int, user_id: int) -> bool:
-    """Delete an outfit"""
-    outfit = await get_outfit_by_id(db, outfit_id, user_id)
-    if not outfit:
+async def remove_outfit_items(
+        db: AsyncSession,
+        outfit_id: int,
+        user_id: int,
+        clothing_ids: List[int],
+        commit: bool = True
+) -> OutfitRecord:
+    """Remove specific clothing items from an outfit"""
+    version = await next_outfit_version(db, user_id)
+    outfit = await lock_user_outfit(db, outfit_id, user_id)
+
+    removed = set(clothing_ids)
+    current_ids = await get_outfit_clothing_ids(db, outfit_id)
+    remaining_ids = [clothing_id for clothing_id in current_ids if clothing_id not in removed]
+    check_outfit_size(len(remaining_ids))
+
+    await delete_outfit_clothes(db, outfit_id, [clothing_id for clothing_id in current_ids if clothing_id in removed])
+    await stamp_outfit(db, outfit_id, version)
+
+    clothes, _ = await catalog_cache.get_items(db, remaining_ids)
+    await finish_write(db, commit)
+    return OutfitRecord(outfit_id, user_id, outfit.name, version, clothes)
+
+
+async def delete_outfit(db: AsyncSession, outfit_id: int, user_id: int, commit: bool = True) -> bool:
+    """
+    Delete an outfit and leave a tombstone for clients syncing by version.
+    The user's expired tombstones are pruned on the way.
+    """
+    version = await next_outfit_version(db, user_id)
+    result = await db.execute(
+        select(Outfit.id).where((Outfit.id == outfit_id) & (Outfit.user_id == user_id)).with_for_update()
+    )
+    if result.scalar_one_or_none() is None:
         return False
 
-    await db.delete(outfit)
-    await db.commit()
-    return True
\ No newline at end of file
+    await db.execute(delete(outfit_clothing).where(outfit_clothing.c.outfit_id == outfit_id))
+    await db.execute(delete(Outfit.__table__).where(Outfit.__table__.c.id == outfit_id))
+    await db.execute(
+        insert(OutfitTombstone.__table__).values(outfit_id=outfit_id, user_id=user_id, version=version)
+    )
+    await prune_outfit_tombstones(db, user_id)
+    await finish_write(db, commit)
+    return True
@@ -0,0 +1,110 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text, update
+from app.database.models import User, user_clothing, wardrobe_version_seq
+from typing import List, Optional, Tuple
+
+# Transaction-level advisory lock held from taking a wardrobe version until commit.
+# Writers commit in version order, so a client that synced to version V can
+# never miss rows stamped with a lower version that were committed later.
+WARDROBE_VERSION_LOCK = 0x77617264726f6265
+
+# Resets the wardrobe version of every user, for admin actions that remove ownings wholesale
+WARDROBE_RESET_SQL = (
+    f"WITH locked AS (SELECT pg_advisory_xact_lock({WARDROBE_VERSION_LOCK})), "
+    "next_version AS (SELECT nextval('wardrobe_version_seq') AS value FROM locked) "
+    "UPDATE users SET wardrobe_version = next_version.value, wardrobe_reset_version = next_version.value "
+    "FROM next_version"
+)
+
+
+async def next_wardrobe_version(db: AsyncSession) -> int:
+    """
+    Take a new wardrobe version, shared by every row written in one operation.
+    Blocks until other transactions holding a version have finished.
+    """
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": WARDROBE_VERSION_LOCK})
+    result = await db.execute(select(wardrobe_version_seq.next_value()))
+    return result.scalar_one()
+
+
+async def touch_wardrobes(db: AsyncSession, version: int, user_ids=None, reset: bool = False):
+    """
+    Move wardrobes to a new version.
+    `user_ids` is a list or a select of user IDs, None touches every user.
+    Pass reset=True when items were removed or changed, which deltas built
+    from added rows cannot express, so clients reload the whole wardrobe.
+    Versions never move backwards.
+    """
+    users = User.__table__.c
+    values = {"wardrobe_version": func.greatest(users.wardrobe_version, version)}
+    if reset:
+        values["wardrobe_reset_version"] = func.greatest(users.wardrobe_reset_version, version)
+
+    stmt = update(User.__table__).values(**values)
+    if user_ids is not None:
+        stmt = stmt.where(users.id.in_(user_ids))
+    await db.execute(stmt)
+
+
+async def get_wardrobe_versions(db: AsyncSession, user_id: int) -> Tuple[int, int]:
+    """(current version, last reset version) of a user's wardrobe"""
+    result = await db.execute(
+        select(User.wardrobe_version, User.wardrobe_reset_version).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    return (row.wardrobe_version, row.wardrobe_reset_version) if row else (0, 0)
+
+
+async def get_wardrobe_changes(
+        db: AsyncSession,
+        user_id: int,
+        since: Optional[int] = None,
+        versions: Optional[Tuple[int, int]] = None
+) -> Tuple[str, int, List[int]]:
+    """
+    What a client holding the wardrobe at version `since` must apply.
+    `versions` are the already loaded get_wardrobe_versions of the user.
+    Returns (kind, current version, clothing IDs) where kind is "full" with
+    every owned ID or "delta" with the IDs added after `since`.
+    """
+    version, reset_version = versions or await get_wardrobe_versions(db, user_id)
+
+    stmt = select(user_clothing.c.clothing_id).where(user_clothing.c.user_id == user_id)
+    if since is None or since < reset_version:
+        kind = "full"
+    elif since >= version:
+        return "delta", version, []
+    else:
+        kind = "delta"
+        stmt = stmt.where(user_clothing.c.version > since)
+
+    result = await db.execute(stmt)
+    return kind, version, list(result.scalars().all())
+
+
+async def get_wardrobe_page(
+        db: AsyncSession,
+        user_id: int,
+        after_id: Optional[int] = None,
+        limit: int = 60
+) -> Tuple[List[int], Optional[int]]:
+    """
+    One page of a user's owned clothing IDs, keyset-paginated on clothing_id.
+    Returns (clothing IDs, next_after_id or None on the last page).
+    """
+    stmt = (
+        select(user_clothing.c.clothing_id)
+        .where(user_clothing.c.user_id == user_id)
+        .order_by(user_clothing.c.clothing_id)
+        .limit(limit + 1)
+    )
+    if after_id is not None:
+        stmt = stmt.where(user_clothing.c.clothing_id > after_id)
+    result = await db.execute(stmt)
+    clothing_ids = list(result.scalars().all())
+
+    next_after_id = None
+    if len(clothing_ids) > limit:
+        clothing_ids = clothing_ids[:limit]
+        next_after_id = clothing_ids[-1]
+    return clothing_ids, next_after_id
@@ -1,5 +1,6 @@
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import config
 
@@ -17,6 +18,9 @@ engine = create_async_engine(
     future=True,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
 )
 
 # Create async session factory
@@ -53,6 +57,43 @@ async def get_db_websocket() -> AsyncSession:
             await session.close()
 
 
+# Statements that bring tables created by older versions up to date.
+# create_all only creates missing tables, it never alters existing ones.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE clothing ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32)",
+    "ALTER TABLE catalog_sources ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64)",
+    "ALTER TABLE outfits ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_outfits_user_id_version ON outfits (user_id, version)",
+    "CREATE INDEX IF NOT EXISTS ix_user_clothing_clothing_id ON user_clothing (clothing_id)",
+    "CREATE INDEX IF NOT EXISTS ix_outfit_clothing_clothing_id ON outfit_clothing (clothing_id)",
+    "CREATE INDEX IF NOT EXISTS ix_clothing_category ON clothing (category)",
+    "CREATE INDEX IF NOT EXISTS ix_clothing_color ON clothing (color)",
+    "CREATE INDEX IF NOT EXISTS ix_clothing_price ON clothing (price)",
+    "CREATE SEQUENCE IF NOT EXISTS wardrobe_version_seq",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS wardrobe_version BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS wardrobe_reset_version BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE user_clothing ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT nextval('wardrobe_version_seq')",
+    # Outfit versions moved from a global sequence to a per-user counter, which
+    # starts above every version already handed out. Backfilled only when the
+    # column is added, the sequence is dropped once no default refers to it.
+    "ALTER TABLE outfits ALTER COLUMN version DROP DEFAULT",
+    "DROP SEQUENCE IF EXISTS outfit_version_seq",
+    "DO $$ BEGIN "
+    "IF NOT EXISTS (SELECT 1 FROM information_schema.columns "
+    "WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'outfit_version') THEN "
+    "ALTER TABLE users ADD COLUMN outfit_version BIGINT NOT NULL DEFAULT 0; "
+    "UPDATE users SET outfit_version = versions.version FROM ("
+    "SELECT user_id, max(version) AS version FROM ("
+    "SELECT user_id, version FROM outfits UNION ALL SELECT user_id, version FROM outfit_tombstones"
+    ") AS all_versions GROUP BY user_id"
+    ") AS versions WHERE users.id = versions.user_id; "
+    "END IF; "
+    "END $$",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS outfit_reset_version BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE outfit_tombstones ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT now()",
+]
+
+
 async def init_db():
     """
     Initialize database tables.
@@ -63,6 +104,8 @@ async def init_db():
         from app.database import models
         # await conn.run_sync(Base.metadata.drop_all)  # Uncomment to reset DB
         await conn.run_sync(Base.metadata.create_all)
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
 
 async def close_db():
     """
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, Table, DateTime, Sequence, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from app.database.connection import Base
@@ -8,15 +8,24 @@ outfit_clothing = Table(
     'outfit_clothing',
     Base.metadata,
     Column('outfit_id', Integer, ForeignKey('outfits.id'), primary_key=True),
-    Column('clothing_id', Integer, ForeignKey('clothing.id'), primary_key=True)
+    Column('clothing_id', Integer, ForeignKey('clothing.id'), primary_key=True),
+    # The primary key only serves lookups by outfit, catalog deletes go by clothing
+    Index('ix_outfit_clothing_clothing_id', 'clothing_id')
 )
 
+# Monotonic change counter for wardrobes, drives conditional GETs and wardrobe deltas
+wardrobe_version_seq = Sequence("wardrobe_version_seq", metadata=Base.metadata)
+
 # Association table for user-clothing ownership
 user_clothing = Table(
     'user_clothing',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('clothing_id', Integer, ForeignKey('clothing.id'), primary_key=True)
+    Column('clothing_id', Integer, ForeignKey('clothing.id'), primary_key=True),
+    # Wardrobe version at which the item was added
+    Column('version', BigInteger, nullable=False, server_default=wardrobe_version_seq.next_value()),
+    # The primary key only serves lookups by user, catalog deletes go by clothing
+    Index('ix_user_clothing_clothing_id', 'clothing_id')
 )
 
 class User(Base):
@@ -25,6 +34,10 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     password = Column(String(255), nullable=False)  # Store hashed passwords
+    wardrobe_version = Column(BigInteger, nullable=False, server_default="0")  # Bumped on every ownership change
+    wardrobe_reset_version = Column(BigInteger, nullable=False, server_default="0")  # Last change a delta cannot express
+    outfit_version = Column(BigInteger, nullable=False, server_default="0")  # Last version given to one of the user's outfits
+    outfit_reset_version = Column(BigInteger, nullable=False, server_default="0")  # Newest pruned tombstone, older deltas are incomplete
 
     # Relationships
     outfits = relationship("Outfit", back_populates="user")
@@ -36,11 +49,12 @@ class Clothing(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
-    price = Column(Float, nullable=True)
-    color = Column(String(50), nullable=False)
+    price = Column(Float, nullable=True, index=True)
+    color = Column(String(50), nullable=False, index=True)
     item_url = Column(String(500), nullable=True)
     image_url = Column(String(500), nullable=False)
-    category = Column(String(50), nullable=True)  # NEW: Add category field
+    category = Column(String(50), nullable=True, index=True)  # NEW: Add category field
+    content_hash = Column(String(32), nullable=True)  # Hash of the imported fields, used by catalog sync
 
     # Relationships remain the same
     outfits = relationship("Outfit", secondary=outfit_clothing, back_populates="clothes")
@@ -53,7 +67,32 @@ class Outfit(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String(100), nullable=True)  # Optional outfit name
+    version = Column(BigInteger, nullable=False)  # Taken from users.outfit_version on every change
 
     # Relationships
     user = relationship("User", back_populates="outfits")
-    clothes = relationship("Clothing", secondary=outfit_clothing, back_populates="outfits")
\ No newline at end of file
+    clothes = relationship("Clothing", secondary=outfit_clothing, back_populates="outfits")
+
+    __table_args__ = (
+        # Serves both the library load by user and the since_version delta query
+        Index("ix_outfits_user_id_version", "user_id", "version"),
+    )
+
+
+class OutfitTombstone(Base):
+    """Remembers deleted outfits so clients syncing by version learn about deletions"""
+    __tablename__ = "outfit_tombstones"
+
+    outfit_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    version = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())  # Pruned after OUTFIT_TOMBSTONE_RETENTION_DAYS
+
+
+class CatalogSource(Base):
+    __tablename__ = "catalog_sources"
+
+    path = Column(String(500), primary_key=True)
+    checksum = Column(String(64), nullable=False)  # SHA-256 of the (decompressed) source at last sync
+    fingerprint = Column(String(64), nullable=True)  # Size and mtime of the file, an unchanged file is not read again
+    synced_at = Column(DateTime, nullable=False)
@@ -1,9 +1,10 @@
 import asyncio
+import hashlib
 import json
 import random
 
-from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.websockets import WebSocket
@@ -11,21 +12,40 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import jwt
 from datetime import datetime, timedelta
-from typing import Optional
-import bcrypt
-from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple
 from pathlib import Path
 
 from starlette.websockets import WebSocketDisconnect
 
 from app.crud.admin import get_users_with_stats, assign_random_clothes_to_user, assign_random_clothes_to_all_users
+from app.crud.clothes import import_clothes, sync_clothes, file_fingerprint
+from app.crud.wardrobe import (
+    WARDROBE_RESET_SQL, get_wardrobe_changes, get_wardrobe_versions, get_wardrobe_page,
+    touch_wardrobes, next_wardrobe_version
+)
+from app.services.catalog_normalize import extract_category_slug
+from app.services.catalog_pipeline import normalize_catalog, shutdown_import_executor
 
 # Import config and database
 from app.config import config
-from app.crud.outfits import delete_outfit, update_outfit, get_user_outfits, create_outfit
+from app.crud.outfits import (
+    delete_outfit, update_outfit, get_user_outfits, create_outfit,
+    get_user_outfits_since, get_outfits_version, add_outfit_items, remove_outfit_items,
+    prune_outfit_tombstones, BUMP_OUTFIT_VERSIONS_CTE
+)
 from app.database.connection import get_db, init_db, close_db, AsyncSessionLocal
-from app.database.models import User, Clothing, Outfit
+from app.database.models import User, Clothing, Outfit, user_clothing
 from app.schemas import OutfitCreate
+from app.services.jobs import Job, job_runner
+from app.services.catalog_cache import catalog_cache
+from app.services.auth_cache import token_cache
+from app.services.passwords import password_hasher, PasswordQueueFull
+from app.services.outfit_hub import outfit_hub
+from app.services.serializers import outfit_to_dict, outfits_to_dicts, wardrobe_to_dicts, wardrobe_rows, dumps, dumps_text, loads
+from app.services.search import catalog_search
+from app.services.facets import catalog_facets
+from app.services.assets import asset_manifest
+from app.services.thumbnails import THUMBNAIL_MEDIA_TYPE, THUMBNAIL_SIZES, ThumbnailError, thumbnail_service
 
 app = FastAPI(
     title=config.APP_NAME,
@@ -35,6 +55,8 @@ app = FastAPI(
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
+# Templates link static files by their content-hashed URL
+templates.env.globals["asset_url"] = asset_manifest.url
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -48,12 +70,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
-    """Dependency to get current user - can be used in Depends()"""
-    token = request.cookies.get("access_token")
+async def resolve_user(token: Optional[str], db: AsyncSession) -> Optional[Tuple[int, str]]:
+    """Decode an access token and return (user_id, username) if the user still exists"""
     if not token:
         return None
 
+    cached = token_cache.get(token)
+    if cached:
+        return cached
+
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
         username: str = payload.get("sub")
@@ -61,17 +86,30 @@ async def get_current_user(request: Request, db: AsyncSession = Depends(get_db))
             return None
 
         # Verify user still exists in database
-        stmt = select(User).where(User.username == username)
+        stmt = select(User.id).where(User.username == username)
         result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
+        user_id = result.scalar_one_or_none()
 
-        if user is None:
+        if user_id is None:
             return None
 
-        return username
-    except jwt.JWTError:
+        token_cache.put(token, user_id, username, payload.get("exp"))
+        return user_id, username
+    except jwt.InvalidTokenError:
+        # Malformed, expired or wrongly signed tokens are treated as no token
         return None
 
+
+async def resolve_username(token: Optional[str], db: AsyncSession) -> Optional[str]:
+    """Decode an access token and return its username if the user still exists"""
+    user = await resolve_user(token, db)
+    return user[1] if user else None
+
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
+    """Dependency to get current user - can be used in Depends()"""
+    return await resolve_username(request.cookies.get("access_token"), db)
+
 async def get_current_user_as_dependency(
     request: Request,
     db: AsyncSession = Depends(get_db)
@@ -86,23 +124,33 @@ async def get_current_user_as_dependency(
     return username
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+@app.on_event("startup")
+async def startup_event():
+    # Hash and precompress static files before the first page links to them
+    await asyncio.to_thread(asset_manifest.build)
 
+    await init_db()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    async with AsyncSessionLocal() as db:
+        await prune_outfit_tombstones(db)
+        await db.commit()
 
+    # Load the catalog snapshot used to resolve clothing fields in memory
+    async with AsyncSessionLocal() as db:
+        await catalog_cache.reload(db)
+    catalog_cache.start(AsyncSessionLocal)
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
+    await outfit_hub.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await job_runner.shutdown()
+    await catalog_cache.stop()
+    await outfit_hub.stop()
+    shutdown_import_executor()
+    password_hasher.shutdown()
+    thumbnail_service.shutdown()
     await close_db()
 
 
@@ -154,8 +202,20 @@ async def login_or_register(request: Request, db: AsyncSession = Depends(get_db)
                 }
             )
 
-        # Create new user in database
-        hashed_password = hash_password(password)
+        # Create new user in database, hashing runs off the event loop
+        try:
+            hashed_password = await password_hasher.hash(password)
+        except PasswordQueueFull:
+            return templates.TemplateResponse(
+                "index.html",
+                {
+                    "request": request,
+                    "error": "Server is busy, please try again",
+                    "app_name": config.APP_NAME,
+                    "app_version": config.APP_VERSION
+                },
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         new_user = User(username=username, password=hashed_password)
 
         db.add(new_user)
@@ -177,7 +237,21 @@ async def login_or_register(request: Request, db: AsyncSession = Depends(get_db)
         result = await db.execute(stmt)
         user = result.scalar_one_or_none()
 
-        if not user or not verify_password(password, user.password):
+        try:
+            password_valid = bool(user) and await password_hasher.verify(password, user.password)
+        except PasswordQueueFull:
+            return templates.TemplateResponse(
+                "index.html",
+                {
+                    "request": request,
+                    "error": "Server is busy, please try again",
+                    "app_name": config.APP_NAME,
+                    "app_version": config.APP_VERSION
+                },
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        if not password_valid:
             return templates.TemplateResponse(
                 "index.html",
                 {
@@ -208,49 +282,322 @@ async def login_or_register(request: Request, db: AsyncSession = Depends(get_db)
         )
 
 
+# Responses that depend on the wardrobe are revalidated on every use
+WARDROBE_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers the given ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": WARDROBE_CACHE_CONTROL}
+    )
+
+
 @app.get("/app", response_class=HTMLResponse)
 async def app_main(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    username = await get_current_user(request, db)
-    if not username:
+    current_user = await resolve_user(request.cookies.get("access_token"), db)
+    if not current_user:
         return RedirectResponse(url="/")
+    user_id, username = current_user
+
+    # The page only changes with the wardrobe, repeat visits get a 304
+    version, _ = await get_wardrobe_versions(db, user_id)
+    etag = f'W/"app-{user_id}-{version}-{config.APP_VERSION}-{asset_manifest.version}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Only the first page of the wardrobe is rendered, the rest is fetched on scroll.
+    # Item fields are resolved from the in-memory catalog
+    page_ids, next_after_id = await get_wardrobe_page(db, user_id, limit=config.WARDROBE_PAGE_SIZE)
+    page_clothes, _ = await catalog_cache.get_items(db, page_ids)
+
+    wardrobe_data = wardrobe_to_dicts(page_clothes)
+
+    # Only categories the user owns something in are offered, with their counts
+    _, _, facet_counts = await catalog_facets.query(db, user_id, {}, limit=0)
+
+    context = {
+        "request": request,
+        "user_id": user_id,
+        "username": username,
+        "wardrobe_items": wardrobe_data,
+        "next_after_id": next_after_id,
+        "app_name": config.APP_NAME,
+        "app_version": config.APP_VERSION,
+        "category_counts": facet_counts["category"],
+    }
+    headers = {"ETag": etag, "Cache-Control": WARDROBE_CACHE_CONTROL}
+
+    if config.WARDROBE_STREAM_TEMPLATE:
+        # Chunks are sent as Jinja renders them, the header goes out before the grid
+        template = templates.get_template("app/main.html")
+        return StreamingResponse(template.generate(context), media_type="text/html", headers=headers)
+
+    return templates.TemplateResponse("app/main.html", context, headers=headers)
+
+
+@app.get("/api/wardrobe/page")
+async def get_wardrobe_items_page(
+        request: Request,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        db: AsyncSession = Depends(get_db)
+):
+    """Next page of the user's wardrobe after clothing ID `after`"""
+    current_user = await resolve_user(request.cookies.get("access_token"), db)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    # Get current user with owned_clothes eagerly loaded
-    stmt_user = select(User).where(User.username == username).options(
-        selectinload(User.owned_clothes)
+    limit = max(1, min(limit or config.WARDROBE_PAGE_SIZE, MAX_SEARCH_LIMIT))
+    page_ids, next_after_id = await get_wardrobe_page(db, current_user[0], after, limit)
+    page_clothes, _ = await catalog_cache.get_items(db, page_ids)
+
+    return Response(
+        content=dumps({"items": wardrobe_to_dicts(page_clothes), "next_after_id": next_after_id}),
+        media_type="application/json"
     )
-    result_user = await db.execute(stmt_user)
-    current_user = result_user.scalar_one_or_none()
 
+
+@app.get("/api/wardrobe")
+async def get_wardrobe(
+        request: Request,
+        since: Optional[int] = None,
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    The user's wardrobe as compact rows.
+    With since, only items added after that version are returned ("delta"),
+    unless items were removed or changed since, then the whole wardrobe is ("full").
+    """
+    current_user = await resolve_user(request.cookies.get("access_token"), db)
     if not current_user:
-        return RedirectResponse(url="/")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    user_id = current_user[0]
 
-    # Get only the clothes owned by the current user
-    wardrobe_data = []
-    for clothing in current_user.owned_clothes:
-        wardrobe_data.append({
-            "id": clothing.id,
-            "name": clothing.name,
-            "category": clothing.category if clothing.category else "Не указано",
-            "image_url": clothing.image_url,
-            "color": clothing.color,
-            "price": clothing.price,
-            "item_url": clothing.item_url
-        })
+    versions = await get_wardrobe_versions(db, user_id)
+    etag = f'W/"wardrobe-{user_id}-{versions[0]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return templates.TemplateResponse(
-        "app/main.html",
-        {
-            "request": request,
-            "username": username,
-            "wardrobe_items": wardrobe_data,
-            "app_name": config.APP_NAME,
-            "app_version": config.APP_VERSION,
-            "category_names": config.CATEGORY_NAMES,
-        }
+    kind, version, clothing_ids = await get_wardrobe_changes(db, user_id, since, versions)
+    items, _ = await catalog_cache.get_items(db, clothing_ids)
+    fields, rows = wardrobe_rows(items)
+
+    return Response(
+        content=dumps({"type": kind, "version": version, "fields": fields, "items": rows}),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": WARDROBE_CACHE_CONTROL}
+    )
+
+
+# Largest page returned by the search endpoints
+MAX_SEARCH_LIMIT = 200
+
+
+async def get_owned_clothing_ids(db: AsyncSession, user_id: int) -> set:
+    result = await db.execute(
+        select(user_clothing.c.clothing_id).where(user_clothing.c.user_id == user_id)
     )
+    return set(result.scalars().all())
+
+
+@app.get("/api/search")
+async def search_clothes(
+        request: Request,
+        q: str = "",
+        scope: str = "wardrobe",
+        offset: int = 0,
+        limit: int = 20,
+        ids_only: bool = False,
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Ranked full-text search over clothing names and colors.
+    scope is "wardrobe" for the current user's clothes or "catalog" for every item.
+    With ids_only every matching wardrobe ID is returned in one response, for
+    clients that filter a wardrobe they already hold; offset and limit do not apply.
+    """
+    current_user = await resolve_user(request.cookies.get("access_token"), db)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    if scope not in ("wardrobe", "catalog"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown search scope")
+
+    if ids_only:
+        if scope != "wardrobe":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids_only requires the wardrobe scope")
+        ids = await catalog_search.matching_ids(q, await get_owned_clothing_ids(db, current_user[0]))
+        return Response(
+            content=dumps({"query": q, "total": len(ids), "ids": ids}),
+            media_type="application/json"
+        )
+
+    offset = max(offset, 0)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    within = await get_owned_clothing_ids(db, current_user[0]) if scope == "wardrobe" else None
+
+    hits, total = await catalog_search.search(q, offset, limit, within)
+    items, _ = await catalog_cache.get_items(db, [clothing_id for clothing_id, _ in hits])
+
+    return Response(
+        content=dumps({
+            "query": q,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": wardrobe_to_dicts(items),
+        }),
+        media_type="application/json"
+    )
+
+
+@app.get("/api/search/suggest")
+async def suggest_search(
+        request: Request,
+        q: str = "",
+        limit: int = 10,
+        db: AsyncSession = Depends(get_db)
+):
+    """Complete the last word of a search query from the catalog vocabulary"""
+    if not await resolve_user(request.cookies.get("access_token"), db):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    suggestions = await catalog_search.suggest(q, max(1, min(limit, MAX_SEARCH_LIMIT)))
+    return Response(content=dumps({"query": q, "suggestions": suggestions}), media_type="application/json")
+
+
+# Sort orders of facet results: (catalog column, descending)
+FACET_SORTS = {
+    "id": (None, False),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+}
+
+
+@app.get("/api/facets")
+async def facet_clothes(
+        request: Request,
+        scope: str = "wardrobe",
+        category: List[str] = Query([]),
+        color: List[str] = Query([]),
+        price: List[str] = Query([]),
+        sort: str = "id",
+        offset: int = 0,
+        limit: int = 100,
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Filter by category, color and price bucket and count every facet value.
+    Several values of one facet match any of them, different facets must all match.
+    sort is "id", "price_asc" or "price_desc".
+    """
+    current_user = await resolve_user(request.cookies.get("access_token"), db)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    if scope not in ("wardrobe", "catalog"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown facet scope")
+    if sort not in FACET_SORTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown sort order")
+
+    offset = max(offset, 0)
+    limit = max(0, min(limit, MAX_SEARCH_LIMIT))
+    ids, total, counts = await catalog_facets.query(
+        db,
+        current_user[0] if scope == "wardrobe" else None,
+        {"category": category, "color": color, "price": price},
+        offset,
+        limit,
+        sort=FACET_SORTS[sort][0],
+        descending=FACET_SORTS[sort][1]
+    )
+
+    return Response(
+        content=dumps({
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "ids": ids,
+            "facets": {
+                facet: [{"value": value, "count": count} for value, count in values]
+                for facet, values in counts.items()
+            },
+        }),
+        media_type="application/json"
+    )
+
+
+# Blob URLs are content hashes and never change, the per-item redirect changes with the image
+THUMBNAIL_BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+THUMBNAIL_REDIRECT_CACHE_CONTROL = "public, max-age=86400"
+
+
+@app.get("/thumbnails/blob/{digest}.jpg")
+async def get_thumbnail_blob(digest: str):
+    path = thumbnail_service.blob_path(digest)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thumbnail not found")
+    return FileResponse(
+        path,
+        media_type=THUMBNAIL_MEDIA_TYPE,
+        headers={"Cache-Control": THUMBNAIL_BLOB_CACHE_CONTROL, "ETag": f'"{digest}"'}
+    )
+
+
+@app.get("/thumbnails/{size}/{clothing_id}")
+async def get_thumbnail(size: str, clothing_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Redirect to the cached thumbnail of a clothing image, rendering it on first use.
+    size is "grid" or "builder". Falls back to the original image when no thumbnail can be made.
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown thumbnail size")
+    items, _ = await catalog_cache.get_items(db, [clothing_id])
+    if not items:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Clothing not found")
+
+    image_url = items[0].image_url
+    try:
+        digest = await thumbnail_service.get(image_url, size)
+    except ThumbnailError as e:
+        print(f"Thumbnail of clothing {clothing_id} unavailable: {e}")
+        return RedirectResponse(url=image_url, headers={"Cache-Control": "no-cache"})
+
+    return RedirectResponse(
+        url=f"/thumbnails/blob/{digest}.jpg",
+        headers={"Cache-Control": THUMBNAIL_REDIRECT_CACHE_CONTROL}
+    )
+
+
+# Hashed asset URLs always name the same bytes
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@app.get("/assets/{hashed_path:path}")
+async def get_asset(hashed_path: str, request: Request):
+    """Static file by its content-hashed URL, precompressed as the client accepts"""
+    asset = asset_manifest.get(hashed_path)
+    if asset is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asset not found")
+
+    headers = {"Cache-Control": ASSET_CACHE_CONTROL, "ETag": f'"{asset.digest}"', "Vary": "Accept-Encoding"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    encoding, body = asset.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
 
 
 @app.websocket("/ws")
@@ -268,38 +615,43 @@ async def websocket_endpoint(websocket: WebSocket):
 
 @app.websocket("/ws/outfits")
 async def websocket_outfits(websocket: WebSocket):
+    # Authenticate once at handshake from the access_token cookie,
+    # messages are trusted to belong to this user from here on
+    async with AsyncSessionLocal() as auth_db:
+        current_user = await resolve_user(websocket.cookies.get("access_token"), auth_db)
+
+    # Accept before closing, a close before the handshake becomes an HTTP 403
+    # and the browser only sees 1006, not the 1008 that stops it reconnecting
     await websocket.accept()
-    print(f"WebSocket connected: {websocket.client}")
+    if not current_user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id, username = current_user
+    print(f"WebSocket connected: {websocket.client} as {username}")
 
-    # Create a database session for the entire WebSocket connection
-    db = AsyncSessionLocal()
+    # Receive outfit changes made from the user's other tabs and devices
+    outfit_hub.subscribe(user_id, websocket)
 
     try:
         while True:
-            # Add timeout to prevent hanging
-            data = await asyncio.wait_for(websocket.receive_json(), timeout=30.0)
-            print(f"Received WebSocket message: {data}")
-
-            if data["type"] == "create_outfit":
-                print("Handling create_outfit request")
-                await handle_create_outfit(websocket, db, data)
-
-            elif data["type"] == "get_outfits":
-                print("Handling get_outfits request")
-                await handle_get_outfits(websocket, db, data)
-
-            elif data["type"] == "update_outfit":
-                await handle_update_outfit(websocket, db, data)
-
-            elif data["type"] == "delete_outfit":
-                await handle_delete_outfit(websocket, db, data)
-            else:
-                # Check if connection is still open before sending
-                if websocket.client_state.CONNECTED:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": f"Unknown message type: {data['type']}"
-                    })
+            # Idle connections hold no database resources, so they may stay open
+            message = await asyncio.wait_for(websocket.receive_text(), timeout=config.WS_IDLE_TIMEOUT or None)
+            data = loads(message)
+
+            # Check a connection out of the pool only while this message is handled,
+            # the reply is sent after it has been returned
+            async with AsyncSessionLocal() as db:
+                if data.get("type") == "batch":
+                    reply = await handle_outfit_batch(db, user_id, data)
+                else:
+                    reply = await handle_outfit_message(db, user_id, data)
+
+            # Check if connection is still open before sending
+            if websocket.client_state.CONNECTED:
+                await websocket.send_text(dumps_text(reply))
+
+            await outfit_hub.publish_reply(user_id, reply, source=websocket)
 
     except asyncio.TimeoutError:
         print("WebSocket timeout - closing connection")
@@ -322,221 +674,182 @@ async def websocket_outfits(websocket: WebSocket):
                 "message": "Internal server error"
             })
     finally:
-        # Close the database session when WebSocket closes
-        await db.close()
+        outfit_hub.unsubscribe(user_id, websocket)
         print(f"WebSocket connection closed: {websocket.client}")
 
-async def handle_create_outfit(websocket: WebSocket, db: AsyncSession, data: dict):
-    """Handle outfit creation via WebSocket"""
-    try:
-        username = data.get("username")
-        if not username:
-            if websocket.client_state.CONNECTED:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": "User not authenticated"
-                })
-            return
 
-        # Get user ID
-        stmt = select(User).where(User.username == username)
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
+# Upper bound on operations carried by a single batch message
+MAX_BATCH_OPERATIONS = 100
 
-        if not user:
-            await websocket.send_json({
-                "type": "error",
-                "message": "User not found"
-            })
-            return
 
-        # Validate input data
-        if "outfit" not in data or "name" not in data["outfit"] or "item_ids" not in data["outfit"]:
-            await websocket.send_json({
-                "type": "error",
-                "message": "Invalid outfit data format"
-            })
-            return
+async def handle_create_outfit(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Handle outfit creation via WebSocket"""
+    # Validate input data
+    if "outfit" not in data or "name" not in data["outfit"] or "item_ids" not in data["outfit"]:
+        raise ValueError("Invalid outfit data format")
+
+    # Create outfit
+    outfit_data = OutfitCreate(
+        name=data["outfit"]["name"],
+        clothing_ids=data["outfit"]["item_ids"]
+    )
 
-        # Create outfit
-        outfit_data = OutfitCreate(
-            name=data["outfit"]["name"],
-            clothing_ids=data["outfit"]["item_ids"]
-        )
+    outfit = await create_outfit(db, outfit_data, user_id, commit=commit)
+    return {
+        "type": "outfit_created",
+        "outfit": outfit_to_dict(outfit)
+    }
+
+
+async def handle_get_outfits(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """
+    Handle fetching user's outfits via WebSocket.
+    With since_version only outfits changed after that version and the IDs
+    of deleted outfits are returned.
+    """
+    since_version = data.get("since_version")
+    if since_version is not None:
+        changes = await get_user_outfits_since(db, user_id, int(since_version))
+        # None when deletions after since_version were pruned, the whole list is sent instead
+        if changes is not None:
+            outfits, deleted_ids, version = changes
+            return {
+                "type": "outfits_delta",
+                "version": version,
+                "outfits": outfits_to_dicts(outfits),
+                "deleted_ids": deleted_ids
+            }
 
-        outfit = await create_outfit(db, outfit_data, user.id)
+    # The version is read first, changes committed while loading are sent again later
+    version = await get_outfits_version(db, user_id)
+    outfits = await get_user_outfits(db, user_id)
+    return {
+        "type": "outfits_list",
+        "version": version,
+        "outfits": outfits_to_dicts(outfits)
+    }
 
-        # Convert to serializable format
-        outfit_dict = {
-            "id": outfit.id,
-            "name": outfit.name,
-            "items": [
-                {
-                    "id": clothing.id,
-                    "name": clothing.name,
-                    "image_url": clothing.image_url,
-                    "category": clothing.category
-                }
-                for clothing in outfit.clothes
-            ]
-        }
-        await websocket.send_json({
-            "type": "outfit_created",
-            "outfit": outfit_dict
-        })
-    except ValueError as e:
-        if websocket.client_state.CONNECTED:
-            await websocket.send_json({
-                "type": "error",
-                "message": str(e)
-            })
-    except Exception as e:
-        print(f"Error in handle_create_outfit: {e}")
-        if websocket.client_state.CONNECTED:
-            await websocket.send_json({
-                "type": "error",
-                "message": f"Failed to create outfit: {str(e)}"
-            })
 
+async def handle_update_outfit(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Handle outfit update via WebSocket"""
+    outfit_data = OutfitCreate(
+        name=data["outfit"]["name"],
+        clothing_ids=data["outfit"]["item_ids"]
+    )
 
-async def handle_get_outfits(websocket: WebSocket, db: AsyncSession, data: dict):
-    """Handle fetching user's outfits via WebSocket"""
-    username = data.get("username")
-    if not username:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not authenticated"
-        })
-        return
+    outfit = await update_outfit(db, data["outfit_id"], user_id, outfit_data, commit=commit)
+    return {
+        "type": "outfit_updated",
+        "outfit": outfit_to_dict(outfit)
+    }
 
-    # Get user ID
-    stmt = select(User).where(User.username == username)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
 
-    if not user:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not found"
-        })
-        return
+async def handle_add_outfit_items(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Handle adding specific items to an outfit via WebSocket"""
+    outfit = await add_outfit_items(db, data["outfit_id"], user_id, data["item_ids"], commit=commit)
+    return {
+        "type": "outfit_updated",
+        "outfit": outfit_to_dict(outfit)
+    }
 
-    # Get user's outfits
-    outfits = await get_user_outfits(db, user.id)
 
-    outfit_list = []
-    for outfit in outfits:
-        outfit_list.append({
-            "id": outfit.id,
-            "name": outfit.name,
-            "items": [
-                {
-                    "id": clothing.id,
-                    "name": clothing.name,
-                    "image_url": clothing.image_url,
-                    "category": clothing.category
-                }
-                for clothing in outfit.clothes
-            ]
-        })
+async def handle_remove_outfit_items(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Handle removing specific items from an outfit via WebSocket"""
+    outfit = await remove_outfit_items(db, data["outfit_id"], user_id, data["item_ids"], commit=commit)
+    return {
+        "type": "outfit_updated",
+        "outfit": outfit_to_dict(outfit)
+    }
 
-    await websocket.send_json({
-        "type": "outfits_list",
-        "outfits": outfit_list
-    })
 
+async def handle_delete_outfit(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Handle outfit deletion via WebSocket"""
+    success = await delete_outfit(db, data["outfit_id"], user_id, commit=commit)
+    if not success:
+        raise ValueError("Outfit not found or access denied")
 
-async def handle_update_outfit(websocket: WebSocket, db: AsyncSession, data: dict):
-    """Handle outfit update via WebSocket"""
-    username = data.get("username")
-    if not username:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not authenticated"
-        })
-        return
+    return {
+        "type": "outfit_deleted",
+        "outfit_id": data["outfit_id"]
+    }
 
-    # Get user ID
-    stmt = select(User).where(User.username == username)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
 
-    if not user:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not found"
-        })
-        return
+OUTFIT_MESSAGE_HANDLERS = {
+    "create_outfit": handle_create_outfit,
+    "get_outfits": handle_get_outfits,
+    "update_outfit": handle_update_outfit,
+    "add_outfit_items": handle_add_outfit_items,
+    "remove_outfit_items": handle_remove_outfit_items,
+    "delete_outfit": handle_delete_outfit,
+}
 
-    try:
-        outfit_data = OutfitCreate(
-            name=data["outfit"]["name"],
-            clothing_ids=data["outfit"]["item_ids"]
-        )
 
-        outfit = await update_outfit(db, data["outfit_id"], user.id, outfit_data)
+async def run_outfit_operation(db: AsyncSession, user_id: int, data: dict, commit: bool = True) -> dict:
+    """Dispatch one outfit operation; raises ValueError for rejected operations"""
+    handler = OUTFIT_MESSAGE_HANDLERS.get(data.get("type"))
+    if not handler:
+        raise ValueError(f"Unknown message type: {data.get('type')}")
 
-        # Convert to serializable format
-        outfit_dict = {
-            "id": outfit.id,
-            "name": outfit.name,
-            "items": [
-                {
-                    "id": clothing.id,
-                    "name": clothing.name,
-                    "image_url": clothing.image_url,
-                    "category": clothing.category
-                }
-                for clothing in outfit.clothes
-            ]
-        }
+    try:
+        return await handler(db, user_id, data, commit)
+    except (KeyError, TypeError):
+        raise ValueError("Invalid message format")
 
-        await websocket.send_json({
-            "type": "outfit_updated",
-            "outfit": outfit_dict
-        })
 
+async def handle_outfit_message(db: AsyncSession, user_id: int, data: dict) -> dict:
+    """Handle a single outfit message and build its reply"""
+    try:
+        return await run_outfit_operation(db, user_id, data)
     except ValueError as e:
-        await websocket.send_json({
+        return {
             "type": "error",
             "message": str(e)
-        })
+        }
+    except Exception as e:
+        # The session is per message, so the connection can keep going
+        print(f"Error handling {data.get('type')}: {e}")
+        await db.rollback()
+        return {
+            "type": "error",
+            "message": f"Failed to handle {data.get('type')}: {str(e)}"
+        }
 
 
-async def handle_delete_outfit(websocket: WebSocket, db: AsyncSession, data: dict):
-    """Handle outfit deletion via WebSocket"""
-    username = data.get("username")
-    if not username:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not authenticated"
-        })
-        return
+async def handle_outfit_batch(db: AsyncSession, user_id: int, data: dict) -> dict:
+    """
+    Run an ordered list of outfit operations in one transaction with one commit.
+    Each operation runs in its own savepoint, so a rejected operation is rolled
+    back alone and reported in its slot of the results list.
+    """
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return {"type": "error", "message": "Batch must contain a list of operations"}
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return {"type": "error", "message": f"Batch may contain at most {MAX_BATCH_OPERATIONS} operations"}
 
-    # Get user ID
-    stmt = select(User).where(User.username == username)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
+    results = []
+    try:
+        for operation in operations:
+            if not isinstance(operation, dict) or operation.get("type") == "batch":
+                results.append({"type": "error", "message": "Invalid batch operation"})
+                continue
 
-    if not user:
-        await websocket.send_json({
-            "type": "error",
-            "message": "User not found"
-        })
-        return
+            try:
+                async with db.begin_nested():
+                    results.append(await run_outfit_operation(db, user_id, operation, commit=False))
+            except ValueError as e:
+                results.append({"type": "error", "message": str(e)})
 
-    success = await delete_outfit(db, data["outfit_id"], user.id)
+        await db.commit()
+    except Exception as e:
+        print(f"Error handling batch: {e}")
+        await db.rollback()
+        return {"type": "error", "message": f"Batch failed and was rolled back: {str(e)}"}
 
-    if success:
-        await websocket.send_json({
-            "type": "outfit_deleted",
-            "outfit_id": data["outfit_id"]
-        })
-    else:
-        await websocket.send_json({
-            "type": "error",
-            "message": "Outfit not found or access denied"
-        })
+    return {
+        "type": "batch_result",
+        "results": results
+    }
 
 async def verify_admin_user(request: Request, db: AsyncSession = Depends(get_db)):
     """Verify the user is authenticated AND is the admin (Micos)"""
@@ -551,25 +864,111 @@ async def verify_admin_user(request: Request, db: AsyncSession = Depends(get_db)
     return username
 
 
-@app.get("/admin/fill", response_class=HTMLResponse)
-async def admin_fill(
+async def render_admin_page(
         request: Request,
-        db: AsyncSession = Depends(get_db),
-        username: str = Depends(verify_admin_user)
+        db: AsyncSession,
+        error: Optional[str] = None,
+        success: Optional[str] = None,
+        job: Optional[Job] = None
 ):
-    users = await get_users_with_stats(db)
-
+    after_id = request.query_params.get("after")
+    search = request.query_params.get("q") or None
+    users, next_after_id = await get_users_with_stats(
+        db,
+        after_id=int(after_id) if after_id and after_id.isdigit() else None,
+        search=search
+    )
     return templates.TemplateResponse(
         "admin/fill.html",
         {
             "request": request,
             "users": users,
+            "next_after_id": next_after_id,
+            "search": search or "",
+            "error": error,
+            "success": success,
+            "job": job.to_dict() if job else None,
             "app_name": config.APP_NAME,
             "app_version": config.APP_VERSION
         }
     )
 
 
+async def submit_admin_job(
+        request: Request,
+        db: AsyncSession,
+        kind: str,
+        description: str,
+        operation
+):
+    """Queue an admin operation as a background job and return the admin page with its handle"""
+    job = job_runner.submit(kind, description, operation)
+    return await render_admin_page(request, db, success=f"{description} started (job {job.id})", job=job)
+
+
+@app.get("/admin/fill", response_class=HTMLResponse)
+async def admin_fill(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        username: str = Depends(verify_admin_user)
+):
+    return await render_admin_page(request, db)
+
+
+@app.get("/admin/jobs")
+async def list_admin_jobs(username: str = Depends(verify_admin_user)):
+    return {"jobs": [job.to_dict() for job in job_runner.recent()]}
+
+
+@app.get("/admin/jobs/{job_id}")
+async def get_admin_job(job_id: str, username: str = Depends(verify_admin_user)):
+    job = job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/admin/stats/token-cache")
+async def get_token_cache_stats(username: str = Depends(verify_admin_user)):
+    return token_cache.stats()
+
+
+@app.get("/admin/stats/assets")
+async def get_asset_stats(username: str = Depends(verify_admin_user)):
+    return asset_manifest.stats()
+
+
+@app.get("/admin/stats/passwords")
+async def get_password_pool_stats(username: str = Depends(verify_admin_user)):
+    return password_hasher.stats()
+
+
+@app.websocket("/ws/admin/jobs/{job_id}")
+async def websocket_admin_job(websocket: WebSocket, job_id: str):
+    """Push job progress to the admin page until the job finishes"""
+    async with AsyncSessionLocal() as db:
+        username = await resolve_username(websocket.cookies.get("access_token"), db)
+
+    # Accept before rejecting, a close before the handshake reaches the browser as 1006
+    await websocket.accept()
+    job = job_runner.get(job_id) if username == "Micos" else None
+    if not job:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    try:
+        while True:
+            await websocket.send_json({"type": "job_progress", "job": job.to_dict()})
+            if job.finished:
+                break
+            await job.wait_for_change(timeout=1.0)
+            # Coalesce bursts of progress updates
+            await asyncio.sleep(0.2)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
 @app.post("/admin/fill/single")
 async def fill_single_user(
         request: Request,
@@ -580,32 +979,15 @@ async def fill_single_user(
     user_id = int(form_data.get("user_id"))
     item_count = int(form_data.get("item_count"))
 
-    assigned_count, error = await assign_random_clothes_to_user(db, user_id, item_count)
-
-    users = await get_users_with_stats(db)
-
-    if error:
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": error,
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    async def operation(job: Job) -> str:
+        async with AsyncSessionLocal() as job_db:
+            assigned_count, error = await assign_random_clothes_to_user(job_db, user_id, item_count, job.progress)
+        catalog_facets.invalidate_user(user_id)
+        if error:
+            raise ValueError(error)
+        return f"Successfully assigned {assigned_count} random clothes to user"
 
-    return templates.TemplateResponse(
-        "admin/fill.html",
-        {
-            "request": request,
-            "users": users,
-            "success": f"Successfully assigned {assigned_count} random clothes to user",
-            "app_name": config.APP_NAME,
-            "app_version": config.APP_VERSION
-        }
-    )
+    return await submit_admin_job(request, db, "fill_single", f"Fill wardrobe of user {user_id}", operation)
 
 
 @app.post("/admin/fill/all")
@@ -617,32 +999,15 @@ async def fill_all_users(
     form_data = await request.form()
     item_count = int(form_data.get("all_users_count"))
 
-    assigned_count, error = await assign_random_clothes_to_all_users(db, item_count)
-
-    users = await get_users_with_stats(db)
+    async def operation(job: Job) -> str:
+        async with AsyncSessionLocal() as job_db:
+            # Wardrobe bitmaps of each batch's users are dropped as the batch commits
+            assigned_count, error = await assign_random_clothes_to_all_users(job_db, item_count, job.progress)
+        if error:
+            raise ValueError(error)
+        return f"Successfully assigned clothes to all users ({assigned_count} total assignments)"
 
-    if error:
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": error,
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-
-    return templates.TemplateResponse(
-        "admin/fill.html",
-        {
-            "request": request,
-            "users": users,
-            "success": f"Successfully assigned clothes to all users ({assigned_count} total assignments)",
-            "app_name": config.APP_NAME,
-            "app_version": config.APP_VERSION
-        }
-    )
+    return await submit_admin_job(request, db, "fill_all", "Fill wardrobes of all users", operation)
 
 
 from sqlalchemy import text
@@ -666,108 +1031,113 @@ async def import_clothes_from_file(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        # Read the JSON file
-        file_path = Path("data/raw.txt")
-        if not file_path.exists():
-            users = await get_users_with_stats(db)
-            return templates.TemplateResponse(
-                "admin/fill.html",
-                {
-                    "request": request,
-                    "users": users,
-                    "error": "File data/raw.txt not found",
-                    "app_name": config.APP_NAME,
-                    "app_version": config.APP_VERSION
-                }
-            )
+    file_path = Path("data/raw.txt")
+    if not file_path.exists():
+        return await render_admin_page(request, db, error="File data/raw.txt not found")
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    async def operation(job: Job) -> str:
+        async with AsyncSessionLocal() as job_db:
+            try:
+                # Items are parsed incrementally and normalized in the worker pool,
+                # existing IDs are loaded once and new rows are inserted in batches
+                stats = await import_clothes(job_db, normalize_catalog(file_path), progress=job.progress)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON format in file: {str(e)}")
+
+            # Update the sequence after import
+            await update_clothing_sequence(job_db)
+            await catalog_cache.reload(job_db)
+
+        return (
+            f"Successfully imported {stats.imported} new clothing items. Skipped {stats.existing} existing items, "
+            f"{stats.duplicates} duplicated and {stats.malformed} malformed entries. "
+            f"({stats.rows_per_second:.0f} rows/s in {stats.elapsed:.2f}s)"
+        )
 
-        # Process each clothing item
-        imported_count = 0
-        skipped_count = 0
+    return await submit_admin_job(request, db, "import_clothes", "Import clothes from data/raw.txt", operation)
 
-        for item_id, item_data in data.items():
-            # Convert item_id to integer
-            try:
-                clothing_id = int(item_id)
-            except ValueError:
-                # Skip if ID is not a valid integer
-                skipped_count += 1
-                continue
 
-            # Check if clothing with this ID already exists
-            stmt = select(Clothing).where(Clothing.id == clothing_id)
-            result = await db.execute(stmt)
-            existing_clothing = result.scalar_one_or_none()
+@app.post("/admin/fill/sync-clothes")
+async def sync_clothes_from_file(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        username: str = Depends(verify_admin_user)
+):
+    file_path = Path("data/raw.txt")
+    if not file_path.exists():
+        return await render_admin_page(request, db, error="File data/raw.txt not found")
 
-            if existing_clothing:
-                skipped_count += 1
-                continue
+    async def operation(job: Job) -> str:
+        # Unchanged files are detected by fingerprint and skipped without reading,
+        # otherwise the checksum is computed from the bytes as they are parsed
+        fingerprint = file_fingerprint(file_path)
+        digest = hashlib.sha256()
 
-            # Clean price - remove currency symbol and spaces, convert to float
-            price_str = item_data['price'].replace('₽', '').replace(' ', '').strip()
+        async with AsyncSessionLocal() as job_db:
             try:
-                price = float(price_str) if price_str else None
-            except (ValueError, TypeError):
-                price = None
-
-            # Create new clothing item with the original JSON ID
-            new_clothing = Clothing(
-                id=clothing_id,  # Set the ID from JSON
-                name=item_data['name'],
-                color=item_data['color'],
-                image_url=item_data['image_url'],
-                item_url=item_data['item_url'],
-                price=price
-            )
+                stats = await sync_clothes(
+                    job_db, normalize_catalog(file_path, digest=digest), str(file_path), fingerprint, digest,
+                    progress=job.progress
+                )
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON format in file: {str(e)}")
+
+            if stats.source_unchanged:
+                return "Catalog file unchanged since the last sync. Nothing to do."
+
+            await update_clothing_sequence(job_db)
+            await catalog_cache.reload(job_db)
+
+        return (
+            f"Catalog synced: {stats.imported} added, {stats.updated} updated, "
+            f"{stats.deleted} removed, {stats.unchanged} unchanged, "
+            f"{stats.duplicates} duplicated and {stats.malformed} malformed entries skipped. "
+            f"({stats.rows_per_second:.0f} rows/s in {stats.elapsed:.2f}s)"
+        )
 
-            db.add(new_clothing)
-            imported_count += 1
+    return await submit_admin_job(request, db, "sync_clothes", "Sync clothes with data/raw.txt", operation)
 
-        await db.commit()
 
-        # Update the sequence after import
-        await update_clothing_sequence(db)
+OUTFIT_TOMBSTONES_SQL = (
+    BUMP_OUTFIT_VERSIONS_CTE
+    + "INSERT INTO outfit_tombstones (outfit_id, user_id, version) "
+    "SELECT outfits.id, outfits.user_id, bumped.outfit_version FROM outfits "
+    "JOIN bumped ON bumped.id = outfits.user_id "
+    "ON CONFLICT DO NOTHING"
+)
 
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": f"Successfully imported {imported_count} new clothing items. Skipped {skipped_count} duplicates.",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+OUTFIT_BUMP_SQL = (
+    BUMP_OUTFIT_VERSIONS_CTE
+    + "UPDATE outfits SET version = bumped.outfit_version FROM bumped WHERE outfits.user_id = bumped.id"
+)
+
+
+def clear_tables_operation(
+        statements: list,
+        success: str,
+        params: Optional[dict] = None,
+        reload_catalog: bool = False,
+        clear_token_cache: bool = False,
+        clear_wardrobes: bool = False
+):
+    """Build a job operation that runs DELETE statements in one transaction"""
+    async def operation(job: Job) -> str:
+        async with AsyncSessionLocal() as job_db:
+            for index, statement in enumerate(statements, start=1):
+                await job_db.execute(text(statement), params or {})
+                job.progress(index, len(statements))
+            await job_db.commit()
+            if reload_catalog:
+                await catalog_cache.reload(job_db)
+        if clear_token_cache:
+            # Deleted users must not keep authenticating from cached tokens
+            token_cache.clear()
+        if clear_wardrobes:
+            catalog_facets.clear()
+        return success
+
+    return operation
 
-    except json.JSONDecodeError as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Invalid JSON format in file: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error importing clothes: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
 
 @app.post("/admin/clear/clothes")
 async def clear_clothes(
@@ -775,38 +1145,22 @@ async def clear_clothes(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        # First clear the association tables that reference clothing
-        await db.execute(text("DELETE FROM outfit_clothing"))
-        await db.execute(text("DELETE FROM user_clothing"))
-
-        # Then clear the clothes table
-        await db.execute(text("DELETE FROM clothing"))
-        await db.commit()
-
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": "All clothes and their associations cleared successfully",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error clearing clothes: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    operation = clear_tables_operation(
+        [
+            # Outfits lose their items, so clients syncing by version must refetch them
+            OUTFIT_BUMP_SQL,
+            # Clients holding a cached wardrobe must drop it
+            WARDROBE_RESET_SQL,
+            # First clear the association tables that reference clothing
+            "DELETE FROM outfit_clothing",
+            "DELETE FROM user_clothing",
+            # Then clear the clothes table
+            "DELETE FROM clothing",
+        ],
+        "All clothes and their associations cleared successfully",
+        reload_catalog=True
+    )
+    return await submit_admin_job(request, db, "clear_clothes", "Clear all clothes", operation)
 
 @app.post("/admin/clear/ownings")
 async def clear_ownings(
@@ -814,33 +1168,12 @@ async def clear_ownings(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        await db.execute(text("DELETE FROM user_clothing"))
-        await db.commit()
-
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": "All clothing ownerships cleared successfully",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error clearing ownings: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    operation = clear_tables_operation(
+        [WARDROBE_RESET_SQL, "DELETE FROM user_clothing"],
+        "All clothing ownerships cleared successfully",
+        clear_wardrobes=True
+    )
+    return await submit_admin_job(request, db, "clear_ownings", "Clear all ownings", operation)
 
 @app.post("/admin/clear/outfits")
 async def clear_outfits(
@@ -848,34 +1181,16 @@ async def clear_outfits(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        await db.execute(text("DELETE FROM outfit_clothing"))
-        await db.execute(text("DELETE FROM outfits"))
-        await db.commit()
-
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": "All outfits cleared successfully",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error clearing outfits: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    operation = clear_tables_operation(
+        [
+            # Leave tombstones so clients syncing by version drop the outfits too
+            OUTFIT_TOMBSTONES_SQL,
+            "DELETE FROM outfit_clothing",
+            "DELETE FROM outfits",
+        ],
+        "All outfits cleared successfully"
+    )
+    return await submit_admin_job(request, db, "clear_outfits", "Clear all outfits", operation)
 
 @app.post("/admin/clear/users")
 async def clear_users(
@@ -883,42 +1198,27 @@ async def clear_users(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        # Clear association tables first
-        await db.execute(text("DELETE FROM outfit_clothing"))
-        await db.execute(text("DELETE FROM user_clothing"))
-
-        # Clear outfits (they reference users)
-        await db.execute(text("DELETE FROM outfits"))
-
-        # Finally clear users (except the current admin)
-        await db.execute(text("DELETE FROM users WHERE username != :admin_username"),
-                         {"admin_username": username})
-        await db.commit()
-
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": "All users (except you) and their data cleared successfully",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error clearing users: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    operation = clear_tables_operation(
+        [
+            # Only the admin's outfit history is still needed
+            OUTFIT_TOMBSTONES_SQL,
+            "DELETE FROM outfit_tombstones WHERE user_id IN "
+            "(SELECT id FROM users WHERE username != :admin_username)",
+            WARDROBE_RESET_SQL,
+            # Clear association tables first
+            "DELETE FROM outfit_clothing",
+            "DELETE FROM user_clothing",
+            # Clear outfits (they reference users)
+            "DELETE FROM outfits",
+            # Finally clear users (except the current admin)
+            "DELETE FROM users WHERE username != :admin_username",
+        ],
+        "All users (except you) and their data cleared successfully",
+        {"admin_username": username},
+        clear_token_cache=True,
+        clear_wardrobes=True
+    )
+    return await submit_admin_job(request, db, "clear_users", "Clear all users", operation)
 
 
 @app.post("/admin/fill/assign-categories")
@@ -927,69 +1227,47 @@ async def assign_categories(
         db: AsyncSession = Depends(get_db),
         username: str = Depends(verify_admin_user)
 ):
-    try:
-        # Get all clothing items
-        stmt = select(Clothing)
-        result = await db.execute(stmt)
-        all_clothes = result.scalars().all()
-
-        assigned_count = 0
-        unknown_categories = set()
-
-        for clothing in all_clothes:
-            if not clothing.item_url:
-                continue
-
-            # Parse the URL to extract category
-            try:
-                # Split URL by slashes and find the segment after /catalog/
-                url_parts = clothing.item_url.split('/')
-                if 'catalog' in url_parts:
-                    catalog_index = url_parts.index('catalog')
-                    if catalog_index + 1 < len(url_parts):
-                        category_slug = url_parts[catalog_index + 1]
-
-                        # Map to display name using config
-                        if category_slug in config.CATEGORY_NAMES:
-                            clothing.category = config.CATEGORY_NAMES[category_slug]
-                            assigned_count += 1
-                        else:
-                            unknown_categories.add(category_slug)
-            except (IndexError, ValueError, AttributeError):
-                # Skip if URL parsing fails
-                pass
-
-        await db.commit()
-
-        users = await get_users_with_stats(db)
+    async def operation(job: Job) -> str:
+        async with AsyncSessionLocal() as job_db:
+            # Get all clothing items
+            stmt = select(Clothing)
+            result = await job_db.execute(stmt)
+            all_clothes = result.scalars().all()
+
+            assigned_count = 0
+            unknown_categories = set()
+
+            for index, clothing in enumerate(all_clothes, start=1):
+                if index % 1000 == 0:
+                    job.progress(index, len(all_clothes))
+
+                if not clothing.item_url:
+                    continue
+
+                # Extract the segment after /catalog/ and map it to a display name
+                category_slug = extract_category_slug(clothing.item_url)
+                if not category_slug:
+                    continue
+
+                if category_slug in config.CATEGORY_NAMES:
+                    clothing.category = config.CATEGORY_NAMES[category_slug]
+                    assigned_count += 1
+                else:
+                    unknown_categories.add(category_slug)
+
+            # Categories of owned items may have changed
+            await touch_wardrobes(job_db, await next_wardrobe_version(job_db), reset=True)
+            await job_db.commit()
+            job.progress(len(all_clothes), len(all_clothes))
+            await catalog_cache.reload(job_db)
 
         unknown_msg = ""
         if unknown_categories:
             unknown_msg = f" Unknown categories found: {', '.join(unknown_categories)}"
 
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "success": f"Categories assigned to {assigned_count} items.{unknown_msg}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+        return f"Categories assigned to {assigned_count} items.{unknown_msg}"
 
-    except Exception as e:
-        users = await get_users_with_stats(db)
-        return templates.TemplateResponse(
-            "admin/fill.html",
-            {
-                "request": request,
-                "users": users,
-                "error": f"Error assigning categories: {str(e)}",
-                "app_name": config.APP_NAME,
-                "app_version": config.APP_VERSION
-            }
-        )
+    return await submit_admin_job(request, db, "assign_categories", "Assign categories", operation)
 
 
 
@@ -1,3 +1,4 @@
 from .clothes import Clothing, ClothingCreate, ClothingBase
 from .clothes import User, UserCreate, UserBase
-from .clothes import Outfit, OutfitCreate, OutfitBase
\ No newline at end of file
+from .clothes import Outfit, OutfitCreate, OutfitBase
+from .clothes import OutfitItem, OutfitPayload, WardrobeItem
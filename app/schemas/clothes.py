@@ -46,6 +46,22 @@ class OutfitItem(BaseModel):
     class Config:
         orm_mode = True
 
+class OutfitPayload(OutfitBase):
+    """Outfit as sent to the client over the outfits WebSocket"""
+    id: int
+    version: int
+    items: List[OutfitItem] = []
+
+class WardrobeItem(BaseModel):
+    """Owned clothing item as rendered on the wardrobe page"""
+    id: int
+    name: str
+    category: str
+    image_url: str
+    color: str
+    price: Optional[float] = None
+    item_url: Optional[str] = None
+
 class Outfit(OutfitBase):
     id: int
     user_id: int
@@ -0,0 +1,129 @@
+"""
+Fingerprinted static assets.
+At startup every file under the static directory is hashed into its URL
+(css/style.css -> /assets/css/style.<hash>.css) and gzip and, when the brotli
+package is installed, brotli variants are compressed once and kept in memory.
+A hashed URL always names the same bytes, so responses are cached as immutable
+and a changed file simply gets a new URL.
+"""
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_PREFIX = "/assets/"
+STATIC_PREFIX = "/static/"
+
+# Text assets worth compressing, images and fonts are already compressed
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".json", ".html", ".txt", ".map")
+
+HASH_LENGTH = 12
+
+
+class Asset:
+    """One static file with its precompressed variants"""
+
+    __slots__ = ("path", "digest", "media_type", "body", "variants")
+
+    def __init__(self, path: str, body: bytes):
+        self.path = path
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.body = body
+        # encoding -> compressed body, only kept when smaller than the original
+        self.variants: Dict[str, bytes] = {}
+
+        if path.endswith(COMPRESSIBLE_SUFFIXES):
+            candidates = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(body, quality=11)
+            self.variants = {encoding: data for encoding, data in candidates.items() if len(data) < len(body)}
+
+    @property
+    def hashed_path(self) -> str:
+        stem, dot, suffix = self.path.rpartition(".")
+        if not dot or "/" in suffix:
+            return f"{self.path}.{self.digest}"
+        return f"{stem}.{self.digest}.{suffix}"
+
+    def negotiate(self, accept_encoding: str) -> Tuple[Optional[str], bytes]:
+        """(Content-Encoding, body) of the smallest variant the client accepts"""
+        accepted = _accepted_encodings(accept_encoding)
+        best = None
+        for encoding, data in self.variants.items():
+            if encoding in accepted and (best is None or len(data) < len(best[1])):
+                best = (encoding, data)
+        return best or (None, self.body)
+
+
+def _accepted_encodings(header: str) -> set:
+    """Encodings of an Accept-Encoding header that are not refused with q=0"""
+    accepted = set()
+    for part in header.split(","):
+        encoding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class AssetManifest:
+    """Maps static paths to hashed URLs and serves the hashed files"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._by_path: Dict[str, Asset] = {}
+        self._by_hashed_path: Dict[str, Asset] = {}
+        self.version = ""
+
+    def build(self):
+        """Hash and compress every file of the static directory"""
+        by_path = {}
+        for file in sorted(self.directory.rglob("*")):
+            if file.is_file():
+                path = file.relative_to(self.directory).as_posix()
+                by_path[path] = Asset(path, file.read_bytes())
+
+        self._by_path = by_path
+        self._by_hashed_path = {asset.hashed_path: asset for asset in by_path.values()}
+        # Changes whenever any asset changes, for ETags of pages linking to them
+        self.version = hashlib.sha256(
+            "".join(asset.hashed_path for asset in by_path.values()).encode("utf-8")
+        ).hexdigest()[:HASH_LENGTH]
+
+    def url(self, path: str) -> str:
+        """Hashed URL of a static file, the plain /static URL for files not in the manifest"""
+        path = path.lstrip("/")
+        asset = self._by_path.get(path)
+        if asset is None:
+            return STATIC_PREFIX + path
+        return ASSET_PREFIX + asset.hashed_path
+
+    def get(self, hashed_path: str) -> Optional[Asset]:
+        return self._by_hashed_path.get(hashed_path)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "assets": len(self._by_path),
+            "bytes": sum(len(asset.body) for asset in self._by_path.values()),
+            "compressed_bytes": {
+                encoding: sum(len(asset.variants.get(encoding, asset.body)) for asset in self._by_path.values())
+                for encoding in ("gzip", "br") if encoding == "gzip" or brotli is not None
+            },
+        }
+
+
+asset_manifest = AssetManifest("app/static")
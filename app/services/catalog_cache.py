@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.database.models import Clothing
+
+CATALOG_COLUMNS = (
+    Clothing.id,
+    Clothing.name,
+    Clothing.price,
+    Clothing.color,
+    Clothing.item_url,
+    Clothing.image_url,
+    Clothing.category,
+)
+
+
+class CatalogItem:
+    """Read-only in-memory copy of a clothing row"""
+
+    __slots__ = ("id", "name", "price", "color", "item_url", "image_url", "category")
+
+    def __init__(self, id, name, price, color, item_url, image_url, category):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.color = color
+        self.item_url = item_url
+        self.image_url = image_url
+        self.category = category
+
+
+class CatalogSnapshot:
+    """Immutable mapping of clothing ID to CatalogItem"""
+
+    __slots__ = ("items", "version", "loaded_at")
+
+    def __init__(self, items: Dict[int, CatalogItem], version: int):
+        self.items = items
+        self.version = version
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, clothing_id):
+        return clothing_id in self.items
+
+    def get(self, clothing_id: int) -> Optional[CatalogItem]:
+        return self.items.get(clothing_id)
+
+    def resolve(self, clothing_ids: Iterable[int]) -> Tuple[List[CatalogItem], List[int]]:
+        """Return (items found in order, IDs missing from the snapshot)"""
+        found = []
+        missing = []
+        for clothing_id in clothing_ids:
+            item = self.items.get(clothing_id)
+            if item is None:
+                missing.append(clothing_id)
+            else:
+                found.append(item)
+        return found, missing
+
+
+class CatalogCache:
+    """
+    Process-wide catalog snapshot.
+    Loaded once at startup and replaced as a whole after catalog changes,
+    so readers always see a consistent snapshot without locking.
+    IDs missing from the snapshot are read through from the database into an
+    overlay that lives until the next reload, the snapshot itself is untouched.
+    Changes made by other workers are picked up by reloading every `refresh_interval` seconds.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._snapshot = CatalogSnapshot({}, 0)
+        self._overlay: Dict[int, CatalogItem] = {}
+        self._reload_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    async def reload(self, db: AsyncSession) -> CatalogSnapshot:
+        """
+        Load the whole catalog and atomically swap it in.
+        The version only changes when the rows did, so derived structures are not rebuilt for nothing.
+        """
+        async with self._reload_lock:
+            result = await db.execute(select(*CATALOG_COLUMNS))
+            items = {row[0]: CatalogItem(*row) for row in result}
+            if same_items(items, self._snapshot.items):
+                self._snapshot.loaded_at = time.time()
+            else:
+                self._snapshot = CatalogSnapshot(items, self._snapshot.version + 1)
+            self._overlay = {}
+            return self._snapshot
+
+    def start(self, session_factory: Callable[[], AsyncSession]):
+        """Reload periodically in the background, a refresh_interval of 0 disables it"""
+        if self.refresh_interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh(session_factory))
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh(self, session_factory: Callable[[], AsyncSession]):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with session_factory() as db:
+                    await self.reload(db)
+            except Exception as e:
+                print(f"Catalog refresh failed: {e}")
+
+    async def get_items(self, db: AsyncSession, clothing_ids: Iterable[int]) -> Tuple[List[CatalogItem], List[int]]:
+        """
+        Resolve clothing IDs to items, preserving order.
+        IDs not in the snapshot (e.g. imported by another worker) are fetched
+        from the database and kept in the overlay until the next reload.
+        Returns (items, IDs that do not exist at all).
+        """
+        clothing_ids = list(clothing_ids)
+        snapshot = self._snapshot
+        overlay = self._overlay
+        missing = [
+            clothing_id for clothing_id in clothing_ids
+            if clothing_id not in snapshot.items and clothing_id not in overlay
+        ]
+        if missing:
+            result = await db.execute(select(*CATALOG_COLUMNS).where(Clothing.id.in_(missing)))
+            fetched = {row[0]: CatalogItem(*row) for row in result}
+            # Rows read before a concurrent reload may already be stale, they are only used for this call
+            if self._snapshot is snapshot and self._overlay is overlay:
+                overlay.update(fetched)
+            else:
+                overlay = {**overlay, **fetched}
+
+        items = []
+        not_found = []
+        for clothing_id in clothing_ids:
+            item = snapshot.get(clothing_id) or overlay.get(clothing_id)
+            if item is None:
+                not_found.append(clothing_id)
+            else:
+                items.append(item)
+        return items, not_found
+
+
+def same_items(a: Dict[int, CatalogItem], b: Dict[int, CatalogItem]) -> bool:
+    """Whether two snapshots hold the same rows"""
+    if a.keys() != b.keys():
+        return False
+    fields = CatalogItem.__slots__
+    return all(
+        all(getattr(item, field) == getattr(b[clothing_id], field) for field in fields)
+        for clothing_id, item in a.items()
+    )
+
+
+catalog_cache = CatalogCache(config.CATALOG_REFRESH_INTERVAL)
+
+
+T = TypeVar("T")
+
+
+class SnapshotView(Generic[T]):
+    """
+    Structure derived from the catalog snapshot, such as an index.
+    Built off the event loop on first use and rebuilt after the snapshot is swapped.
+    """
+
+    def __init__(self, build: Callable[[CatalogSnapshot], T]):
+        self.build = build
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+        self._build_lock = asyncio.Lock()
+
+    async def get(self) -> T:
+        if self._version == catalog_cache.snapshot.version:
+            return self._value
+
+        async with self._build_lock:
+            snapshot = catalog_cache.snapshot
+            if self._version != snapshot.version:
+                self._value = await asyncio.to_thread(self.build, snapshot)
+                self._version = snapshot.version
+            return self._value
@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.catalog_cache import CatalogSnapshot, SnapshotView
+
+SORT_COLUMNS = ("id", "price")
+
+
+class StringTable:
+    """Interned strings, each distinct value is stored once and referenced by code"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value: Optional[str]) -> int:
+        """Code of a value, -1 for None"""
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> int:
+        """Code of an already interned value, -1 when unknown"""
+        return self._codes.get(value, -1)
+
+    def value(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+
+class CatalogColumns:
+    """
+    Columnar copy of a catalog snapshot.
+    IDs, prices and category/color codes are NumPy arrays sorted by ID, text
+    fields are codes into interned string tables, so catalog-wide filters,
+    sorts and samples run vectorized instead of looping over item objects.
+    Item positions are shared by every column.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.version = snapshot.version
+        size = len(snapshot)
+
+        self.categories = StringTable()
+        self.colors = StringTable()
+        self.strings = StringTable()
+
+        self.ids = np.fromiter(sorted(snapshot.items), dtype=np.int64, count=size)
+        self.price = np.empty(size, dtype=np.float64)
+        self.category = np.empty(size, dtype=np.int32)
+        self.color = np.empty(size, dtype=np.int32)
+        self.name = np.empty(size, dtype=np.int32)
+        self.item_url = np.empty(size, dtype=np.int32)
+        self.image_url = np.empty(size, dtype=np.int32)
+
+        for position, clothing_id in enumerate(self.ids.tolist()):
+            item = snapshot.items[clothing_id]
+            self.price[position] = np.nan if item.price is None else item.price
+            self.category[position] = self.categories.intern(item.category)
+            self.color[position] = self.colors.intern(item.color)
+            self.name[position] = self.strings.intern(item.name)
+            self.item_url[position] = self.strings.intern(item.item_url)
+            self.image_url[position] = self.strings.intern(item.image_url)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def positions(self, clothing_ids: Iterable[int]) -> np.ndarray:
+        """Positions of the given IDs, IDs not in the catalog are dropped"""
+        ids = np.fromiter(clothing_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        found = positions < self.size
+        found[found] = self.ids[positions[found]] == ids[found]
+        return positions[found]
+
+    def mask(
+            self,
+            categories: Optional[Iterable[str]] = None,
+            colors: Optional[Iterable[str]] = None,
+            min_price: Optional[float] = None,
+            max_price: Optional[float] = None,
+            within: Optional[Iterable[int]] = None
+    ) -> np.ndarray:
+        """Boolean mask of the items matching every given condition"""
+        mask = np.ones(self.size, dtype=bool)
+        if categories:
+            mask &= np.isin(self.category, [self.categories.code(value) for value in categories])
+        if colors:
+            mask &= np.isin(self.color, [self.colors.code(value) for value in colors])
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if within is not None:
+            within_mask = np.zeros(self.size, dtype=bool)
+            within_mask[self.positions(within)] = True
+            mask &= within_mask
+        return mask
+
+    def filter(self, mask: np.ndarray) -> np.ndarray:
+        """IDs of the items selected by a mask"""
+        return self.ids[mask]
+
+    def _sort_key(self, by: str) -> np.ndarray:
+        if by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {by}")
+        return self.ids if by == "id" else self.price
+
+    def sort(self, mask: Optional[np.ndarray] = None, by: str = "price", descending: bool = False) -> np.ndarray:
+        """IDs of the selected items ordered by a column, items without a price go last"""
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(self.size)
+        key = self._sort_key(by)[positions]
+        order = np.lexsort((self.ids[positions], -key if descending else key))
+        return self.ids[positions[order]]
+
+    def top_k(self, k: int, mask: Optional[np.ndarray] = None, by: str = "price", descending: bool = False) -> np.ndarray:
+        """
+        The first k IDs of sort() without sorting every selected item:
+        a partition picks the k candidates and only those are sorted.
+        """
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(self.size)
+        if k <= 0:
+            return self.ids[:0]
+        if k < len(positions):
+            key = self._sort_key(by)[positions]
+            # NaN prices rank after every real price
+            key = np.where(np.isnan(key), np.inf, -key if descending else key)
+            # Keep everything tied with the k-th value so ties are still ordered by ID
+            kth = np.partition(key, k - 1)[k - 1]
+            positions = positions[key <= kth]
+        key = self._sort_key(by)[positions]
+        order = np.lexsort((self.ids[positions], -key if descending else key))
+        return self.ids[positions[order[:k]]]
+
+    def sample(self, count: int, exclude: Iterable[int] = (), rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Up to count random distinct IDs that are not in exclude.
+        Draws random positions and rejects the excluded ones by binary search
+        in their sorted positions, so the cost follows count and len(exclude)
+        rather than the catalog size. Only when most of the remaining catalog
+        is wanted does it sample from the explicit complement.
+        """
+        rng = rng or np.random.default_rng()
+        excluded = np.unique(self.positions(exclude))
+        available = self.size - len(excluded)
+        count = min(count, available)
+        if count <= 0:
+            return self.ids[:0]
+
+        if count * 2 > available:
+            allowed = np.ones(self.size, dtype=bool)
+            allowed[excluded] = False
+            return rng.choice(self.ids[allowed], count, replace=False)
+
+        chosen = np.empty(0, dtype=np.int64)
+        while len(chosen) < count:
+            drawn = rng.integers(0, self.size, size=(count - len(chosen)) * 2)
+            if len(excluded):
+                at = np.minimum(np.searchsorted(excluded, drawn), len(excluded) - 1)
+                drawn = drawn[excluded[at] != drawn]
+            chosen = np.union1d(chosen, drawn)
+        # union1d sorts, so pick the final subset at random rather than the lowest positions
+        return self.ids[rng.choice(chosen, count, replace=False)]
+
+catalog_columns: SnapshotView[CatalogColumns] = SnapshotView(CatalogColumns)
@@ -0,0 +1,96 @@
+"""
+Pure normalization of raw catalog entries into clothing table rows.
+Kept free of database imports so it can run cheaply inside pool workers.
+"""
+import hashlib
+from typing import List, Optional, Tuple
+
+from app.config import config
+
+# Fields that come from the supplier feed and make up the content hash
+CONTENT_FIELDS = ("name", "color", "image_url", "item_url", "price")
+
+
+def parse_price(raw_price) -> Optional[float]:
+    """Clean price - remove currency symbol and spaces, convert to float"""
+    if raw_price is None:
+        return None
+    if isinstance(raw_price, (int, float)):
+        return float(raw_price)
+
+    price_str = str(raw_price).replace('₽', '').replace(' ', '').replace('\xa0', '').strip()
+    try:
+        return float(price_str) if price_str else None
+    except (ValueError, TypeError):
+        return None
+
+
+def extract_category_slug(item_url: Optional[str]) -> Optional[str]:
+    """Return the URL segment after /catalog/, e.g. 'obuv' for .../catalog/obuv/womencollection/..."""
+    if not item_url:
+        return None
+
+    url_parts = item_url.split('/')
+    try:
+        catalog_index = url_parts.index('catalog')
+    except ValueError:
+        return None
+
+    if catalog_index + 1 < len(url_parts):
+        return url_parts[catalog_index + 1] or None
+    return None
+
+
+def resolve_category(item_url: Optional[str]) -> Optional[str]:
+    """Map an item URL to its display category using config.CATEGORY_NAMES"""
+    return config.CATEGORY_NAMES.get(extract_category_slug(item_url))
+
+
+def compute_content_hash(row: dict) -> str:
+    """Stable hash of the supplier-provided fields of a clothing row"""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in CONTENT_FIELDS:
+        value = row.get(field)
+        digest.update(b'\x00' if value is None else repr(value).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def build_clothing_row(clothing_id: int, item_data: dict) -> dict:
+    """Convert a raw catalog entry into a ready-to-insert row for the clothing table"""
+    item_url = item_data.get('item_url')
+    row = {
+        "id": clothing_id,
+        "name": item_data['name'],
+        "color": item_data['color'],
+        "image_url": item_data['image_url'],
+        "item_url": item_url,
+        "price": parse_price(item_data.get('price')),
+        "category": resolve_category(item_url),
+    }
+    row["content_hash"] = compute_content_hash(row)
+    return row
+
+
+def normalize_chunk(items: List[Tuple[str, dict]]) -> Tuple[List[dict], int, List[int]]:
+    """
+    Normalize a chunk of (item_id, item_data) pairs.
+    Returns the rows in input order, the number of entries that were skipped
+    because their ID or payload was unusable, and the IDs of skipped entries
+    whose ID itself was valid, so a sync does not take them for deleted items.
+    """
+    rows = []
+    skipped = 0
+    skipped_ids = []
+    for item_id, item_data in items:
+        try:
+            clothing_id = int(item_id)
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        try:
+            rows.append(build_clothing_row(clothing_id, item_data))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            skipped += 1
+            skipped_ids.append(clothing_id)
+    return rows, skipped, skipped_ids
@@ -0,0 +1,78 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from app.config import config
+from app.services.catalog_normalize import normalize_chunk
+from app.services.catalog_reader import read_catalog, iter_chunks
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_import_executor() -> ProcessPoolExecutor:
+    """
+    Process pool shared by all imports, created on first use.
+    Workers are spawned rather than forked: the server already runs threads by
+    then, and a fresh interpreter only imports the normalization module.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=config.IMPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_import_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def normalize_chunks(
+        chunks: Iterable[list],
+        executor=None,
+        max_pending: Optional[int] = None
+) -> AsyncIterator[Tuple[List[dict], int, List[int]]]:
+    """
+    Normalize raw chunks in a worker pool and yield (rows, skipped, skipped_ids) in input order.
+    Reading the source runs in a thread and at most `max_pending` chunks are in
+    flight, so the event loop stays free and memory stays bounded while the
+    consumer writes earlier chunks to the database.
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor or get_import_executor()
+    max_pending = max_pending or config.IMPORT_WORKERS * 2
+
+    chunk_iter = iter(chunks)
+    pending = deque()
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                chunk = await loop.run_in_executor(None, next, chunk_iter, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending.append(loop.run_in_executor(executor, normalize_chunk, chunk))
+
+            if not pending:
+                return
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def normalize_catalog(
+        path,
+        chunk_size: Optional[int] = None,
+        digest=None
+) -> AsyncIterator[Tuple[List[dict], int, List[int]]]:
+    """Stream a catalog file through the normalization pool, hashing it into `digest` if given"""
+    return normalize_chunks(iter_chunks(read_catalog(path, digest=digest), chunk_size or config.IMPORT_CHUNK_SIZE))
@@ -0,0 +1,191 @@
+import gzip
+import io
+import json
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, TextIO, Tuple
+
+# Characters read from the source per refill of the parse buffer
+READ_CHUNK_SIZE = 64 * 1024
+
+# Longest single entry accepted, a larger one is reported as malformed input
+MAX_VALUE_SIZE = 64 * 1024 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',:[]{}"'
+
+
+def _may_continue(error: json.JSONDecodeError, buf: str) -> bool:
+    """
+    Whether a decode error can be caused by the value continuing past the end
+    of the buffer: an open string, or a single cut token at the very end.
+    Anything else is malformed no matter what follows.
+    """
+    if error.msg.startswith("Unterminated string"):
+        return True
+    return not any(char in _DELIMITERS for char in buf[error.pos:])
+
+
+class HashingReader(io.RawIOBase):
+    """Binary stream that feeds every byte read through it to a hash object"""
+
+    def __init__(self, stream: BinaryIO, digest):
+        self.stream = stream
+        self.digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        self.digest.update(data)
+        return len(data)
+
+    def drain(self, chunk_size: int = 1024 * 1024):
+        """Hash whatever the reader above did not ask for, e.g. whitespace after the object"""
+        for chunk in iter(lambda: self.stream.read(chunk_size), b''):
+            self.digest.update(chunk)
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+def open_catalog(path, digest=None) -> TextIO:
+    """
+    Open a catalog dump as a text stream.
+    Gzip and zstd compressed files are detected by their magic bytes and
+    decompressed on the fly, so the file name does not matter.
+    With a `digest`, the decompressed bytes are hashed as the parser reads them.
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        binary = gzip.open(path, 'rb')
+    elif magic == ZSTD_MAGIC:
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("The zstandard package is required to read zstd-compressed catalogs")
+        binary = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        )
+    else:
+        binary = open(path, 'rb')
+
+    if digest is not None:
+        binary = io.BufferedReader(HashingReader(binary, digest))
+    return io.TextIOWrapper(binary, encoding='utf-8')
+
+
+def iter_catalog_items(stream: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, dict]]:
+    """
+    Incrementally parse a top-level JSON object and yield (item_id, item_data) pairs.
+    Only the current chunk and the entry being decoded are held in memory,
+    so peak memory does not depend on the size of the file.
+    Raises json.JSONDecodeError on malformed or truncated input.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill(size: int = chunk_size) -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    def expect(char: str):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", buf, pos)
+        pos += 1
+
+    def decode_value():
+        nonlocal pos
+        skip_whitespace()
+        # Each refill for the same value reads twice as much, so a large value
+        # is parsed and copied a logarithmic number of times, not once per chunk
+        size = chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if not _may_continue(e, buf):
+                    raise
+                if len(buf) - pos > MAX_VALUE_SIZE:
+                    raise json.JSONDecodeError(f"Value longer than {MAX_VALUE_SIZE} characters", buf, pos)
+                # The value continues in the next chunk
+                if fill(size):
+                    size *= 2
+                    continue
+                raise
+            # A number ending exactly at the buffer edge may be cut in half
+            if end == len(buf) and fill():
+                continue
+            pos = end
+            return value
+
+    expect('{')
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == '}':
+        return
+
+    while True:
+        key = decode_value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", buf, pos)
+        expect(':')
+        value = decode_value()
+        yield key, value
+
+        skip_whitespace()
+        if pos >= len(buf):
+            raise json.JSONDecodeError("Unterminated object", buf, pos)
+        if buf[pos] == '}':
+            return
+        expect(',')
+
+
+def read_catalog(path, chunk_size: int = READ_CHUNK_SIZE, digest=None) -> Iterator[Tuple[str, dict]]:
+    """
+    Stream (item_id, item_data) pairs from a (possibly compressed) catalog file.
+    A `digest` has seen the whole decompressed file once the last pair is consumed.
+    """
+    with open_catalog(path, digest) as stream:
+        yield from iter_catalog_items(stream, chunk_size)
+        if digest is not None:
+            stream.buffer.raw.drain()
+
+
+def iter_chunks(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most `size` elements"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
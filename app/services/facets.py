@@ -0,0 +1,250 @@
+import asyncio
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.database.models import user_clothing
+from app.services.catalog_columns import CatalogColumns, catalog_columns
+from app.services.serializers import UNKNOWN_CATEGORY
+
+FACETS = ("category", "color", "price")
+
+# Upper bounds of the price buckets, the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = (1000, 3000, 5000, 10000, 20000)
+
+
+def price_bucket(price: Optional[float]) -> Optional[str]:
+    """Label of the price bucket a price falls into, e.g. "1000-3000" or "20000+" """
+    if price is None:
+        return None
+    position = bisect_right(PRICE_BUCKET_BOUNDS, price)
+    if position == len(PRICE_BUCKET_BOUNDS):
+        return f"{PRICE_BUCKET_BOUNDS[-1]}+"
+    lower = PRICE_BUCKET_BOUNDS[position - 1] if position else 0
+    return f"{lower}-{PRICE_BUCKET_BOUNDS[position]}"
+
+
+PRICE_BUCKETS = tuple(price_bucket(bound - 1) for bound in PRICE_BUCKET_BOUNDS) + (price_bucket(PRICE_BUCKET_BOUNDS[-1]),)
+
+
+def bitmap_from_positions(positions: np.ndarray, size: int) -> int:
+    """Build an int bitmap with the given bit positions set"""
+    bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+    np.bitwise_or.at(bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+    return int.from_bytes(bits.tobytes(), "little")
+
+
+def bitmap_to_mask(bitmap: int, size: int) -> np.ndarray:
+    """Boolean array with True at the set bit positions"""
+    bits = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(bits, bitorder="little")[:size].astype(bool)
+
+
+def _group_positions(codes: np.ndarray) -> Dict[int, np.ndarray]:
+    """Positions of every code of a column, in one sort instead of one scan per code"""
+    order = np.argsort(codes, kind="stable")
+    values, starts = np.unique(codes[order], return_index=True)
+    return dict(zip(values.tolist(), np.split(order, starts[1:])))
+
+
+class FacetIndex:
+    """
+    Bitmap indexes over category, color and price bucket of one catalog snapshot.
+    Bit positions are the positions of the columnar catalog; a Python int per
+    facet value has the bits of the items carrying that value set, so filters
+    combine with & and | and counts are bit counts.
+    """
+
+    def __init__(self, columns: CatalogColumns):
+        self.version = columns.version
+        self.columns = columns
+        self.size = columns.size
+        self.all_items = (1 << self.size) - 1
+
+        categories = {}
+        for code, positions in _group_positions(columns.category).items():
+            value = columns.categories.value(code) or UNKNOWN_CATEGORY
+            categories[value] = categories.get(value, 0) | bitmap_from_positions(positions, self.size)
+
+        colors = {
+            columns.colors.value(code): bitmap_from_positions(positions, self.size)
+            for code, positions in _group_positions(columns.color).items()
+            if code >= 0
+        }
+
+        priced = np.flatnonzero(~np.isnan(columns.price))
+        buckets = np.searchsorted(PRICE_BUCKET_BOUNDS, columns.price[priced], side="right")
+        prices = {
+            PRICE_BUCKETS[bucket]: bitmap_from_positions(priced[positions], self.size)
+            for bucket, positions in _group_positions(buckets).items()
+        }
+
+        self.bitmaps: Dict[str, Dict[str, int]] = {"category": categories, "color": colors, "price": prices}
+
+    def bitmap_of_ids(self, clothing_ids: Iterable[int]) -> int:
+        """Bitmap of the given clothing IDs, IDs not in the snapshot are ignored"""
+        return bitmap_from_positions(self.columns.positions(clothing_ids), self.size)
+
+    def filter_bitmap(self, facet: str, values: List[str]) -> Optional[int]:
+        """Items having any of the values of one facet, None when the facet is not filtered"""
+        if not values:
+            return None
+        bitmaps = self.bitmaps[facet]
+        result = 0
+        for value in values:
+            result |= bitmaps.get(value, 0)
+        return result
+
+    def query(
+            self,
+            base: int,
+            filters: Dict[str, List[str]],
+            offset: int = 0,
+            limit: int = 100,
+            sort: Optional[str] = None,
+            descending: bool = False
+    ) -> Tuple[List[int], int, Dict[str, List[Tuple[str, int]]]]:
+        """
+        Apply facet filters (values of one facet are OR-ed, facets are AND-ed) within base.
+        Counts of each facet are taken with the filters of the other facets applied,
+        so selecting a value does not hide its alternatives.
+        Matching IDs are ordered by ID, or by a catalog column when sort is given.
+        Returns (page of matching IDs, total matches, {facet: [(value, count)]}).
+        """
+        selected = {facet: self.filter_bitmap(facet, filters.get(facet)) for facet in FACETS}
+
+        matches = base
+        for bitmap in selected.values():
+            if bitmap is not None:
+                matches &= bitmap
+
+        counts = {}
+        for facet in FACETS:
+            scope = base
+            for other, bitmap in selected.items():
+                if other != facet and bitmap is not None:
+                    scope &= bitmap
+            facet_counts = [
+                (value, (scope & bitmap).bit_count())
+                for value, bitmap in self.bitmaps[facet].items()
+            ]
+            facet_counts = [(value, count) for value, count in facet_counts if count]
+            if facet == "price":
+                facet_counts.sort(key=lambda entry: PRICE_BUCKETS.index(entry[0]))
+            else:
+                facet_counts.sort(key=lambda entry: (-entry[1], entry[0]))
+            counts[facet] = facet_counts
+
+        ids = []
+        if limit > 0 and matches:
+            mask = bitmap_to_mask(matches, self.size)
+            if sort:
+                ids = self.columns.top_k(offset + limit, mask, by=sort, descending=descending)[offset:].tolist()
+            else:
+                ids = self.columns.ids[np.flatnonzero(mask)[offset:offset + limit]].tolist()
+        return ids, matches.bit_count(), counts
+
+
+class CatalogFacets:
+    """
+    Keeps the facet index in line with the catalog snapshot and caches the
+    wardrobe bitmap of recently seen users.
+    Wardrobe bitmaps are dropped when the user's ownings change and expire
+    after FACET_CACHE_TTL seconds, so changes made by other workers show up too.
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._index: Optional[FacetIndex] = None
+        self._build_lock = asyncio.Lock()
+        # user_id -> (index version, expires_at, bitmap)
+        self._wardrobes: OrderedDict = OrderedDict()
+
+    async def get_index(self) -> FacetIndex:
+        """Index of the current columnar catalog, rebuilt off the event loop when it changed"""
+        columns = await catalog_columns.get()
+        if self._index is not None and self._index.version == columns.version:
+            return self._index
+
+        async with self._build_lock:
+            if self._index is None or self._index.version != columns.version:
+                self._index = await asyncio.to_thread(FacetIndex, columns)
+            return self._index
+
+    def cached_wardrobe(self, index: FacetIndex, user_id: int) -> Optional[int]:
+        entry = self._wardrobes.get(user_id)
+        if entry is None:
+            return None
+        version, expires_at, bitmap = entry
+        if version != index.version or expires_at <= time.monotonic():
+            del self._wardrobes[user_id]
+            return None
+        self._wardrobes.move_to_end(user_id)
+        return bitmap
+
+    def store_wardrobe(self, index: FacetIndex, user_id: int, clothing_ids: Iterable[int]) -> int:
+        bitmap = index.bitmap_of_ids(clothing_ids)
+        self._wardrobes[user_id] = (index.version, time.monotonic() + self.ttl, bitmap)
+        self._wardrobes.move_to_end(user_id)
+        while len(self._wardrobes) > self.max_users:
+            self._wardrobes.popitem(last=False)
+        return bitmap
+
+    async def get_wardrobe(
+            self,
+            db: AsyncSession,
+            index: FacetIndex,
+            user_id: int,
+            clothing_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """Bitmap of a user's owned clothes, loaded from the database unless cached or given"""
+        bitmap = self.cached_wardrobe(index, user_id) if clothing_ids is None else None
+        if bitmap is not None:
+            return bitmap
+
+        if clothing_ids is None:
+            result = await db.execute(
+                select(user_clothing.c.clothing_id).where(user_clothing.c.user_id == user_id)
+            )
+            clothing_ids = result.scalars().all()
+        return self.store_wardrobe(index, user_id, clothing_ids)
+
+    async def query(
+            self,
+            db: AsyncSession,
+            user_id: Optional[int],
+            filters: Dict[str, List[str]],
+            offset: int = 0,
+            limit: int = 100,
+            clothing_ids: Optional[Iterable[int]] = None,
+            sort: Optional[str] = None,
+            descending: bool = False
+    ):
+        """
+        Facet query over a user's wardrobe, or over the whole catalog when user_id is None.
+        Returns (page of matching IDs, total matches, {facet: [(value, count)]}).
+        """
+        index = await self.get_index()
+        if user_id is None:
+            base = index.all_items
+        else:
+            base = await self.get_wardrobe(db, index, user_id, clothing_ids)
+        return index.query(base, filters, offset, limit, sort, descending)
+
+    def invalidate_user(self, user_id: int):
+        """Forget a user's wardrobe bitmap after their ownings changed"""
+        self._wardrobes.pop(user_id, None)
+
+    def clear(self):
+        """Forget every wardrobe bitmap after ownings of many users changed"""
+        self._wardrobes.clear()
+
+
+catalog_facets = CatalogFacets(config.FACET_CACHE_SIZE, config.FACET_CACHE_TTL)
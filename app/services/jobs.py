@@ -0,0 +1,148 @@
+import asyncio
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from app.config import config
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """A long-running admin operation with progress counters"""
+
+    def __init__(self, kind: str, description: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.status = QUEUED
+        self.processed = 0
+        self.total = None
+        self.message = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Processed units per second since the job started"""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def progress(self, processed: int, total: Optional[int] = None):
+        """Progress callback handed to the operation"""
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        self._notify()
+
+    def _notify(self):
+        # Swap the event so every current waiter wakes up and later waiters block again
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "description": self.description,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "throughput": round(self.throughput, 1),
+            "elapsed": round(self.elapsed, 2),
+            "message": self.message,
+            "error": self.error,
+        }
+
+
+class JobRunner:
+    """In-process queue for admin jobs with bounded concurrency"""
+
+    def __init__(self, max_concurrency: int, history_size: int = 100):
+        self.max_concurrency = max_concurrency
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._tasks = set()
+        self._semaphore = None
+
+    def submit(self, kind: str, description: str, operation: Callable[[Job], Awaitable[str]]) -> Job:
+        """
+        Queue an operation and return its job handle immediately.
+        The operation receives the job, reports progress through job.progress()
+        and returns the success message.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        job = Job(kind, description)
+        self._jobs[job.id] = job
+        self._trim_history()
+
+        task = asyncio.create_task(self._run(job, operation))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 20) -> list:
+        return list(reversed(self._jobs.values()))[:limit]
+
+    async def _run(self, job: Job, operation: Callable[[Job], Awaitable[str]]):
+        async with self._semaphore:
+            job.status = RUNNING
+            job.started_at = time.time()
+            job._notify()
+            try:
+                job.message = await operation(job)
+                job.status = SUCCEEDED
+            except Exception as e:
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+                traceback.print_exc()
+                job.error = str(e)
+                job.status = FAILED
+            finally:
+                job.finished_at = time.time()
+                job._notify()
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the history is full
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history_size:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+job_runner = JobRunner(config.ADMIN_JOB_CONCURRENCY)
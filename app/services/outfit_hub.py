@@ -0,0 +1,215 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.config import config
+from app.services.serializers import dumps_text, loads
+
+# Reply types that change a user's outfits and are fanned out to their other sockets
+OUTFIT_CHANGE_EVENTS = ("outfit_created", "outfit_updated", "outfit_deleted")
+
+# Seconds a single subscriber may take to accept a pushed frame
+SEND_TIMEOUT = 5.0
+
+# Seconds between attempts to reconnect a dropped LISTEN connection
+RECONNECT_DELAY = 3.0
+
+Deliver = Callable[[int, str], Awaitable[None]]
+Resync = Callable[[], Awaitable[None]]
+
+
+class InProcessBackend:
+    """Delivers events to sockets of this process only"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver, resync: Optional[Resync] = None):
+        self._deliver = deliver
+
+    async def publish(self, user_id: int, payload: str):
+        if self._deliver:
+            await self._deliver(user_id, payload)
+
+    async def stop(self):
+        self._deliver = None
+
+
+class PostgresNotifyBackend:
+    """
+    Fans events out across worker processes through Postgres LISTEN/NOTIFY,
+    every worker (including the publisher) receives each event once.
+    The LISTEN connection only listens, events are published through a small
+    pool so concurrent publishers do not share one connection. A dropped
+    listener is reconnected, and since events sent meanwhile are lost, every
+    local subscriber is then told to pull its changes.
+    """
+
+    CHANNEL = "outfit_events"
+    # NOTIFY payloads are limited to 8000 bytes
+    MAX_PAYLOAD = 7500
+    PUBLISH_POOL_SIZE = 4
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        self._pool = None
+        self._deliver: Optional[Deliver] = None
+        self._resync: Optional[Resync] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._tasks = set()
+
+    async def start(self, deliver: Deliver, resync: Optional[Resync] = None):
+        import asyncpg
+
+        self._deliver = deliver
+        self._resync = resync
+        self._stopping = False
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.PUBLISH_POOL_SIZE)
+        await self._listen()
+
+    async def _listen(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        self._conn.add_termination_listener(self._on_termination)
+        await self._conn.add_listener(self.CHANNEL, self._on_notification)
+
+    def _on_termination(self, connection):
+        if not self._stopping and self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        try:
+            while not self._stopping:
+                await asyncio.sleep(RECONNECT_DELAY)
+                try:
+                    await self._listen()
+                except Exception as e:
+                    print(f"Outfit hub listener reconnect failed: {e}")
+                    continue
+                print("Outfit hub listener reconnected")
+                if self._resync:
+                    await self._resync()
+                return
+        finally:
+            self._reconnect_task = None
+
+    def _on_notification(self, connection, pid, channel, payload: str):
+        user_id, _, body = payload.partition(":")
+        task = asyncio.create_task(self._deliver(int(user_id), body))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def publish(self, user_id: int, payload: str):
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            # Too large to ship, tell clients to pull the change themselves
+            envelope = loads(payload)
+            envelope["event"] = {"type": "outfits_changed"}
+            payload = dumps_text(envelope)
+        await self._pool.execute("SELECT pg_notify($1, $2)", self.CHANNEL, f"{user_id}:{payload}")
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.remove_listener(self.CHANNEL, self._on_notification)
+            await self._conn.close()
+        self._conn = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+class OutfitHub:
+    """
+    Pub/sub hub keyed by user ID.
+    Every /ws/outfits socket subscribes for its user; outfit changes made on
+    one socket are pushed to all the user's other sockets through the backend.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.node_id = uuid.uuid4().hex[:8]
+        self._subscribers: Dict[int, Set] = defaultdict(set)
+
+    async def start(self):
+        await self.backend.start(self._deliver, self._resync)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def socket_token(self, websocket) -> str:
+        return f"{self.node_id}:{id(websocket)}"
+
+    def subscribe(self, user_id: int, websocket):
+        self._subscribers[user_id].add(websocket)
+
+    def unsubscribe(self, user_id: int, websocket):
+        sockets = self._subscribers.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(sockets) for sockets in self._subscribers.values())
+
+    async def publish(self, user_id: int, event: dict, source=None):
+        """
+        Send an outfit change to the user's sockets except the one it came from.
+        Failures are logged only, the change itself is already committed and
+        other sockets still catch up on their next delta load.
+        """
+        payload = dumps_text({
+            "origin": self.socket_token(source) if source is not None else None,
+            "event": event,
+        })
+        try:
+            await self.backend.publish(user_id, payload)
+        except Exception as e:
+            print(f"Failed to publish outfit event for user {user_id}: {e}")
+
+    async def publish_reply(self, user_id: int, reply: dict, source=None):
+        """Publish the outfit changes contained in a WebSocket reply, including batch results"""
+        results = reply.get("results", []) if reply.get("type") == "batch_result" else [reply]
+        for result in results:
+            if result.get("type") in OUTFIT_CHANGE_EVENTS:
+                await self.publish(user_id, result, source)
+
+    async def _resync(self):
+        """Tell every local socket to pull its outfit changes, after events may have been lost"""
+        payload = dumps_text({"origin": None, "event": {"type": "outfits_changed"}})
+        await asyncio.gather(*(self._deliver(user_id, payload) for user_id in list(self._subscribers)))
+
+    async def _deliver(self, user_id: int, payload: str):
+        sockets = self._subscribers.get(user_id)
+        if not sockets:
+            return
+
+        envelope = loads(payload)
+        frame = dumps_text({"type": "outfit_event", "event": envelope["event"]})
+        targets = [ws for ws in sockets if self.socket_token(ws) != envelope.get("origin")]
+
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_text(frame), SEND_TIMEOUT) for ws in targets),
+            return_exceptions=True
+        )
+        for ws, result in zip(targets, results):
+            if isinstance(result, Exception):
+                # Dead or stuck socket, its own handler will clean up on disconnect
+                self.unsubscribe(user_id, ws)
+
+
+def create_outfit_hub() -> OutfitHub:
+    """Build the hub with the backend chosen by OUTFIT_HUB_BACKEND"""
+    if config.OUTFIT_HUB_BACKEND == "postgres":
+        dsn = config.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return OutfitHub(PostgresNotifyBackend(dsn))
+    return OutfitHub(InProcessBackend())
+
+
+outfit_hub = create_outfit_hub()
@@ -0,0 +1,317 @@
+import asyncio
+import heapq
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.catalog_cache import CatalogSnapshot, SnapshotView
+from app.services.stemmer import stem
+
+# Term weights of the indexed fields
+NAME_WEIGHT = 2
+COLOR_WEIGHT = 1
+
+# Prefixes shorter than this are matched as whole words only
+MIN_PREFIX_LENGTH = 2
+
+# Most vocabulary words a prefix is expanded to, the most frequent are kept
+MAX_PREFIX_EXPANSIONS = 50
+
+# Vocabulary words looked at when completing a prefix
+MAX_SUGGEST_SCAN = 2000
+
+# Catalog-wide query results kept per index
+RANKED_CACHE_SIZE = 256
+
+# Sets of the longest ID lists are built with the index, so a cold broad
+# query only intersects them. Lists shorter than the minimum are cheap to
+# turn into a set per query.
+PRECOMPUTED_SETS = 64
+PRECOMPUTED_SET_MIN_LENGTH = 1024
+
+# A restricting ID set this many times smaller than a posting list is
+# checked by binary search instead of building a set of the list
+WITHIN_LOOKUP_RATIO = 16
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase words of a text, with "ё" folded to "е" """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower().replace("ё", "е"))
+
+
+def _contains(ids: array, clothing_id: int) -> bool:
+    position = bisect_left(ids, clothing_id)
+    return position < len(ids) and ids[position] == clothing_id
+
+
+class Postings:
+    """Clothing IDs containing a term, grouped by the term weight in each item"""
+
+    __slots__ = ("buckets", "count", "idf")
+
+    def __init__(self, buckets: Dict[int, array], idf: float):
+        # (weight, sorted IDs) with the heaviest weight first
+        self.buckets = sorted(buckets.items(), reverse=True)
+        self.count = sum(len(ids) for ids in buckets.values())
+        self.idf = idf
+
+    def entries(self) -> List[Tuple[float, array]]:
+        """(score contribution, IDs) of each weight group"""
+        return [(weight * self.idf, ids) for weight, ids in self.buckets]
+
+
+class SearchIndex:
+    """
+    Inverted index over clothing names and colors of one catalog snapshot.
+    Terms are Russian Snowball stems; the original words are kept in a sorted
+    vocabulary for prefix completion.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.version = snapshot.version
+        self.item_count = len(snapshot)
+
+        term_buckets: Dict[str, Dict[int, array]] = {}
+        word_counts: Dict[str, int] = {}
+        stems: Dict[str, str] = {}
+
+        for clothing_id in sorted(snapshot.items):
+            item = snapshot.items[clothing_id]
+            weights: Dict[str, int] = {}
+            for weight, text in ((NAME_WEIGHT, item.name), (COLOR_WEIGHT, item.color)):
+                for word in tokenize(text):
+                    term = stems.get(word)
+                    if term is None:
+                        term = stems[word] = stem(word)
+                    weights[term] = min(weights.get(term, 0) + weight, 255)
+                    word_counts[word] = word_counts.get(word, 0) + 1
+
+            for term, weight in weights.items():
+                buckets = term_buckets.get(term)
+                if buckets is None:
+                    buckets = term_buckets[term] = {}
+                ids = buckets.get(weight)
+                if ids is None:
+                    ids = buckets[weight] = array("q")
+                ids.append(clothing_id)
+
+        total = max(self.item_count, 1)
+        self.postings: Dict[str, Postings] = {}
+        for term, buckets in term_buckets.items():
+            count = sum(len(ids) for ids in buckets.values())
+            self.postings[term] = Postings(buckets, math.log(1 + total / count))
+        self.stems = stems
+
+        # Keyed by id() of the ID list, as in match_groups
+        longest = heapq.nlargest(
+            PRECOMPUTED_SETS,
+            (ids for postings in self.postings.values() for _, ids in postings.buckets
+             if len(ids) >= PRECOMPUTED_SET_MIN_LENGTH),
+            key=len
+        )
+        self.id_sets: Dict[int, frozenset] = {id(ids): frozenset(ids) for ids in longest}
+
+        # Filled from the event loop and from worker threads
+        self._ranked: OrderedDict = OrderedDict()
+        self._ranked_lock = threading.Lock()
+        self.words: List[str] = sorted(word_counts)
+        self.word_counts = word_counts
+
+    def words_with_prefix(self, prefix: str, limit: int) -> List[str]:
+        """Most frequent vocabulary words starting with prefix"""
+        start = bisect_left(self.words, prefix)
+        matches = []
+        for word in self.words[start:start + MAX_SUGGEST_SCAN]:
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+        return heapq.nlargest(limit, matches, key=lambda word: (self.word_counts[word], word))
+
+    def stem(self, word: str) -> str:
+        term = self.stems.get(word)
+        return term if term is not None else stem(word)
+
+    def query_terms(self, query: str) -> Optional[List[List[Tuple[float, array]]]]:
+        """
+        (score, IDs) groups of each query word, the last one expanded as a prefix
+        unless the query ends with a space. Returns None when some word matches nothing.
+        """
+        words = tokenize(query)
+        if not words:
+            return None
+
+        prefix = words[-1] if not query[-1:].isspace() and len(words[-1]) >= MIN_PREFIX_LENGTH else None
+        if prefix is not None:
+            words = words[:-1]
+
+        terms = []
+        for word in words:
+            postings = self.postings.get(self.stem(word))
+            if postings is None:
+                return None
+            terms.append(postings.entries())
+
+        if prefix is not None:
+            expanded = {self.stem(prefix)}
+            expanded.update(self.stem(word) for word in self.words_with_prefix(prefix, MAX_PREFIX_EXPANSIONS))
+            entries = [entry for term in expanded if term in self.postings for entry in self.postings[term].entries()]
+            if not entries:
+                return None
+            terms.append(entries)
+        return terms
+
+    def match_groups(self, terms, within: Optional[Set[int]] = None) -> Iterator[Tuple[float, set]]:
+        """
+        Matching IDs grouped by score, highest score first.
+        Every combination of weight groups of the query words has a fixed score,
+        so results are collected combination by combination using set
+        intersections instead of scoring items one by one.
+        """
+        combinations = sorted(
+            ((sum(score for score, _ in combination), [ids for _, ids in combination])
+             for combination in product(*terms)),
+            key=lambda combination: combination[0],
+            reverse=True
+        )
+
+        # Sets are built once per query even when an ID list takes part in several combinations,
+        # those of the longest lists were built with the index
+        sets = dict(self.id_sets)
+
+        def as_set(ids: array) -> set:
+            cached = sets.get(id(ids))
+            if cached is None:
+                cached = sets[id(ids)] = set(ids)
+            return cached
+
+        matched = set()
+        for score, id_lists in combinations:
+            id_lists.sort(key=len)
+            if within is not None and len(within) * WITHIN_LOOKUP_RATIO < len(id_lists[0]):
+                # A small wardrobe is checked against the sorted ID lists directly
+                ids = {clothing_id for clothing_id in within
+                       if all(_contains(other, clothing_id) for other in id_lists)}
+            else:
+                ids = as_set(id_lists[0])
+                if within is not None:
+                    ids = ids & within
+                for other in id_lists[1:]:
+                    if not ids:
+                        break
+                    ids = ids & as_set(other)
+
+            # An item may match several prefix expansions, it keeps its best score
+            ids = ids - matched
+            if ids:
+                matched.update(ids)
+                yield score, ids
+
+    @staticmethod
+    def _ranked_key(query: str) -> tuple:
+        return tuple(tokenize(query)), query[-1:].isspace()
+
+    def is_ranked(self, query: str) -> bool:
+        """Whether the catalog-wide results of a query are cached"""
+        return self._ranked_key(query) in self._ranked
+
+    def ranked(self, query: str) -> List[Tuple[float, array]]:
+        """
+        Catalog-wide (score, sorted IDs) groups of a query, cached for repeated and paged queries.
+        A cold broad query still sorts every match, CatalogSearch runs it off the event loop.
+        """
+        key = self._ranked_key(query)
+        with self._ranked_lock:
+            groups = self._ranked.get(key)
+            if groups is not None:
+                self._ranked.move_to_end(key)
+                return groups
+
+        terms = self.query_terms(query)
+        groups = [(score, array("q", sorted(ids))) for score, ids in self.match_groups(terms)] if terms else []
+        with self._ranked_lock:
+            self._ranked[key] = groups
+            if len(self._ranked) > RANKED_CACHE_SIZE:
+                self._ranked.popitem(last=False)
+        return groups
+
+    def search(
+            self,
+            query: str,
+            offset: int = 0,
+            limit: int = 20,
+            within: Optional[Set[int]] = None
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Ranked search, all query words must match, ties are ordered by ID.
+        `within` restricts results to a set of clothing IDs, e.g. a user's wardrobe.
+        Returns ([(clothing_id, score)] for the requested page, total matches).
+        """
+        end = offset + limit
+        page = []
+
+        if within is None:
+            total = 0
+            for score, ids in self.ranked(query):
+                if total + len(ids) > offset and len(page) < limit:
+                    start = max(offset - total, 0)
+                    page.extend((clothing_id, score) for clothing_id in ids[start:start + limit - len(page)])
+                total += len(ids)
+            return page, total
+
+        terms = self.query_terms(query)
+        if not terms:
+            return [], 0
+
+        total = 0
+        for score, ids in self.match_groups(terms, within):
+            if total < end:
+                page.extend((clothing_id, score) for clothing_id in heapq.nsmallest(end - total, ids))
+            total += len(ids)
+        return page[offset:end], total
+
+    def matching_ids(self, query: str, within: Set[int]) -> List[int]:
+        """Every ID of `within` matching a query, best score first, ties ordered by ID"""
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+        return [clothing_id for _, ids in self.match_groups(terms, within) for clothing_id in sorted(ids)]
+
+
+class CatalogSearch:
+    """Keeps a search index in line with the current catalog snapshot"""
+
+    def __init__(self):
+        self._index = SnapshotView(SearchIndex)
+
+    async def get_index(self) -> SearchIndex:
+        return await self._index.get()
+
+    async def search(self, query: str, offset: int = 0, limit: int = 20, within: Optional[Set[int]] = None):
+        index = await self.get_index()
+        if within is None and index.is_ranked(query):
+            return index.search(query, offset, limit)
+        # Cold catalog-wide queries and set intersections may take many milliseconds
+        return await asyncio.to_thread(index.search, query, offset, limit, within)
+
+    async def matching_ids(self, query: str, within: Set[int]) -> List[int]:
+        index = await self.get_index()
+        return await asyncio.to_thread(index.matching_ids, query, within)
+
+    async def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        words = tokenize(prefix)
+        if not words:
+            return []
+        index = await self.get_index()
+        return index.words_with_prefix(words[-1], limit)
+
+
+catalog_search = CatalogSearch()
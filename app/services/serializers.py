@@ -0,0 +1,97 @@
+"""
+Serialization of outfit and wardrobe payloads.
+Field lists are taken from the pydantic schemas in app.schemas.clothes, which
+stay the source of truth, and compiled once into functions returning dict
+literals, so building a payload does not go through model validation.
+Payloads are encoded with orjson when it is installed and with the standard
+json module, as before, otherwise.
+"""
+import json
+from typing import Callable, Iterable, List, Tuple
+
+from app.schemas.clothes import OutfitItem, OutfitPayload, WardrobeItem
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shown for wardrobe items that have no category
+UNKNOWN_CATEGORY = "Не указано"
+
+
+def schema_fields(model) -> tuple:
+    """Field names of a pydantic model, in declaration order"""
+    fields = getattr(model, "model_fields", None) or model.__fields__
+    return tuple(fields)
+
+
+def compile_serializer(model, exclude: Iterable[str] = ()) -> Callable[[object], dict]:
+    """
+    Build a function copying the model's fields from any object with matching attributes.
+    The function is generated as a dict literal, which builds and encodes as fast
+    as a hand-written one, unlike dict(zip(...)).
+    """
+    fields = tuple(name for name in schema_fields(model) if name not in exclude)
+    if not all(name.isidentifier() for name in fields):
+        raise ValueError(f"{model.__name__} has field names that are not identifiers: {fields}")
+    body = ", ".join(f"{name!r}: obj.{name}" for name in fields)
+    return eval(f"lambda obj: {{{body}}}")
+
+
+_outfit_item_dict = compile_serializer(OutfitItem)
+_outfit_dict = compile_serializer(OutfitPayload, exclude=("items",))
+_wardrobe_item_dict = compile_serializer(WardrobeItem, exclude=("category",))
+
+
+def outfit_to_dict(outfit) -> dict:
+    """Outfit record in the OutfitPayload shape"""
+    data = _outfit_dict(outfit)
+    data["items"] = [_outfit_item_dict(clothing) for clothing in outfit.clothes]
+    return data
+
+
+def outfits_to_dicts(outfits) -> List[dict]:
+    return [outfit_to_dict(outfit) for outfit in outfits]
+
+
+def wardrobe_item_to_dict(clothing) -> dict:
+    """Catalog item in the WardrobeItem shape"""
+    data = _wardrobe_item_dict(clothing)
+    data["category"] = clothing.category or UNKNOWN_CATEGORY
+    return data
+
+
+def wardrobe_to_dicts(items) -> List[dict]:
+    return [wardrobe_item_to_dict(clothing) for clothing in items]
+
+
+def wardrobe_rows(items) -> Tuple[tuple, List[list]]:
+    """
+    Compact wardrobe: the WardrobeItem field names once and a list of values
+    per item, instead of repeating every key in every item.
+    """
+    fields = schema_fields(WardrobeItem)
+    return fields, [[item[field] for field in fields] for item in wardrobe_to_dicts(items)]
+
+
+def dumps(payload) -> bytes:
+    """Encode a payload as UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    # The json module's escaped ASCII output is its fastest, faster than ensure_ascii=False
+    return json.dumps(payload).encode("utf-8")
+
+
+def dumps_text(payload) -> str:
+    """Encode a payload as JSON text, for WebSocket text frames"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload)
+
+
+def loads(data):
+    """Decode JSON text or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,143 @@
+"""
+Snowball stemmer for Russian.
+A direct port of the Snowball "russian" algorithm, used to index clothing
+names so that e.g. "платье" and "платья" end up under the same term.
+Words that are not Cyrillic are returned unchanged.
+"""
+
+_VOWELS = "аеиоуыэюя"
+
+# (endings, needs a preceding "а" or "я") groups of each ending class
+_PERFECTIVE_GERUND = (
+    (("вшись", "вши", "в"), True),
+    (("ившись", "ывшись", "ивши", "ывши", "ив", "ыв"), False),
+)
+_ADJECTIVE = (
+    (("ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+      "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею"), False),
+)
+_PARTICIPLE = (
+    (("ем", "нн", "вш", "ющ", "щ"), True),
+    (("ивш", "ывш", "ующ"), False),
+)
+_REFLEXIVE = (
+    (("ся", "сь"), False),
+)
+_VERB = (
+    (("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть",
+      "й", "л", "н"), True),
+    (("ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+      "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую",
+      "ю"), False),
+)
+_NOUN = (
+    (("иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей",
+      "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й",
+      "о", "у", "ы", "ь", "ю", "я"), False),
+)
+_SUPERLATIVE = (
+    (("ейше", "ейш"), False),
+)
+_DERIVATIONAL = (
+    (("ость", "ост"), False),
+)
+
+
+def _compile(groups):
+    """Flatten ending groups into (ending, needs_prefix) pairs, longest first"""
+    endings = [(ending, needs_prefix) for group, needs_prefix in groups for ending in group]
+    return tuple(sorted(endings, key=lambda pair: len(pair[0]), reverse=True))
+
+
+_PERFECTIVE_GERUND = _compile(_PERFECTIVE_GERUND)
+_ADJECTIVE = _compile(_ADJECTIVE)
+_PARTICIPLE = _compile(_PARTICIPLE)
+_REFLEXIVE = _compile(_REFLEXIVE)
+_VERB = _compile(_VERB)
+_NOUN = _compile(_NOUN)
+_SUPERLATIVE = _compile(_SUPERLATIVE)
+_DERIVATIONAL = _compile(_DERIVATIONAL)
+
+
+def _regions(word: str):
+    """Start offsets of the RV and R2 regions"""
+    length = len(word)
+    rv = r1 = r2 = length
+
+    for i, char in enumerate(word):
+        if char in _VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, length):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, length):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word: str, start: int, endings):
+    """
+    Remove the longest matching ending lying inside the region starting at `start`.
+    Returns None when nothing matched or the matched ending misses its "а"/"я".
+    """
+    for ending, needs_prefix in endings:
+        if not word.endswith(ending):
+            continue
+        cut = len(word) - len(ending)
+        if cut < start:
+            return None
+        if needs_prefix and (cut - 1 < start or word[cut - 1] not in "ая"):
+            return None
+        return word[:cut]
+    return None
+
+
+def stem(word: str) -> str:
+    """Stem a single lowercase word"""
+    word = word.replace("ё", "е")
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Step 1: perfective gerund, or reflexive followed by adjectival, verb or noun ending
+    stripped = _strip(word, rv, _PERFECTIVE_GERUND)
+    if stripped is None:
+        reflexive = _strip(word, rv, _REFLEXIVE)
+        if reflexive is not None:
+            word = reflexive
+
+        stripped = _strip(word, rv, _ADJECTIVE)
+        if stripped is not None:
+            participle = _strip(stripped, rv, _PARTICIPLE)
+            if participle is not None:
+                stripped = participle
+        if stripped is None:
+            stripped = _strip(word, rv, _VERB)
+        if stripped is None:
+            stripped = _strip(word, rv, _NOUN)
+    if stripped is not None:
+        word = stripped
+
+    # Step 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Step 3: derivational ending inside R2
+    stripped = _strip(word, r2, _DERIVATIONAL)
+    if stripped is not None:
+        word = stripped
+
+    # Step 4: superlative, doubled "н" or soft sign
+    stripped = _strip(word, rv, _SUPERLATIVE)
+    if stripped is not None:
+        word = stripped
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif stripped is None and word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    return word
@@ -0,0 +1,265 @@
+"""
+Thumbnails of clothing images.
+Originals are fetched once per image URL, every thumbnail size is rendered from
+them in a worker pool and stored in an on-disk cache named by the SHA-256 of
+the thumbnail bytes, so blob URLs never change meaning and can be cached forever.
+Small ref files map (size, image URL) to the blob digest. Blobs are evicted
+least recently used first once the cache grows past its byte budget; a ref
+left pointing at an evicted blob is treated as a miss.
+Thumbnails are only rendered when Pillow is installed.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, unquote
+
+from app.config import config
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Bounding box of each thumbnail size, twice the CSS size for high density screens
+THUMBNAIL_SIZES: Dict[str, Tuple[int, int]] = {
+    "grid": (440, 400),
+    "builder": (100, 100),
+}
+
+THUMBNAIL_FORMAT = "JPEG"
+THUMBNAIL_MEDIA_TYPE = "image/jpeg"
+THUMBNAIL_SUFFIX = ".jpg"
+THUMBNAIL_QUALITY = 82
+
+
+class ThumbnailError(Exception):
+    """Raised when an original cannot be fetched or decoded"""
+
+
+class HttpFetcher:
+    """Downloads originals over HTTP(S) with urllib"""
+
+    def __init__(self, timeout: float, max_bytes: int):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def fetch(self, url: str) -> bytes:
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise ThumbnailError(f"Unsupported image URL: {url}")
+        request = urllib.request.Request(url, headers={"User-Agent": f"{config.APP_NAME}/{config.APP_VERSION}"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read(self.max_bytes + 1)
+        except OSError as e:
+            raise ThumbnailError(f"Failed to fetch {url}: {e}") from e
+        if len(data) > self.max_bytes:
+            raise ThumbnailError(f"Image larger than {self.max_bytes} bytes: {url}")
+        return data
+
+
+class LocalFileFetcher:
+    """
+    Reads originals from a local directory instead of the network, the URL path
+    is taken as a path below the directory. For tests and offline development.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def fetch(self, url: str) -> bytes:
+        path = (self.root / unquote(urlsplit(url).path).lstrip("/")).resolve()
+        if self.root not in path.parents:
+            raise ThumbnailError(f"Image path outside of {self.root}: {url}")
+        try:
+            return path.read_bytes()
+        except OSError as e:
+            raise ThumbnailError(f"Failed to read {path}: {e}") from e
+
+
+def render_thumbnails(original: bytes) -> Dict[str, bytes]:
+    """Encoded thumbnail of every size, decoding the original once"""
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            image.draft("RGB", max(THUMBNAIL_SIZES.values()))
+            image = image.convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Cannot decode image: {e}") from e
+
+    thumbnails = {}
+    # Largest first, each smaller size is scaled down from the previous one
+    for size, box in sorted(THUMBNAIL_SIZES.items(), key=lambda entry: entry[1], reverse=True):
+        image.thumbnail(box, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, optimize=True)
+        thumbnails[size] = output.getvalue()
+    return thumbnails
+
+
+class ThumbnailCache:
+    """
+    Content-addressed blob store with a byte budget.
+    Recency is kept in memory and in the blobs' mtime, so the order survives restarts.
+    Every worker process accounts for the blobs it saw when it started and the
+    ones it wrote since, eviction may therefore lag behind other workers' writes.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # digest -> blob size, least recently used first
+        self._blobs: Optional[OrderedDict] = None
+        self.total_bytes = 0
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / f"{digest}{THUMBNAIL_SUFFIX}"
+
+    def ref_path(self, image_url: str, size: str) -> Path:
+        key = hashlib.sha256(f"{size}\n{image_url}".encode("utf-8")).hexdigest()
+        return self.root / "refs" / key[:2] / key
+
+    def _load(self) -> OrderedDict:
+        if self._blobs is None:
+            entries = []
+            for path in (self.root / "blobs").glob(f"*/*{THUMBNAIL_SUFFIX}"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._blobs = OrderedDict((digest, size) for _, digest, size in entries)
+            self.total_bytes = sum(self._blobs.values())
+        return self._blobs
+
+    def lookup(self, image_url: str, size: str) -> Optional[str]:
+        """Digest of a cached thumbnail, None on a miss"""
+        ref = self.ref_path(image_url, size)
+        try:
+            digest = ref.read_text().strip()
+        except OSError:
+            return None
+
+        with self._lock:
+            blobs = self._load()
+            if digest not in blobs:
+                ref.unlink(missing_ok=True)
+                return None
+            blobs.move_to_end(digest)
+        try:
+            os.utime(self.blob_path(digest))
+        except OSError:
+            return None
+        return digest
+
+    def store(self, image_url: str, size: str, data: bytes) -> str:
+        """Write a thumbnail and its ref, evicting old blobs over the budget. Returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+
+        with self._lock:
+            blobs = self._load()
+            if digest not in blobs:
+                _write_atomic(path, data)
+                blobs[digest] = len(data)
+                self.total_bytes += len(data)
+            blobs.move_to_end(digest)
+            _write_atomic(self.ref_path(image_url, size), digest.encode("ascii"))
+            self._evict()
+        return digest
+
+    def _evict(self):
+        blobs = self._blobs
+        while self.total_bytes > self.max_bytes and len(blobs) > 1:
+            digest, size = blobs.popitem(last=False)
+            self.total_bytes -= size
+            self.blob_path(digest).unlink(missing_ok=True)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write through a temporary file so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+
+class ThumbnailService:
+    """
+    Serves thumbnail digests from the cache, rendering them on a miss.
+    Concurrent misses for one image share a single fetch and render.
+    """
+
+    def __init__(self, fetcher, cache: ThumbnailCache, max_workers: int):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnail")
+        return self._executor
+
+    def _render_and_store(self, image_url: str, original: bytes) -> Dict[str, str]:
+        thumbnails = render_thumbnails(original)
+        return {size: self.cache.store(image_url, size, data) for size, data in thumbnails.items()}
+
+    async def _generate(self, image_url: str) -> Dict[str, str]:
+        # Fetching waits on the network, it does not hold a render worker
+        original = await asyncio.to_thread(self.fetcher.fetch, image_url)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self._render_and_store, image_url, original)
+
+    async def get(self, image_url: str, size: str) -> str:
+        """Digest of the thumbnail of an image, raises ThumbnailError when it cannot be made"""
+        if not self.enabled:
+            raise ThumbnailError("Pillow is not installed")
+
+        digest = await asyncio.to_thread(self.cache.lookup, image_url, size)
+        if digest is not None:
+            return digest
+
+        future = self._pending.get(image_url)
+        if future is None:
+            future = self._pending[image_url] = asyncio.ensure_future(self._generate(image_url))
+            future.add_done_callback(lambda _: self._pending.pop(image_url, None))
+        digests = await asyncio.shield(future)
+        return digests[size]
+
+    def blob_path(self, digest: str) -> Optional[Path]:
+        """Path of a cached blob, None for malformed or evicted digests"""
+        if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+            return None
+        path = self.cache.blob_path(digest)
+        return path if path.is_file() else None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def create_thumbnail_service() -> ThumbnailService:
+    """Build the service with the fetcher chosen by THUMBNAIL_FETCHER"""
+    if config.THUMBNAIL_FETCHER == "file":
+        fetcher = LocalFileFetcher(config.THUMBNAIL_SOURCE_DIR)
+    else:
+        fetcher = HttpFetcher(config.THUMBNAIL_FETCH_TIMEOUT, config.THUMBNAIL_MAX_SOURCE_BYTES)
+    cache = ThumbnailCache(config.THUMBNAIL_DIR, config.THUMBNAIL_CACHE_BYTES)
+    return ThumbnailService(fetcher, cache, config.THUMBNAIL_WORKERS)
+
+
+thumbnail_service = create_thumbnail_service()
@@ -0,0 +1,90 @@
+window.adminJobs = {
+    panel: null,
+    socket: null,
+    pollTimer: null,
+
+    initialize() {
+        this.panel = document.getElementById('job-status');
+        if (!this.panel) return;
+
+        const jobId = this.panel.getAttribute('data-job-id');
+        this.connect(jobId);
+    },
+
+    connect(jobId) {
+        this.socket = new WebSocket(`ws://${window.location.host}/ws/admin/jobs/${jobId}`);
+
+        this.socket.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'job_progress') {
+                this.render(data.job);
+            }
+        };
+
+        this.socket.onclose = () => {
+            // Fall back to polling if the WebSocket is unavailable or dropped before the job finished
+            this.socket = null;
+            if (!this.isFinished()) {
+                this.poll(jobId);
+            }
+        };
+    },
+
+    poll(jobId) {
+        if (this.pollTimer) return;
+
+        this.pollTimer = setInterval(async () => {
+            try {
+                const response = await fetch(`/admin/jobs/${jobId}`);
+                if (response.status === 401 || response.status === 403 || response.status === 404) {
+                    // Not an admin session or an unknown job, polling will not get further
+                    clearInterval(this.pollTimer);
+                    return;
+                }
+                if (!response.ok) return;
+                const job = await response.json();
+                this.render(job);
+                if (this.isFinished()) {
+                    clearInterval(this.pollTimer);
+                }
+            } catch (error) {
+                console.error('Job polling error:', error);
+            }
+        }, 1000);
+    },
+
+    isFinished() {
+        const status = this.panel.getAttribute('data-status');
+        return status === 'succeeded' || status === 'failed';
+    },
+
+    render(job) {
+        const total = job.total !== null ? ` / ${job.total}` : '';
+        this.setField('status', job.status);
+        this.setField('processed', `${job.processed}${total}`);
+        this.setField('throughput', `${job.throughput} /s`);
+        this.setField('elapsed', `${job.elapsed}s`);
+
+        const result = this.panel.querySelector('[data-field="result"]');
+        if (job.status === 'succeeded') {
+            result.className = 'success-message';
+            result.textContent = job.message;
+        } else if (job.status === 'failed') {
+            result.className = 'error-message';
+            result.textContent = job.error;
+        }
+
+        this.panel.setAttribute('data-status', job.status);
+    },
+
+    setField(name, value) {
+        const field = this.panel.querySelector(`[data-field="${name}"]`);
+        if (field) {
+            field.textContent = value;
+        }
+    }
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    window.adminJobs.initialize();
+});
@@ -24,6 +24,9 @@ function showWardrobe() {
     if (window.outfitsManager) {
         window.outfitsManager.hideLibrary();
     }
+    if (window.wardrobeFilter) {
+        window.wardrobeFilter.refresh();
+    }
 }
 
 function showOutfitBuilder() {
@@ -46,10 +49,18 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('Initializing app modules...');
 
     // Initialize all modules
+    if (window.wardrobeStore) {
+        window.wardrobeStore.initialize(document.body.dataset.userId);
+    }
+
     if (window.wardrobeFilter) {
         window.wardrobeFilter.initialize();
     }
 
+    if (window.wardrobePager) {
+        window.wardrobePager.initialize();
+    }
+
     // Connect WebSocket for outfits
     if (window.outfitsManager) {
         window.outfitsManager.connect();
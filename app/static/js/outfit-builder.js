@@ -1,7 +1,28 @@
 window.outfitBuilder = {
+    // Milliseconds to wait after the last keystroke before filtering
+    searchDelay: 100,
+    searchTimer: null,
+    // IDs of the items put into the outfit, in the order they were added
+    selectedIds: new Set(),
+    // Renders the visible rows of the available clothes
+    availableList: null,
+    dragInitialized: false,
+
     initialize() {
+        const availableContainer = document.getElementById('available-clothes');
+        if (availableContainer) {
+            this.availableList = new VirtualList(availableContainer, {
+                scrollParent: availableContainer,
+                renderItem: entry => this.createItem(entry.item)
+            });
+        }
+        if (window.wardrobeStore) {
+            window.wardrobeStore.onChange(() => this.filterBuilderItems());
+        }
+
         this.initializeSearch();
-        this.initializeDragAndDrop(); // ADD THIS LINE - was missing!
+        this.initializeDragAndDrop();
+        this.filterBuilderItems();
     },
 
     initializeSearch() {
@@ -9,41 +30,50 @@ window.outfitBuilder = {
         const outfitSearch = document.getElementById('outfit-search');
 
         if (wardrobeSearch) {
-            wardrobeSearch.addEventListener('input', () => this.filterBuilderItems());
+            wardrobeSearch.addEventListener('input', () => this.onSearchInput());
         }
         if (outfitSearch) {
-            outfitSearch.addEventListener('input', () => this.filterBuilderItems());
+            outfitSearch.addEventListener('input', () => this.onSearchInput());
         }
     },
 
+    onSearchInput() {
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(() => this.filterBuilderItems(), this.searchDelay);
+    },
+
+    // Both lists are rebuilt from the wardrobe index, not by hiding DOM nodes
     filterBuilderItems() {
         const wardrobeSearch = document.getElementById('wardrobe-search')?.value.toLowerCase() || '';
         const outfitSearch = document.getElementById('outfit-search')?.value.toLowerCase() || '';
+        const index = window.wardrobeStore.getIndex();
 
         // Filter available clothes
-        const availableItems = document.querySelectorAll('#available-clothes .builder-clothing-item');
-        availableItems.forEach(item => {
-            const name = item.getAttribute('data-item-name');
-            if (name.includes(wardrobeSearch)) {
-                item.style.display = 'flex';
-            } else {
-                item.style.display = 'none';
-            }
-        });
+        if (this.availableList) {
+            const available = index.entries.filter(entry =>
+                !this.selectedIds.has(entry.id) && (!wardrobeSearch || entry.name.includes(wardrobeSearch))
+            );
+            this.availableList.emptyMessage = wardrobeSearch ? '' : 'All items are in your outfit';
+            this.availableList.setItems(available);
+        }
 
-        // Filter selected items
-        const selectedItems = document.querySelectorAll('#selected-items .builder-clothing-item');
-        selectedItems.forEach(item => {
-            const name = item.getAttribute('data-item-name');
-            if (name.includes(outfitSearch)) {
-                item.style.display = 'flex';
-            } else {
-                item.style.display = 'none';
-            }
-        });
+        // Filter selected items, an outfit holds a handful of them so all are rendered
+        const selectedContainer = document.getElementById('selected-items');
+        if (!selectedContainer) return;
+
+        if (this.selectedIds.size === 0) {
+            selectedContainer.innerHTML = '<div class="empty-state">Drag items here to build your outfit</div>';
+            return;
+        }
+        const selected = Array.from(this.selectedIds, id => index.byId.get(id))
+            .filter(entry => entry && entry.name.includes(outfitSearch));
+        selectedContainer.replaceChildren(...selected.map(entry => this.createItem(entry.item)));
     },
 
     initializeDragAndDrop() {
+        // Items are rendered on the fly, the listeners live on the containers
+        if (this.dragInitialized) return;
+
         const availableContainer = document.getElementById('available-clothes');
         const selectedContainer = document.getElementById('selected-items');
 
@@ -54,6 +84,21 @@ window.outfitBuilder = {
 
         // Make both containers droppable
         [availableContainer, selectedContainer].forEach(container => {
+            container.addEventListener('dragstart', (e) => {
+                const item = e.target.closest('.builder-clothing-item');
+                if (item) {
+                    e.dataTransfer.setData('text/plain', item.getAttribute('data-item-id'));
+                    item.classList.add('dragging');
+                }
+            });
+
+            container.addEventListener('dragend', (e) => {
+                const item = e.target.closest('.builder-clothing-item');
+                if (item) {
+                    item.classList.remove('dragging');
+                }
+            });
+
             container.addEventListener('dragover', (e) => {
                 e.preventDefault();
                 container.classList.add('drag-over');
@@ -67,64 +112,39 @@ window.outfitBuilder = {
                 e.preventDefault();
                 container.classList.remove('drag-over');
 
-                const itemId = e.dataTransfer.getData('text/plain');
-                const draggedItem = document.querySelector(`[data-item-id="${itemId}"]`);
-
-                if (draggedItem && container !== draggedItem.parentElement) {
-                    // Remove from current parent
-                    draggedItem.remove();
-
-                    // Add to new container
-                    container.appendChild(draggedItem);
+                const itemId = Number(e.dataTransfer.getData('text/plain'));
+                if (!itemId) return;
 
-                    // Update empty states
-                    this.updateEmptyStates();
-                    this.filterBuilderItems(); // ADD THIS - update search filters
+                const wasSelected = this.selectedIds.has(itemId);
+                if (container === selectedContainer && !wasSelected) {
+                    this.selectedIds.add(itemId);
+                } else if (container === availableContainer && wasSelected) {
+                    this.selectedIds.delete(itemId);
+                } else {
+                    return;
                 }
+                this.filterBuilderItems();
             });
         });
 
-        // Make all items draggable
-        const allItems = document.querySelectorAll('.builder-clothing-item');
-        allItems.forEach(item => {
-            item.addEventListener('dragstart', (e) => {
-                e.dataTransfer.setData('text/plain', item.getAttribute('data-item-id'));
-                item.classList.add('dragging');
-            });
-
-            item.addEventListener('dragend', () => {
-                item.classList.remove('dragging');
-            });
-        });
-
-        this.updateEmptyStates(); // INITIALIZE EMPTY STATES
+        this.dragInitialized = true;
     },
 
-    updateEmptyStates() {
-        const selectedContainer = document.getElementById('selected-items');
-        const availableContainer = document.getElementById('available-clothes');
-
-        if (!selectedContainer || !availableContainer) return;
-
-        // Update selected items empty state
-        const selectedItems = selectedContainer.querySelectorAll('.builder-clothing-item');
-        let selectedEmptyState = selectedContainer.querySelector('.empty-state');
-
-        if (selectedItems.length === 0 && !selectedEmptyState) {
-            selectedContainer.innerHTML = '<div class="empty-state">Drag items here to build your outfit</div>';
-        } else if (selectedItems.length > 0 && selectedEmptyState) {
-            selectedEmptyState.remove();
-        }
-
-        // Update available clothes empty state
-        const availableItems = availableContainer.querySelectorAll('.builder-clothing-item');
-        let availableEmptyState = availableContainer.querySelector('.empty-state');
-
-        if (availableItems.length === 0 && !availableEmptyState) {
-            availableContainer.innerHTML = '<div class="empty-state">All items are in your outfit</div>';
-        } else if (availableItems.length > 0 && availableEmptyState) {
-            availableEmptyState.remove();
-        }
+    createItem(item) {
+        const element = document.createElement('div');
+        element.className = 'builder-clothing-item';
+        element.draggable = true;
+        element.setAttribute('data-item-id', item.id);
+        element.setAttribute('data-item-name', item.name.toLowerCase());
+
+        const image = document.createElement('img');
+        image.src = `/thumbnails/builder/${item.id}`;
+        image.alt = item.name;
+        image.loading = 'lazy';
+        const name = document.createElement('span');
+        name.textContent = item.name;
+        element.append(image, name);
+        return element;
     },
 
     reset() {
@@ -141,27 +161,17 @@ window.outfitBuilder = {
         if (outfitSearch) outfitSearch.value = '';
 
         // Move all items back to available clothes
-        const selectedContainer = document.getElementById('selected-items');
-        const availableContainer = document.getElementById('available-clothes');
-
-        if (selectedContainer && availableContainer) {
-            const selectedItems = selectedContainer.querySelectorAll('.builder-clothing-item');
-            selectedItems.forEach(item => {
-                availableContainer.appendChild(item);
-                item.style.display = 'flex'; // Ensure it's visible
-            });
-
-            // Reset empty states
-            this.updateEmptyStates();
-            this.filterBuilderItems();
+        this.selectedIds.clear();
+        if (this.availableList) {
+            // The builder view may have been hidden since the last render
+            this.availableList.refresh();
         }
+        this.filterBuilderItems();
     },
 
     saveOutfit() {
         const outfitName = document.getElementById('outfit-name')?.value.trim();
-        const selectedItems = document.querySelectorAll('#selected-items .builder-clothing-item');
-
-        if (selectedItems.length === 0) {
+        if (this.selectedIds.size === 0) {
             alert('Please add at least one item to your outfit');
             return;
         }
@@ -171,7 +181,7 @@ window.outfitBuilder = {
             return;
         }
 
-        const itemIds = Array.from(selectedItems).map(item => item.getAttribute('data-item-id'));
+        const itemIds = Array.from(this.selectedIds);
 
         if (window.outfitsManager && window.outfitsManager.isConnected()) {
             // Show loading state
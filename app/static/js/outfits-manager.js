@@ -3,6 +3,7 @@ window.outfitsManager = {
     outfitsGrid: null,
     emptyState: null,
     cachedOutfits: [], // Store outfits data
+    outfitsVersion: null, // Version of cachedOutfits, null until the first full load
     isLibraryVisible: false,
 
     connect() {
@@ -28,6 +29,11 @@ window.outfitsManager = {
 
         this.socket.onclose = (event) => {
             console.log('Outfits WebSocket disconnected');
+            // 1008 means the session cookie was rejected, reconnecting will not help
+            if (event.code === 1008) {
+                window.location.href = '/';
+                return;
+            }
             setTimeout(() => this.connect(), 3000);
         };
 
@@ -67,6 +73,7 @@ window.outfitsManager = {
             case 'outfits_list':
                 // Store the outfits data
                 this.cachedOutfits = data.outfits;
+                this.outfitsVersion = data.version;
 
                 // Only display if library is currently visible
                 if (this.isLibraryVisible) {
@@ -74,6 +81,16 @@ window.outfitsManager = {
                 }
                 break;
 
+            case 'outfits_delta':
+                // Merge only what changed since our version
+                this.applyOutfitChanges(data.outfits, data.deleted_ids);
+                this.outfitsVersion = data.version;
+                break;
+
+            case 'outfit_updated':
+                this.applyOutfitChanges([data.outfit], []);
+                break;
+
             case 'outfit_deleted':
                 // Remove from cached outfits
                 this.cachedOutfits = this.cachedOutfits.filter(outfit => outfit.id !== data.outfit_id);
@@ -83,6 +100,16 @@ window.outfitsManager = {
                 }
                 break;
 
+            case 'outfit_event':
+                // Change made from another tab or device of this user
+                this.handleOutfitEvent(data.event);
+                break;
+
+            case 'batch_result':
+                // One reply frame carries the result of every operation in order
+                data.results.forEach(result => this.handleOutfitsMessage(result));
+                break;
+
             case 'error':
                 console.error('WebSocket error:', data.message);
                 alert('Error: ' + data.message);
@@ -95,10 +122,41 @@ window.outfitsManager = {
 
     loadOutfits() {
         if (this.socket && this.socket.readyState === WebSocket.OPEN) {
-            this.socket.send(JSON.stringify({
-                type: 'get_outfits',
-                username: this.getUsername()
-            }));
+            const message = { type: 'get_outfits' };
+            // After the first load ask only for changes
+            if (this.outfitsVersion !== null) {
+                message.since_version = this.outfitsVersion;
+            }
+            this.socket.send(JSON.stringify(message));
+        }
+    },
+
+    handleOutfitEvent(event) {
+        switch(event.type) {
+            case 'outfit_created':
+            case 'outfit_updated':
+                this.applyOutfitChanges([event.outfit], []);
+                break;
+
+            case 'outfit_deleted':
+                this.applyOutfitChanges([], [event.outfit_id]);
+                break;
+
+            case 'outfits_changed':
+                // Event too large to push, pull the delta instead
+                this.loadOutfits();
+                break;
+        }
+    },
+
+    applyOutfitChanges(changedOutfits, deletedIds) {
+        const byId = new Map(this.cachedOutfits.map(outfit => [outfit.id, outfit]));
+        deletedIds.forEach(outfitId => byId.delete(outfitId));
+        changedOutfits.forEach(outfit => byId.set(outfit.id, outfit));
+        this.cachedOutfits = Array.from(byId.values()).sort((a, b) => a.id - b.id);
+
+        if (this.isLibraryVisible) {
+            this.displayOutfits(this.cachedOutfits);
         }
     },
 
@@ -152,7 +210,7 @@ window.outfitsManager = {
             <div class="outfit-name">${this.escapeHtml(outfit.name)}</div>
             <div class="outfit-items-grid">
                 ${outfit.items.map(item => `
-                    <img src="${item.image_url}" alt="${this.escapeHtml(item.name)}"
+                    <img src="/thumbnails/grid/${item.id}" loading="lazy" alt="${this.escapeHtml(item.name)}"
                          title="${this.escapeHtml(item.name)}" class="outfit-item-img">
                 `).join('')}
             </div>
@@ -183,7 +241,6 @@ window.outfitsManager = {
         if (this.socket && this.socket.readyState === WebSocket.OPEN) {
             this.socket.send(JSON.stringify({
                 type: 'create_outfit',
-                username: this.getUsername(),
                 outfit: {
                     name: outfitName,
                     item_ids: itemIds.map(id => parseInt(id))
@@ -196,6 +253,34 @@ window.outfitsManager = {
         }
     },
 
+    // Send several create/update/delete operations to be applied in one transaction
+    sendBatch(operations) {
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify({
+                type: 'batch',
+                operations: operations
+            }));
+            return true;
+        }
+        console.error('WebSocket not connected');
+        return false;
+    },
+
+    addOutfitItems(outfitId, itemIds) {
+        return this.sendBatch([{ type: 'add_outfit_items', outfit_id: outfitId, item_ids: itemIds }]);
+    },
+
+    removeOutfitItems(outfitId, itemIds) {
+        return this.sendBatch([{ type: 'remove_outfit_items', outfit_id: outfitId, item_ids: itemIds }]);
+    },
+
+    deleteOutfits(outfitIds) {
+        return this.sendBatch(outfitIds.map(outfitId => ({
+            type: 'delete_outfit',
+            outfit_id: outfitId
+        })));
+    },
+
     editOutfit(outfitId) {
         alert('Edit outfit ' + outfitId + ' - Feature coming soon!');
     },
@@ -205,18 +290,12 @@ window.outfitsManager = {
             if (this.socket && this.socket.readyState === WebSocket.OPEN) {
                 this.socket.send(JSON.stringify({
                     type: 'delete_outfit',
-                    outfit_id: outfitId,
-                    username: this.getUsername()
+                    outfit_id: outfitId
                 }));
             }
         }
     },
 
-    getUsername() {
-        const script = document.querySelector('script[src*="outfits-manager.js"]');
-        return script?.getAttribute('data-username') || '{{ username }}';
-    },
-
     escapeHtml(unsafe) {
         return unsafe
             .replace(/&/g, "&amp;")
@@ -0,0 +1,147 @@
+// Renders only the rows of a long list that are in view. The container keeps its
+// own CSS layout (a grid or a flex column); rows above and below the rendered
+// window are replaced by padding so the scroll height stays the same.
+window.VirtualList = class VirtualList {
+    constructor(container, options) {
+        this.container = container;
+        this.renderItem = options.renderItem;
+        this.getKey = options.getKey || (entry => entry.id);
+        // Element scrolling the list, the window when the page itself scrolls
+        this.scrollParent = options.scrollParent || window;
+        // Rows rendered beyond each edge of the viewport
+        this.overscan = options.overscan ?? 3;
+        // Rows laid out to measure the row height
+        this.measureRows = options.measureRows ?? 4;
+        this.emptyMessage = options.emptyMessage || '';
+
+        this.items = [];
+        this.rowHeight = 0;
+        this.columns = 1;
+        this.range = null;
+        this.nodes = new Map(); // Rendered nodes by key, reused while they stay in view
+        this.frame = null;
+
+        this.scrollParent.addEventListener('scroll', () => this.scheduleRender(), {passive: true});
+        window.addEventListener('resize', () => this.refresh());
+    }
+
+    setItems(items) {
+        this.items = items;
+        this.nodes = new Map();
+        this.range = null;
+        this.scheduleRender();
+    }
+
+    // Measure and render again, e.g. after the container was hidden or resized
+    refresh() {
+        this.rowHeight = 0;
+        this.range = null;
+        this.scheduleRender();
+    }
+
+    scheduleRender() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.render();
+            });
+        }
+    }
+
+    isHidden() {
+        return this.container.getClientRects().length === 0;
+    }
+
+    nodeFor(entry) {
+        const key = this.getKey(entry);
+        let node = this.nodes.get(key);
+        if (!node) {
+            node = this.renderItem(entry);
+            this.nodes.set(key, node);
+        }
+        return node;
+    }
+
+    measure() {
+        const style = getComputedStyle(this.container);
+        const isGrid = style.display === 'grid';
+        this.columns = isGrid ? style.gridTemplateColumns.split(' ').length : 1;
+
+        // Lay out the first rows at their natural height, the tallest one sets the row height
+        this.container.style.gridAutoRows = '';
+        this.container.style.paddingTop = '';
+        this.container.style.paddingBottom = '';
+        this.container.replaceChildren(...this.items.slice(0, this.columns * this.measureRows).map(entry => this.nodeFor(entry)));
+        const height = Math.max(...Array.from(this.container.children, node => node.getBoundingClientRect().height));
+
+        this.rowHeight = height + (parseFloat(style.rowGap) || 0);
+        if (isGrid) {
+            // Every row gets the measured height so the padding math holds
+            this.container.style.gridAutoRows = `${height}px`;
+        }
+    }
+
+    visibleSpan() {
+        if (this.scrollParent === this.container) {
+            const top = this.container.scrollTop;
+            return [top, top + this.container.clientHeight];
+        }
+        const rect = this.container.getBoundingClientRect();
+        const viewport = this.scrollParent === window
+            ? {top: 0, bottom: window.innerHeight}
+            : this.scrollParent.getBoundingClientRect();
+        return [viewport.top - rect.top, viewport.bottom - rect.top];
+    }
+
+    render() {
+        // A hidden list cannot be measured, it is rendered once shown again
+        if (this.isHidden()) {
+            this.range = null;
+            return;
+        }
+
+        if (this.items.length === 0) {
+            this.range = null;
+            this.container.style.paddingTop = '';
+            this.container.style.paddingBottom = '';
+            if (this.emptyMessage) {
+                const empty = document.createElement('div');
+                empty.className = 'empty-state';
+                empty.textContent = this.emptyMessage;
+                this.container.replaceChildren(empty);
+            } else {
+                this.container.replaceChildren();
+            }
+            return;
+        }
+
+        if (!this.rowHeight) {
+            this.measure();
+        }
+        if (!this.rowHeight) {
+            return;
+        }
+
+        const totalRows = Math.ceil(this.items.length / this.columns);
+        const [top, bottom] = this.visibleSpan();
+        const first = Math.min(Math.max(Math.floor(top / this.rowHeight) - this.overscan, 0), totalRows);
+        const last = Math.min(Math.max(Math.ceil(bottom / this.rowHeight) + this.overscan, first), totalRows);
+        if (this.range && this.range[0] === first && this.range[1] === last) {
+            return;
+        }
+        this.range = [first, last];
+
+        const nodes = new Map();
+        const fragment = document.createDocumentFragment();
+        this.items.slice(first * this.columns, last * this.columns).forEach(entry => {
+            const node = this.nodeFor(entry);
+            nodes.set(this.getKey(entry), node);
+            fragment.appendChild(node);
+        });
+        this.nodes = nodes;
+
+        this.container.style.paddingTop = `${first * this.rowHeight}px`;
+        this.container.style.paddingBottom = `${(totalRows - last) * this.rowHeight}px`;
+        this.container.replaceChildren(fragment);
+    }
+};
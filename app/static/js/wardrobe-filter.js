@@ -1,27 +1,142 @@
 window.wardrobeFilter = {
+    // Milliseconds to wait after the last keystroke before asking the server
+    searchDelay: 200,
+
+    searchTimer: null,
+    searchRequest: 0,
+    // IDs matching the current search query, null when there is no query
+    matchingIds: null,
+    // Renders the visible rows of the filtered wardrobe
+    list: null,
+
     initialize() {
+        this.list = new VirtualList(document.getElementById('wardrobe-grid'), {
+            renderItem: entry => this.createCard(entry.item)
+        });
         document.getElementById('category-filter').addEventListener('change', this.filterItems.bind(this));
-        document.getElementById('search-filter').addEventListener('input', this.filterItems.bind(this));
+        document.getElementById('search-filter').addEventListener('input', this.onSearchInput.bind(this));
+        window.wardrobeStore.onChange(() => this.filterItems());
         this.filterItems(); // Initial filter
     },
 
+    // Render again after the wardrobe view was hidden
+    refresh() {
+        if (this.list) {
+            this.list.refresh();
+        }
+    },
+
+    onSearchInput() {
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(() => this.runSearch(), this.searchDelay);
+    },
+
+    async runSearch() {
+        const query = document.getElementById('search-filter').value;
+        const requestId = ++this.searchRequest;
+
+        if (!query.trim()) {
+            this.matchingIds = null;
+            this.filterItems();
+            return;
+        }
+
+        try {
+            const [ids] = await Promise.all([this.fetchMatchingIds(query), this.loadSuggestions(query)]);
+            // Ignore answers to queries the user has already typed past
+            if (requestId !== this.searchRequest) {
+                return;
+            }
+            this.matchingIds = ids;
+        } catch (error) {
+            console.error('Search failed, falling back to local matching:', error);
+            this.matchingIds = null;
+        }
+        this.filterItems();
+    },
+
+    // All matching wardrobe IDs in one request, the items themselves are already in the store
+    async fetchMatchingIds(query) {
+        const params = new URLSearchParams({q: query, scope: 'wardrobe', ids_only: 'true'});
+        const response = await fetch(`/api/search?${params}`);
+        if (!response.ok) {
+            throw new Error(`Search request failed with status ${response.status}`);
+        }
+        const data = await response.json();
+        return new Set(data.ids);
+    },
+
+    async loadSuggestions(query) {
+        const response = await fetch(`/api/search/suggest?${new URLSearchParams({q: query})}`);
+        if (!response.ok) {
+            return;
+        }
+        const data = await response.json();
+        const prefix = query.replace(/\S+$/, '');
+        const datalist = document.getElementById('search-suggestions');
+        datalist.innerHTML = '';
+        data.suggestions.forEach(word => {
+            const option = document.createElement('option');
+            option.value = prefix + word;
+            datalist.appendChild(option);
+        });
+    },
+
+    // One pass over the prebuilt index, only the rows in view reach the DOM
     filterItems() {
         const categoryFilter = document.getElementById('category-filter').value;
         const searchFilter = document.getElementById('search-filter').value.toLowerCase();
-        const items = document.querySelectorAll('.wardrobe-item');
+        const index = window.wardrobeStore.getIndex();
+
+        let entries = categoryFilter === 'all' ? index.entries : (index.byCategory.get(categoryFilter) || []);
+        // Server search understands word forms, the substring match is only a fallback
+        if (this.matchingIds) {
+            entries = entries.filter(entry => this.matchingIds.has(entry.id));
+        } else if (searchFilter) {
+            entries = entries.filter(entry => entry.name.includes(searchFilter));
+        }
 
-        items.forEach(item => {
-            const category = item.getAttribute('data-category');
-            const name = item.getAttribute('data-name');
+        this.list.setItems(entries);
+    },
 
-            const categoryMatch = categoryFilter === 'all' || category === categoryFilter;
-            const searchMatch = name.includes(searchFilter);
+    // Same markup as the server-rendered wardrobe cards
+    createCard(item) {
+        const link = document.createElement('a');
+        link.href = item.item_url || '';
+        link.target = '_blank';
+        link.className = 'wardrobe-item-link';
 
-            if (categoryMatch && searchMatch) {
-                item.parentElement.style.display = 'block';
-            } else {
-                item.parentElement.style.display = 'none';
-            }
-        });
+        const card = document.createElement('div');
+        card.className = 'wardrobe-item';
+        card.setAttribute('data-id', item.id);
+        card.setAttribute('data-category', item.category);
+        card.setAttribute('data-name', item.name.toLowerCase());
+
+        const imageBox = document.createElement('div');
+        imageBox.className = 'item-image';
+        const image = document.createElement('img');
+        image.src = `/thumbnails/grid/${item.id}`;
+        image.alt = item.name;
+        image.loading = 'lazy';
+        imageBox.appendChild(image);
+
+        const info = document.createElement('div');
+        info.className = 'item-info';
+        const title = document.createElement('h3');
+        title.textContent = item.name;
+        const category = document.createElement('span');
+        category.className = 'item-category';
+        category.textContent = item.category;
+        info.append(title, category);
+        if (item.price) {
+            const price = document.createElement('span');
+            price.className = 'item-price';
+            price.textContent = `${item.price} ₽`;
+            info.appendChild(price);
+        }
+
+        card.append(imageBox, info);
+        link.appendChild(card);
+        return link;
     }
-};
\ No newline at end of file
+};
@@ -0,0 +1,65 @@
+// Loads the wardrobe page by page as the user scrolls to the end of the grid,
+// until the wardrobe store holds the whole wardrobe
+window.wardrobePager = {
+    nextAfterId: null,
+    loading: false,
+    observer: null,
+
+    initialize() {
+        const grid = document.getElementById('wardrobe-grid');
+        const sentinel = document.getElementById('wardrobe-more');
+        if (!grid || !sentinel) return;
+
+        const nextAfter = grid.getAttribute('data-next-after');
+        this.nextAfterId = nextAfter ? Number(nextAfter) : null;
+        if (this.nextAfterId === null) return;
+
+        this.observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                this.loadNextPage();
+            }
+        }, {rootMargin: '600px'});
+        this.observer.observe(sentinel);
+    },
+
+    async loadNextPage() {
+        if (this.loading || this.nextAfterId === null) return;
+        if (window.wardrobeStore && window.wardrobeStore.complete) {
+            this.nextAfterId = null;
+            this.observer.disconnect();
+            return;
+        }
+        this.loading = true;
+
+        try {
+            const response = await fetch(`/api/wardrobe/page?after=${this.nextAfterId}`);
+            if (!response.ok) {
+                throw new Error(`Wardrobe page request failed with status ${response.status}`);
+            }
+            const data = await response.json();
+
+            this.appendItems(data.items);
+            this.nextAfterId = data.next_after_id;
+            if (this.nextAfterId === null) {
+                this.observer.disconnect();
+            }
+        } catch (error) {
+            console.error('Failed to load more wardrobe items:', error);
+        } finally {
+            this.loading = false;
+        }
+
+        // Filters may hide the new items, keep loading while the end is still in view
+        if (this.nextAfterId !== null) {
+            const sentinel = document.getElementById('wardrobe-more');
+            if (sentinel.getBoundingClientRect().top < window.innerHeight + 600) {
+                this.loadNextPage();
+            }
+        }
+    },
+
+    // The grid and the builder render from the store, new items reach them through it
+    appendItems(items) {
+        window.wardrobeStore.addItems(items);
+    }
+};
@@ -0,0 +1,153 @@
+// Keeps the user's wardrobe in IndexedDB and syncs it with /api/wardrobe,
+// so repeat visits only fetch what was added since the stored version
+window.wardrobeStore = {
+    dbName: null,
+    db: null,
+    version: null,
+    items: new Map(), // Wardrobe items by ID
+    // Whether items hold the whole wardrobe rather than the pages loaded so far
+    complete: false,
+    index: null,
+    listeners: [],
+
+    async initialize(userId) {
+        this.dbName = `wardrobe-${userId}`;
+        // The page rendered with the HTML is shown until the full copy is loaded
+        const pageData = document.getElementById('wardrobe-page-data');
+        if (pageData) {
+            this.addItems(JSON.parse(pageData.textContent));
+        }
+        try {
+            this.db = await this.openDatabase();
+            await this.loadCached();
+        } catch (error) {
+            // Private browsing or a broken database, keep everything in memory
+            console.warn('Wardrobe cache unavailable:', error);
+            this.db = null;
+        }
+        await this.sync();
+    },
+
+    openDatabase() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(this.dbName, 1);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                db.createObjectStore('items', {keyPath: 'id'});
+                db.createObjectStore('meta');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    },
+
+    requestResult(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    },
+
+    async loadCached() {
+        const transaction = this.db.transaction(['items', 'meta'], 'readonly');
+        const [items, version] = await Promise.all([
+            this.requestResult(transaction.objectStore('items').getAll()),
+            this.requestResult(transaction.objectStore('meta').get('version'))
+        ]);
+        if (version === undefined) {
+            return;
+        }
+        this.items = new Map(items.map(item => [item.id, item]));
+        this.version = version;
+        this.complete = true;
+        this.notify();
+    },
+
+    async sync() {
+        const params = this.version === null ? '' : `?since=${this.version}`;
+        let data;
+        try {
+            const response = await fetch(`/api/wardrobe${params}`);
+            if (response.status === 304) {
+                this.complete = true;
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`Wardrobe request failed with status ${response.status}`);
+            }
+            data = await response.json();
+        } catch (error) {
+            console.error('Wardrobe sync failed, using the cached copy:', error);
+            return;
+        }
+
+        const items = data.items.map(row => Object.fromEntries(data.fields.map((field, i) => [field, row[i]])));
+        if (data.type === 'full') {
+            this.items = new Map();
+        }
+        items.forEach(item => this.items.set(item.id, item));
+        this.version = data.version;
+        this.complete = true;
+
+        await this.persist(data.type === 'full', items);
+        if (data.type === 'full' || items.length) {
+            this.notify();
+        }
+    },
+
+    async persist(replace, items) {
+        if (!this.db) {
+            return;
+        }
+        const transaction = this.db.transaction(['items', 'meta'], 'readwrite');
+        const itemStore = transaction.objectStore('items');
+        if (replace) {
+            itemStore.clear();
+        }
+        items.forEach(item => itemStore.put(item));
+        transaction.objectStore('meta').put(this.version, 'version');
+        await new Promise((resolve, reject) => {
+            transaction.oncomplete = resolve;
+            transaction.onerror = () => reject(transaction.error);
+        });
+    },
+
+    // Add items of a wardrobe page, they are kept in memory only
+    addItems(items) {
+        items.forEach(item => this.items.set(item.id, item));
+        this.notify();
+    },
+
+    notify() {
+        this.index = null;
+        this.listeners.forEach(listener => listener(this));
+    },
+
+    // Call listener(store) whenever the wardrobe changed
+    onChange(listener) {
+        this.listeners.push(listener);
+    },
+
+    getItems() {
+        return Array.from(this.items.values());
+    },
+
+    // Entries sorted by ID with the lowercase name prebuilt for filtering,
+    // grouped by category and by ID. Rebuilt on the first call after a change.
+    getIndex() {
+        if (this.index === null) {
+            const entries = this.getItems()
+                .sort((a, b) => a.id - b.id)
+                .map(item => ({id: item.id, name: (item.name || '').toLowerCase(), category: item.category, item}));
+            const byCategory = new Map();
+            entries.forEach(entry => {
+                if (!byCategory.has(entry.category)) {
+                    byCategory.set(entry.category, []);
+                }
+                byCategory.get(entry.category).push(entry);
+            });
+            this.index = {entries, byCategory, byId: new Map(entries.map(entry => [entry.id, entry]))};
+        }
+        return this.index;
+    }
+};
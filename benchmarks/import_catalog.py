@@ -0,0 +1,133 @@
+"""
+Benchmark of the catalog import on a synthetic supplier dump.
+Imports the same file twice into an emptied clothing table: once through the
+old per-row path (one SELECT per entry, then an ORM add per row) and once
+through import_clothes fed by the normalization pool, and reports rows/s.
+The database is wiped, point it at a disposable one:
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/wardrobe_bench \\
+        python benchmarks/import_catalog.py --items 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORY_SLUGS = ("verhnyaya-odezhda", "obuv", "aksessuary", "platya", "bryuki", "trikotazh")
+COLORS = ("Серо-голубой", "Черный", "Молочный", "Бежевый", "Темно-синий")
+
+
+def write_catalog(path: str, item_count: int):
+    """A raw.txt shaped dump, streamed to disk entry by entry"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for number in range(item_count):
+            clothing_id = 100000 + number
+            slug = CATEGORY_SLUGS[number % len(CATEGORY_SLUGS)]
+            entry = {
+                "color": COLORS[number % len(COLORS)],
+                "image_url": f"https://image.12storeez.com/images/800xP_90_out/uploads/images/{clothing_id}-1.jpg",
+                "item_url": f"https://12storeez.com/catalog/{slug}/womencollection/item-{clothing_id}",
+                "name": f"Изделие из шерсти {clothing_id}",
+                "price": f"{(number % 50 + 1) * 1000:,} ₽".replace(",", " "),
+            }
+            f.write(("," if number else "") + json.dumps(str(clothing_id)) + ":" + json.dumps(entry, ensure_ascii=False))
+        f.write("}")
+
+
+async def import_per_row(db, path: str) -> int:
+    """The import as it was before the bulk engine: a round trip per entry"""
+    from sqlalchemy import select
+    from app.database.models import Clothing
+    from app.services.catalog_normalize import parse_price
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    imported = 0
+    for item_id, item_data in data.items():
+        clothing_id = int(item_id)
+        result = await db.execute(select(Clothing).where(Clothing.id == clothing_id))
+        if result.scalar_one_or_none():
+            continue
+        db.add(Clothing(
+            id=clothing_id,
+            name=item_data["name"],
+            color=item_data["color"],
+            image_url=item_data["image_url"],
+            item_url=item_data["item_url"],
+            price=parse_price(item_data["price"]),
+        ))
+        imported += 1
+    await db.commit()
+    return imported
+
+
+async def import_bulk(db, path: str) -> int:
+    from app.crud.clothes import import_clothes
+    from app.services.catalog_pipeline import normalize_catalog
+
+    stats = await import_clothes(db, normalize_catalog(path))
+    return stats.imported
+
+
+async def run(path: str, item_count: int, skip_per_row: bool):
+    from sqlalchemy import text
+    from app.database.connection import AsyncSessionLocal, engine, init_db
+    from app.services.catalog_pipeline import get_import_executor, shutdown_import_executor
+
+    engine.echo = False
+    await init_db()
+    # Spawning the workers is a one-time cost of the server, not of an import
+    await asyncio.get_running_loop().run_in_executor(get_import_executor(), int, "0")
+
+    paths = [("bulk", import_bulk)]
+    if not skip_per_row:
+        paths.insert(0, ("per-row", import_per_row))
+
+    results = {}
+    try:
+        for label, import_path in paths:
+            async with engine.begin() as conn:
+                await conn.execute(text("TRUNCATE clothing CASCADE"))
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                imported = await import_path(db, path)
+                elapsed = time.perf_counter() - started
+            assert imported == item_count, f"{label} imported {imported} of {item_count} rows"
+            results[label] = elapsed
+            print(f"  {label:<8} {elapsed:8.2f} s  {imported / elapsed:10.0f} rows/s")
+    finally:
+        shutdown_import_executor()
+        await engine.dispose()
+
+    if "per-row" in results:
+        print(f"  speedup  {results['per-row'] / results['bulk']:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000, help="entries in the synthetic dump")
+    parser.add_argument("--database-url", default=os.getenv("TEST_DATABASE_URL"), help="disposable database")
+    parser.add_argument("--skip-per-row", action="store_true", help="only time the bulk import")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("set TEST_DATABASE_URL or pass --database-url, the clothing table is wiped")
+    # The app reads its settings at import time, pool workers inherit the environment
+    os.environ["DATABASE_URL"] = args.database_url
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "raw.txt")
+        write_catalog(path, args.items)
+        print(f"Importing {args.items} items ({os.path.getsize(path) / 1024 / 1024:.1f} MiB)")
+        asyncio.run(run(path, args.items, args.skip_per_row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark of a login storm against the app, served in-process through httpx.
+Many clients log in at once while a probe keeps requesting an unrelated
+static file; reports login throughput and the probe's latency percentiles.
+Runs once with bcrypt in the password executor, as the app does, and once
+with bcrypt called on the event loop, as logins did before.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/wardrobe_bench \\
+        python benchmarks/login_storm.py --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "correct horse battery staple"
+
+# Seconds between two probe requests
+PROBE_INTERVAL = 0.01
+
+# Served without the database or password work, so its latency is the event loop's
+PROBE_PATH = "/static/css/style.css"
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class InlineHasher:
+    """bcrypt on the event loop, the way login_or_register hashed before the executor"""
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+
+    async def hash(self, password: str) -> str:
+        from app.services.passwords import hash_password
+        return hash_password(password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        from app.services.passwords import verify_password
+        return verify_password(plain_password, hashed_password)
+
+    def __getattr__(self, name):
+        return getattr(self.hasher, name)
+
+
+async def create_users(count: int):
+    from sqlalchemy import text
+    from app.database.connection import engine, init_db
+    from app.services.passwords import hash_password
+
+    await init_db()
+    # Every user shares one hash, only the logins are timed
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO users (username, password) "
+            "SELECT 'storm-' || g, :password FROM generate_series(1, :count) AS g "
+            "ON CONFLICT (username) DO UPDATE SET password = EXCLUDED.password"
+        ), {"password": hash_password(PASSWORD), "count": count})
+
+
+async def storm(client, login_count: int, concurrency: int, user_count: int) -> dict:
+    import app.main as main_module
+
+    latencies = []
+    peak_queue = 0
+    done = asyncio.Event()
+
+    async def probe():
+        nonlocal peak_queue
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await client.get(PROBE_PATH)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+            peak_queue = max(peak_queue, main_module.password_hasher.queue_depth)
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(number: int):
+        async with semaphore:
+            response = await client.post("/", data={
+                "username": f"storm-{number % user_count + 1}", "password": PASSWORD, "action": "login"
+            })
+            assert response.status_code == 303, response.status_code
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(login(number) for number in range(login_count)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    return {
+        "logins_per_second": login_count / elapsed,
+        "probes": len(latencies),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies),
+        "peak_queue": peak_queue,
+    }
+
+
+async def run(args):
+    import httpx
+    import app.main as main_module
+    from app.database.connection import engine
+
+    engine.echo = False
+    await create_users(args.users)
+
+    executor_hasher = main_module.password_hasher
+    modes = [("executor", executor_hasher), ("inline", InlineHasher(executor_hasher))]
+
+    transport = httpx.ASGITransport(app=main_module.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            for label, hasher in modes:
+                main_module.password_hasher = hasher
+                result = await storm(client, args.logins, args.concurrency, args.users)
+                print(
+                    f"  {label:<9} {result['logins_per_second']:7.1f} logins/s  "
+                    f"probe p50 {result['p50'] * 1000:7.1f} ms  p99 {result['p99'] * 1000:7.1f} ms  "
+                    f"max {result['max'] * 1000:7.1f} ms  ({result['probes']} probes, "
+                    f"peak queue {result['peak_queue']})"
+                )
+    finally:
+        main_module.password_hasher = executor_hasher
+        executor_hasher.shutdown()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200, help="logins in the storm")
+    parser.add_argument("--concurrency", type=int, default=50, help="logins in flight at once")
+    parser.add_argument("--users", type=int, default=100, help="distinct users logging in")
+    parser.add_argument("--database-url", default=os.getenv("TEST_DATABASE_URL"), help="disposable database")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("set TEST_DATABASE_URL or pass --database-url, storm-* users are written to it")
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app.config import config
+    print(f"{args.logins} logins, {args.concurrency} concurrent, {config.PASSWORD_WORKERS} password workers")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
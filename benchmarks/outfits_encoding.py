@@ -0,0 +1,112 @@
+"""
+Microbenchmark of outfits_list encoding for a user with many outfits.
+Compares the old hand-copied dicts encoded with the standard json module
+(as send_json did) against the serializers in app.services.serializers.
+
+    python benchmarks/outfits_encoding.py --outfits 1000 --items 8
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Only the serializers are imported, the app modules that need a database are not
+from app.services import serializers  # noqa: E402
+
+
+def build_outfits(outfit_count: int, items_per_outfit: int) -> list:
+    """Stand-ins with the attributes of OutfitRecord and CatalogItem"""
+    catalog = [
+        SimpleNamespace(
+            id=clothing_id,
+            name=f"Пальто из шерсти {clothing_id}",
+            price=19990.0,
+            color="Серо-голубой",
+            item_url=f"https://12storeez.com/catalog/verhnyaya-odezhda/womencollection/palto-{clothing_id}",
+            image_url=f"https://image.12storeez.com/images/800xP_90_out/uploads/images/{clothing_id}-1.jpg",
+            category="Верхняя одежда",
+        )
+        for clothing_id in range(1, 5001)
+    ]
+    return [
+        SimpleNamespace(
+            id=outfit_id,
+            user_id=1,
+            name=f"Образ {outfit_id}",
+            version=outfit_id,
+            clothes=[catalog[(outfit_id * 31 + position * 7) % len(catalog)] for position in range(items_per_outfit)],
+        )
+        for outfit_id in range(1, outfit_count + 1)
+    ]
+
+
+def encode_hand_copied(outfits) -> bytes:
+    """The per-handler conversion and send_json encoding used before the serializers"""
+    outfit_list = []
+    for outfit in outfits:
+        outfit_list.append({
+            "id": outfit.id,
+            "name": outfit.name,
+            "version": outfit.version,
+            "items": [
+                {
+                    "id": clothing.id,
+                    "name": clothing.name,
+                    "image_url": clothing.image_url,
+                    "category": clothing.category
+                }
+                for clothing in outfit.clothes
+            ]
+        })
+    return json.dumps({"type": "outfits_list", "version": 1, "outfits": outfit_list}).encode("utf-8")
+
+
+def encode_serializers_json(outfits) -> bytes:
+    """Compiled serializers with the standard json fallback of dumps"""
+    payload = {"type": "outfits_list", "version": 1, "outfits": serializers.outfits_to_dicts(outfits)}
+    return json.dumps(payload).encode("utf-8")
+
+
+def encode_serializers(outfits) -> bytes:
+    """What handle_get_outfits sends: compiled serializers and dumps"""
+    return serializers.dumps({"type": "outfits_list", "version": 1, "outfits": serializers.outfits_to_dicts(outfits)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--outfits", type=int, default=1000, help="outfits of the user")
+    parser.add_argument("--items", type=int, default=8, help="clothing items per outfit")
+    parser.add_argument("--repeat", type=int, default=7, help="timing rounds, the best one is reported")
+    args = parser.parse_args()
+
+    outfits = build_outfits(args.outfits, args.items)
+    candidates = [
+        ("hand-copied dicts + json", encode_hand_copied),
+        ("serializers + json", encode_serializers_json),
+    ]
+    if serializers.orjson is not None:
+        candidates.append(("serializers + orjson", encode_serializers))
+    else:
+        print("orjson is not installed, dumps falls back to json")
+
+    # The payloads must agree before their speed is compared
+    decoded = [json.loads(encode(outfits)) for _, encode in candidates]
+    assert all(payload == decoded[0] for payload in decoded), "Encoders produce different payloads"
+
+    print(f"outfits_list with {args.outfits} outfits of {args.items} items")
+    baseline = None
+    for label, encode in candidates:
+        timer = timeit.Timer(lambda: encode(outfits))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=args.repeat, number=number)) / number
+        baseline = baseline or best
+        size = len(encode(outfits))
+        print(f"  {label:<26} {best * 1000:8.2f} ms  {size / 1024:8.1f} KiB  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
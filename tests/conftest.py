@@ -0,0 +1,81 @@
+"""
+Tests against a real PostgreSQL database.
+They only run when TEST_DATABASE_URL names a database that may be wiped, e.g.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/wardrobe_test pytest tests
+
+Without it the test modules are not collected at all, since importing the
+app requires a database URL.
+"""
+import asyncio
+import os
+from contextlib import contextmanager
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+else:
+    collect_ignore_glob = ["test_*.py"]
+
+TABLES = "outfit_clothing, user_clothing, outfit_tombstones, outfits, clothing, users"
+
+
+@pytest.fixture(scope="session")
+def loop():
+    """One loop for the whole session, pooled asyncpg connections are bound to it"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    from app.database.connection import engine
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Run a coroutine to completion on the session loop"""
+    return loop.run_until_complete
+
+
+@pytest.fixture(scope="session")
+def database(run):
+    """Create the schema and empty every table"""
+    from sqlalchemy import text
+    from app.database.connection import engine, init_db
+
+    engine.echo = False
+
+    async def reset():
+        await init_db()
+        async with engine.begin() as conn:
+            await conn.execute(text(f"TRUNCATE {TABLES} RESTART IDENTITY CASCADE"))
+
+    run(reset())
+    return engine
+
+
+@pytest.fixture
+def capture_statements(database):
+    """Context manager collecting (statement, parameters) of everything executed on the engine"""
+    return lambda: _captured_statements(database)
+
+
+@contextmanager
+def _captured_statements(engine):
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,76 @@
+"""
+Filling every wardrobe commits batch by batch: the wardrobe version lock is
+free between batches and each user's version matches the rows it received.
+"""
+from sqlalchemy import text
+
+from app.crud import admin
+from app.crud.wardrobe import WARDROBE_VERSION_LOCK
+from app.database.connection import AsyncSessionLocal
+from app.services.catalog_cache import catalog_cache
+
+USER_COUNT = 20
+ITEMS_PER_USER = 5
+
+SEED_SQL = [
+    "TRUNCATE outfit_clothing, user_clothing, outfits, clothing, users RESTART IDENTITY CASCADE",
+    "INSERT INTO clothing (id, name, price, color, item_url, image_url, category) "
+    "SELECT g, 'Item ' || g, 100, 'black', 'https://example.com/item', 'https://example.com/image.jpg', 'tops' "
+    "FROM generate_series(1, 50) AS g",
+    f"INSERT INTO users (username, password) SELECT 'fill' || g, 'x' FROM generate_series(1, {USER_COUNT}) AS g",
+]
+
+
+def test_fill_all_commits_per_batch(run, database, monkeypatch):
+    # Four users per batch, every chunk of users spans several batches
+    monkeypatch.setattr(admin, "ASSIGN_BATCH_SIZE", 4 * ITEMS_PER_USER)
+    monkeypatch.setattr(admin, "ASSIGN_USER_CHUNK_SIZE", 10)
+
+    async def check():
+        async with database.begin() as conn:
+            for statement in SEED_SQL:
+                await conn.execute(text(statement))
+
+        # Seen from another connection before each batch takes its version
+        before_batches = []
+        next_wardrobe_version = admin.next_wardrobe_version
+
+        async def observed_next_wardrobe_version(db):
+            async with database.connect() as conn:
+                result = await conn.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": WARDROBE_VERSION_LOCK}
+                )
+                lock_free = result.scalar_one()
+                result = await conn.execute(text("SELECT count(*) FROM user_clothing"))
+                before_batches.append((lock_free, result.scalar_one()))
+                await conn.rollback()
+            return await next_wardrobe_version(db)
+
+        monkeypatch.setattr(admin, "next_wardrobe_version", observed_next_wardrobe_version)
+
+        async with AsyncSessionLocal() as db:
+            await catalog_cache.reload(db)
+            assigned, error = await admin.assign_random_clothes_to_all_users(db, ITEMS_PER_USER)
+        assert error is None and assigned == USER_COUNT * ITEMS_PER_USER
+
+        # The lock is free and earlier batches are committed when the next one starts
+        batch_rows = 4 * ITEMS_PER_USER
+        assert before_batches == [(True, batch * batch_rows) for batch in range(USER_COUNT // 4)]
+
+        async with database.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT users.wardrobe_version, max(user_clothing.version), count(DISTINCT user_clothing.version) "
+                "FROM users JOIN user_clothing ON user_clothing.user_id = users.id GROUP BY users.id"
+            ))
+            rows = result.all()
+            result = await conn.execute(text("SELECT count(DISTINCT version) FROM user_clothing"))
+            batch_versions = result.scalar_one()
+
+        assert len(rows) == USER_COUNT
+        assert all(wardrobe_version == row_version and versions == 1 for wardrobe_version, row_version, versions in rows)
+        assert batch_versions == USER_COUNT // 4
+
+        async with database.begin() as conn:
+            await conn.execute(text(SEED_SQL[0]))
+
+    run(check())
@@ -0,0 +1,48 @@
+"""
+Invalid access tokens on HTTP routes are treated as no token: pages redirect
+to the login form, API routes answer 401, and nothing is cached for them.
+"""
+import httpx
+import pytest
+from fastapi import status
+
+from app.main import app
+from app.services.auth_cache import token_cache
+from test_websocket_auth import INVALID_TOKENS
+
+API_PATHS = [
+    "/api/wardrobe",
+    "/api/wardrobe/page",
+    "/api/search?q=coat",
+    "/api/search/suggest?q=co",
+    "/api/facets",
+    "/admin/jobs",
+    "/admin/stats/token-cache",
+]
+
+
+async def get(path: str, token: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await client.get(path, cookies={"access_token": token})
+
+
+@pytest.mark.parametrize("kind", INVALID_TOKENS)
+def test_invalid_token_redirects_app_to_login(run, database, kind):
+    token_cache.clear()
+    misses = token_cache.misses
+    response = run(get("/app", INVALID_TOKENS[kind]))
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    assert response.headers["location"] == "/"
+    # The cache miss was followed by a failed decode, which must not be remembered
+    assert token_cache.misses == misses + 1
+    assert token_cache.stats()["size"] == 0
+
+
+@pytest.mark.parametrize("path", API_PATHS)
+@pytest.mark.parametrize("kind", INVALID_TOKENS)
+def test_invalid_token_is_unauthorized_on_api(run, database, kind, path):
+    token_cache.clear()
+    response = run(get(path, INVALID_TOKENS[kind]))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert token_cache.stats()["size"] == 0
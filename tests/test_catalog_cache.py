@@ -0,0 +1,59 @@
+"""
+The catalog snapshot only changes version on reload, and only when the rows did:
+read-through misses go to the overlay, so derived indexes are not rebuilt for them.
+"""
+from sqlalchemy import text
+
+from app.database.connection import AsyncSessionLocal
+from app.services.catalog_cache import CatalogCache
+
+INSERT_SQL = (
+    "INSERT INTO clothing (id, name, price, color, item_url, image_url, category) "
+    "VALUES (:id, :name, 100, 'black', 'https://example.com/item', 'https://example.com/image.jpg', 'tops')"
+)
+
+
+def test_misses_and_other_workers_changes(run, database):
+    async def check():
+        cache = CatalogCache(refresh_interval=0)
+        async with database.begin() as conn:
+            await conn.execute(text("TRUNCATE clothing CASCADE"))
+            await conn.execute(text(INSERT_SQL), [{"id": 1, "name": "Coat"}, {"id": 2, "name": "Shirt"}])
+
+        async with AsyncSessionLocal() as db:
+            snapshot = await cache.reload(db)
+            version = snapshot.version
+            assert len(snapshot) == 2
+
+            # Another worker imports an item: read through without a new snapshot
+            await db.execute(text(INSERT_SQL), {"id": 3, "name": "Scarf"})
+            await db.commit()
+            items, not_found = await cache.get_items(db, [3, 1, 99])
+            assert [item.name for item in items] == ["Scarf", "Coat"]
+            assert not_found == [99]
+            assert cache.snapshot is snapshot and cache.snapshot.version == version
+
+            # Nothing changed since the last reload except the overlaid item
+            await cache.reload(db)
+            assert cache.snapshot.version == version + 1
+            await cache.reload(db)
+            assert cache.snapshot.version == version + 1
+
+            # Another worker renames one item and deletes another
+            await db.execute(text("UPDATE clothing SET name = 'Long coat' WHERE id = 1"))
+            await db.execute(text("DELETE FROM clothing WHERE id = 2"))
+            await db.commit()
+            await cache.reload(db)
+            assert cache.snapshot.version == version + 2
+            items, not_found = await cache.get_items(db, [1, 2])
+            assert [item.name for item in items] == ["Long coat"]
+            assert not_found == [2]
+
+    async def clean_up():
+        async with database.begin() as conn:
+            await conn.execute(text("TRUNCATE clothing CASCADE"))
+
+    try:
+        run(check())
+    finally:
+        run(clean_up())
@@ -0,0 +1,128 @@
+"""
+Catalog import and sync against a small dump with duplicated and malformed entries.
+A duplicated ID takes the fields of its last entry, as json.load did, even
+when the first one was already written in an earlier batch.
+"""
+import gzip
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select, text
+
+from app.crud.clothes import file_fingerprint, import_clothes, sync_clothes
+from app.database.connection import AsyncSessionLocal
+from app.database.models import CatalogSource, Clothing
+from app.services.catalog_pipeline import normalize_chunks
+from app.services.catalog_reader import iter_chunks, read_catalog
+
+
+def entry(clothing_id: int, name: str) -> dict:
+    return {
+        "color": "Черный",
+        "image_url": f"https://example.com/images/{clothing_id}-1.jpg",
+        "item_url": f"https://example.com/catalog/obuv/item-{clothing_id}",
+        "name": name,
+        "price": "1 000 ₽",
+    }
+
+
+# (ID, entry) pairs in file order, 5 and 6 repeat after their first batch was written
+ENTRIES = [
+    ("5", entry(5, "Boots")),
+    ("6", entry(6, "Coat")),
+    ("7", entry(7, "Dress")),
+    ("bad", entry(0, "No ID")),
+    ("8", {"name": "No fields"}),
+    ("5", entry(5, "Ankle boots")),
+    ("6", entry(6, "Coat")),
+    ("5", entry(5, "Chelsea boots")),
+]
+
+
+def write_catalog(path, entries, compress=False):
+    body = "{" + ",".join(json.dumps(key) + ":" + json.dumps(value, ensure_ascii=False) for key, value in entries)
+    data = (body + "}\n").encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data) if compress else data)
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yield executor
+
+
+@pytest.fixture
+def empty_catalog(run, database):
+    async def truncate():
+        async with database.begin() as conn:
+            await conn.execute(text("TRUNCATE clothing, catalog_sources CASCADE"))
+
+    run(truncate())
+    yield
+    run(truncate())
+
+
+def chunks(path, executor, digest=None):
+    # One entry per chunk and per batch, so every repeat lands after its first row was written
+    return normalize_chunks(iter_chunks(read_catalog(path, digest=digest), 1), executor)
+
+
+async def names():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Clothing.id, Clothing.name).order_by(Clothing.id))
+        return dict(result.all())
+
+
+def test_import_keeps_last_duplicate(run, empty_catalog, executor, tmp_path):
+    path = tmp_path / "raw.txt"
+    write_catalog(path, ENTRIES)
+
+    async def check():
+        async with AsyncSessionLocal() as db:
+            stats = await import_clothes(db, chunks(path, executor), batch_size=1)
+        assert (stats.imported, stats.duplicates, stats.malformed, stats.existing) == (3, 3, 2, 0)
+        assert stats.processed == len(ENTRIES)
+        assert await names() == {5: "Chelsea boots", 6: "Coat", 7: "Dress"}
+
+        async with AsyncSessionLocal() as db:
+            stats = await import_clothes(db, chunks(path, executor), batch_size=1)
+        assert (stats.imported, stats.existing, stats.duplicates) == (0, 3, 3)
+
+    run(check())
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_sync_keeps_last_duplicate_and_hashes_while_parsing(run, empty_catalog, executor, tmp_path, compress):
+    path = tmp_path / "raw.txt"
+    expected_checksum = write_catalog(path, ENTRIES, compress)
+
+    async def sync():
+        async with AsyncSessionLocal() as db:
+            digest = hashlib.sha256()
+            return await sync_clothes(
+                db, chunks(path, executor, digest), str(path), file_fingerprint(path), digest, batch_size=1
+            )
+
+    async def check():
+        stats = await sync()
+        assert (stats.imported, stats.updated, stats.duplicates, stats.malformed) == (3, 0, 3, 2)
+        assert await names() == {5: "Chelsea boots", 6: "Coat", 7: "Dress"}
+        async with AsyncSessionLocal() as db:
+            source = await db.get(CatalogSource, str(path))
+            assert source.checksum == expected_checksum
+
+        # The same file again is skipped without reading it
+        stats = await sync()
+        assert stats.source_unchanged and stats.processed == 0
+
+        # Unchanged first, then changed by a later duplicate: an update, not an unchanged item
+        write_catalog(path, [("5", entry(5, "Chelsea boots")), ("6", entry(6, "Coat")), ("6", entry(6, "Trench"))])
+        stats = await sync()
+        assert (stats.updated, stats.unchanged, stats.deleted, stats.duplicates) == (1, 1, 1, 1)
+        assert await names() == {5: "Chelsea boots", 6: "Trench"}
+
+    run(check())
@@ -0,0 +1,115 @@
+"""
+Outfit writes lock the user row before the outfit row, and expired tombstones
+are pruned so that only clients that synced before them reload everything.
+"""
+import re
+
+import pytest
+from sqlalchemy import text
+
+from app.crud.outfits import (
+    create_outfit, update_outfit, add_outfit_items, remove_outfit_items, delete_outfit,
+    get_user_outfits_since, prune_outfit_tombstones
+)
+from app.database.connection import AsyncSessionLocal
+from app.main import handle_get_outfits
+from app.schemas.clothes import OutfitCreate
+from app.services.catalog_cache import catalog_cache
+
+RESET_SQL = "TRUNCATE outfit_clothing, outfit_tombstones, outfits, clothing, users RESTART IDENTITY CASCADE"
+
+CLOTHING_SQL = (
+    "INSERT INTO clothing (id, name, price, color, item_url, image_url, category) "
+    "SELECT g, 'Item ' || g, 100, 'black', 'https://example.com/item', 'https://example.com/image.jpg', 'tops' "
+    "FROM generate_series(1, 5) AS g"
+)
+
+
+@pytest.fixture
+def user_id(run, database):
+    async def seed():
+        async with database.begin() as conn:
+            await conn.execute(text(RESET_SQL))
+            await conn.execute(text(CLOTHING_SQL))
+            result = await conn.execute(text("INSERT INTO users (username, password) VALUES ('outfits', 'x') RETURNING id"))
+            return result.scalar_one()
+
+    async def clean_up():
+        async with database.begin() as conn:
+            await conn.execute(text(RESET_SQL))
+
+    user_id = run(seed())
+    yield user_id
+    run(clean_up())
+
+
+def lock_order(statements) -> list:
+    """Tables in the order a write first locks one of their rows"""
+    tables = []
+    for statement, _ in statements:
+        if re.match(r"\s*UPDATE users\b", statement):
+            table = "users"
+        elif re.match(r"\s*SELECT\b.*\sFROM outfits\b.*\sFOR UPDATE", statement, re.S):
+            table = "outfits"
+        else:
+            continue
+        if table not in tables:
+            tables.append(table)
+    return tables
+
+
+def test_writes_lock_user_before_outfit(run, user_id, capture_statements):
+    async def check():
+        async with AsyncSessionLocal() as db:
+            await catalog_cache.reload(db)
+            outfit = await create_outfit(db, OutfitCreate(name="Look", clothing_ids=[1, 2]), user_id)
+
+            writes = [
+                lambda: update_outfit(db, outfit.id, user_id, OutfitCreate(name="Look", clothing_ids=[1, 2, 3])),
+                lambda: add_outfit_items(db, outfit.id, user_id, [4]),
+                lambda: remove_outfit_items(db, outfit.id, user_id, [1]),
+                lambda: delete_outfit(db, outfit.id, user_id),
+            ]
+            for write in writes:
+                with capture_statements() as statements:
+                    await write()
+                assert lock_order(statements) == ["users", "outfits"]
+
+    run(check())
+
+
+def test_expired_tombstones_force_a_full_reload(run, user_id):
+    async def check():
+        async with AsyncSessionLocal() as db:
+            await catalog_cache.reload(db)
+            first = await create_outfit(db, OutfitCreate(name="First", clothing_ids=[1]), user_id)
+            second = await create_outfit(db, OutfitCreate(name="Second", clothing_ids=[2]), user_id)
+            kept = await create_outfit(db, OutfitCreate(name="Kept", clothing_ids=[3]), user_id)
+
+            await delete_outfit(db, first.id, user_id)
+            synced_version = kept.version + 1
+            await db.execute(text("UPDATE outfit_tombstones SET created_at = now() - interval '400 days'"))
+            await db.commit()
+
+            # Deleting again prunes the expired tombstone of that user
+            await delete_outfit(db, second.id, user_id)
+            result = await db.execute(text("SELECT outfit_id FROM outfit_tombstones"))
+            assert list(result.scalars()) == [second.id]
+
+            # A client that saw the pruned deletion still gets a delta
+            outfits, deleted_ids, _ = await get_user_outfits_since(db, user_id, synced_version)
+            assert (outfits, deleted_ids) == ([], [second.id])
+
+            # One that synced before it cannot learn about it and gets every outfit
+            assert await get_user_outfits_since(db, user_id, kept.version) is None
+            reply = await handle_get_outfits(db, user_id, {"since_version": kept.version})
+            assert reply["type"] == "outfits_list"
+            assert [outfit["id"] for outfit in reply["outfits"]] == [kept.id]
+
+            # The startup pass prunes every user
+            await db.execute(text("UPDATE outfit_tombstones SET created_at = now() - interval '400 days'"))
+            await prune_outfit_tombstones(db)
+            await db.commit()
+            assert await get_user_outfits_since(db, user_id, synced_version) is None
+
+    run(check())
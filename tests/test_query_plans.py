@@ -0,0 +1,185 @@
+"""
+Query-plan regression test for the per-user CRUD queries.
+Every statement a CRUD function runs against a seeded database is EXPLAINed,
+a sequential scan of a table holding more than SEQ_SCAN_THRESHOLD rows fails
+the test: it means a query lost the index it relies on.
+"""
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.crud.admin import get_users_with_stats, insert_ownerships
+from app.crud.clothes import bulk_delete_clothes
+from app.crud.outfits import (
+    create_outfit, update_outfit, add_outfit_items, remove_outfit_items, delete_outfit,
+    get_user_outfits, get_user_outfits_since, get_outfits_version
+)
+from app.crud.wardrobe import (
+    get_wardrobe_versions, get_wardrobe_changes, get_wardrobe_page, next_wardrobe_version, touch_wardrobes
+)
+from app.database.connection import AsyncSessionLocal
+from app.schemas.clothes import OutfitCreate
+
+# Largest table a query may read sequentially
+SEQ_SCAN_THRESHOLD = 1000
+
+CLOTHING_COUNT = 50000
+USER_COUNT = 2000
+OWNED_PER_USER = 25
+OUTFITS_PER_USER = 10
+ITEMS_PER_OUTFIT = 3
+TOMBSTONES_PER_USER = 2
+
+# The user the queries run for, in the middle of every table
+USER_ID = USER_COUNT // 2
+
+SEED_SQL = [
+    f"INSERT INTO clothing (name, price, color, item_url, image_url, category) "
+    f"SELECT 'Item ' || g, g % 5000, (ARRAY['red', 'blue', 'black', 'white'])[g % 4 + 1], "
+    f"'https://example.com/item/' || g, 'https://example.com/image/' || g || '.jpg', "
+    f"(ARRAY['tops', 'bottoms', 'shoes', 'accessories'])[g % 4 + 1] "
+    f"FROM generate_series(1, {CLOTHING_COUNT}) AS g",
+
+    f"INSERT INTO users (username, password, wardrobe_version, outfit_version) "
+    f"SELECT 'user' || g, 'x', {OWNED_PER_USER}, {OUTFITS_PER_USER + TOMBSTONES_PER_USER} "
+    f"FROM generate_series(1, {USER_COUNT}) AS g",
+
+    # Items owned by a user are spread over the whole catalog
+    f"INSERT INTO user_clothing (user_id, clothing_id, version) "
+    f"SELECT u, (u * 7919 + i * 1999) % {CLOTHING_COUNT} + 1, i "
+    f"FROM generate_series(1, {USER_COUNT}) AS u, generate_series(1, {OWNED_PER_USER}) AS i "
+    f"ON CONFLICT DO NOTHING",
+
+    f"INSERT INTO outfits (user_id, name, version) "
+    f"SELECT u, 'Outfit ' || i, i "
+    f"FROM generate_series(1, {USER_COUNT}) AS u, generate_series(1, {OUTFITS_PER_USER}) AS i",
+
+    f"INSERT INTO outfit_clothing (outfit_id, clothing_id) "
+    f"SELECT DISTINCT outfits.id, user_clothing.clothing_id FROM outfits "
+    f"CROSS JOIN LATERAL (SELECT clothing_id FROM user_clothing WHERE user_clothing.user_id = outfits.user_id "
+    f"ORDER BY clothing_id OFFSET outfits.version LIMIT {ITEMS_PER_OUTFIT}) AS user_clothing",
+
+    f"INSERT INTO outfit_tombstones (outfit_id, user_id, version) "
+    f"SELECT {USER_COUNT * OUTFITS_PER_USER} + (u - 1) * {TOMBSTONES_PER_USER} + i, u, {OUTFITS_PER_USER} + i "
+    f"FROM generate_series(1, {USER_COUNT}) AS u, generate_series(1, {TOMBSTONES_PER_USER}) AS i",
+
+    "SELECT setval(pg_get_serial_sequence('outfits', 'id'), "
+    f"{USER_COUNT * (OUTFITS_PER_USER + TOMBSTONES_PER_USER)})",
+]
+
+
+@pytest.fixture(scope="module")
+def seeded(run, database):
+    async def seed():
+        async with database.begin() as conn:
+            for statement in SEED_SQL:
+                await conn.execute(text(statement))
+        # Plans depend on the statistics, not on the rows just written
+        async with database.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE"))
+
+    run(seed())
+    return database
+
+
+async def owned_ids(db, count: int = 5):
+    result = await db.execute(
+        text("SELECT clothing_id FROM user_clothing WHERE user_id = :user_id ORDER BY clothing_id LIMIT :count"),
+        {"user_id": USER_ID, "count": count}
+    )
+    return list(result.scalars())
+
+
+async def first_outfit_id(db):
+    result = await db.execute(text("SELECT min(id) FROM outfits WHERE user_id = :user_id"), {"user_id": USER_ID})
+    return result.scalar_one()
+
+
+async def load_outfits(db):
+    await get_user_outfits(db, USER_ID)
+    await get_outfits_version(db, USER_ID)
+    await get_user_outfits_since(db, USER_ID, OUTFITS_PER_USER // 2)
+
+
+async def load_wardrobe(db):
+    versions = await get_wardrobe_versions(db, USER_ID)
+    await get_wardrobe_changes(db, USER_ID, None, versions)
+    await get_wardrobe_changes(db, USER_ID, OWNED_PER_USER // 2, versions)
+    _, after_id = await get_wardrobe_page(db, USER_ID, limit=10)
+    await get_wardrobe_page(db, USER_ID, after_id, limit=10)
+
+
+async def list_users(db):
+    _, after_id = await get_users_with_stats(db)
+    await get_users_with_stats(db, after_id)
+    await get_users_with_stats(db, search="user12")
+
+
+async def edit_outfits(db):
+    clothing_ids = await owned_ids(db)
+    outfit_id = await first_outfit_id(db)
+    await create_outfit(db, OutfitCreate(name="New", clothing_ids=clothing_ids[:2]), USER_ID, commit=False)
+    await update_outfit(db, outfit_id, USER_ID, OutfitCreate(name="Renamed", clothing_ids=clothing_ids[:3]), commit=False)
+    await add_outfit_items(db, outfit_id, USER_ID, clothing_ids[3:], commit=False)
+    await remove_outfit_items(db, outfit_id, USER_ID, clothing_ids[:1], commit=False)
+    await delete_outfit(db, outfit_id, USER_ID, commit=False)
+
+
+async def edit_wardrobes(db):
+    version = await next_wardrobe_version(db)
+    await insert_ownerships(db, version, [USER_ID, USER_ID + 1], [1, 2])
+    await touch_wardrobes(db, version, [USER_ID, USER_ID + 1])
+
+
+async def delete_clothes(db):
+    await bulk_delete_clothes(db, await owned_ids(db, 3))
+
+
+SCENARIOS = {
+    "load_outfits": load_outfits,
+    "load_wardrobe": load_wardrobe,
+    "list_users": list_users,
+    "edit_outfits": edit_outfits,
+    "edit_wardrobes": edit_wardrobes,
+    "delete_clothes": delete_clothes,
+}
+
+
+def seq_scans(plan: dict):
+    """Relation names of every sequential scan in a JSON plan tree"""
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_no_large_sequential_scans(run, seeded, capture_statements, scenario):
+    async def check():
+        # The writes are rolled back, only their statements are kept
+        with capture_statements() as statements:
+            async with AsyncSessionLocal() as db:
+                await SCENARIOS[scenario](db)
+                await db.rollback()
+        assert statements
+
+        failures = []
+        async with seeded.connect() as conn:
+            result = await conn.execute(text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"))
+            table_rows = dict(result.all())
+
+            for statement, parameters in statements:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = result.scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                for relation in seq_scans(plan[0]["Plan"]):
+                    if table_rows.get(relation, 0) > SEQ_SCAN_THRESHOLD:
+                        failures.append(f"Seq Scan on {relation} ({table_rows[relation]:.0f} rows):\n{statement}")
+            await conn.rollback()
+        return failures
+
+    failures = run(check())
+    assert not failures, "\n\n".join(failures)
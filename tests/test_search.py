@@ -0,0 +1,73 @@
+"""
+Search results do not depend on which ID sets were precomputed with the index,
+and cold catalog-wide queries run off the event loop.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services import search
+from app.services.catalog_cache import CatalogItem, CatalogSnapshot
+
+WORDS = ["пальто", "платье", "шерсть", "хлопок", "миди", "макси"]
+QUERIES = ["п", "пл", "шерст пал", "миди ", "черн", "нет такого"]
+
+
+def build_snapshot(count: int = 3000) -> CatalogSnapshot:
+    items = {
+        clothing_id: CatalogItem(
+            clothing_id,
+            f"{WORDS[clothing_id % 6]} {WORDS[clothing_id % 5]} {clothing_id}",
+            100.0,
+            "Черный" if clothing_id % 3 else "Белый",
+            None, "", None
+        )
+        for clothing_id in range(1, count + 1)
+    }
+    return CatalogSnapshot(items, 1)
+
+
+def test_precomputed_sets_do_not_change_results(monkeypatch):
+    snapshot = build_snapshot()
+    monkeypatch.setattr(search, "PRECOMPUTED_SETS", 0)
+    plain = search.SearchIndex(snapshot)
+    monkeypatch.setattr(search, "PRECOMPUTED_SETS", 64)
+    monkeypatch.setattr(search, "PRECOMPUTED_SET_MIN_LENGTH", 100)
+    precomputed = search.SearchIndex(snapshot)
+    assert precomputed.id_sets and not plain.id_sets
+
+    within = set(range(1, 3001, 7))
+    for query in QUERIES:
+        assert precomputed.search(query, 0, 50) == plain.search(query, 0, 50)
+        assert precomputed.search(query, 0, 50, within) == plain.search(query, 0, 50, within)
+        assert precomputed.matching_ids(query, within) == plain.matching_ids(query, within)
+
+
+@pytest.mark.parametrize("query", ["пл", "шерст пал"])
+def test_cold_catalog_query_runs_off_the_event_loop(monkeypatch, query):
+    index = search.SearchIndex(build_snapshot())
+    catalog_search = search.CatalogSearch()
+
+    async def get_index():
+        return index
+
+    monkeypatch.setattr(catalog_search, "get_index", get_index)
+
+    threads = []
+    ranked = index.ranked
+
+    def record_thread(query):
+        threads.append(threading.current_thread())
+        return ranked(query)
+
+    monkeypatch.setattr(index, "ranked", record_thread)
+
+    async def run_search():
+        await catalog_search.search(query)
+        await catalog_search.search(query)
+
+    asyncio.run(run_search())
+    # The cold query ran in a worker, the repeat was served from the cache on the loop
+    assert threads[0] is not threading.main_thread()
+    assert threads[1] is threading.main_thread()
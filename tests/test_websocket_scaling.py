@@ -0,0 +1,89 @@
+"""
+Scaling test for the outfits WebSocket.
+Thousands of clients connect, each handles one message and then stays idle.
+Database connections are only checked out while a message is handled, so
+all of them fit on the default pool of 10 connections plus 10 overflow.
+The clients talk to the ASGI app directly, no server or network is involved.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import event, text
+
+from app.config import config
+from app.main import create_access_token
+from app.services.outfit_hub import outfit_hub
+from websocket_client import ASGIWebSocketClient
+
+CLIENT_COUNT = int(os.getenv("WS_SCALING_CLIENTS", "2000"))
+
+# Clients share users the way several tabs of one user do
+USER_COUNT = 200
+
+# Seconds every phase of the test may take
+PHASE_TIMEOUT = 120
+
+
+@pytest.fixture(scope="module")
+def tokens(run, database):
+    async def create_users():
+        async with database.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO users (username, password) "
+                "SELECT 'ws-client-' || g, 'x' FROM generate_series(1, :count) AS g "
+                "ON CONFLICT (username) DO NOTHING"
+            ), {"count": USER_COUNT})
+            result = await conn.execute(text("SELECT username FROM users WHERE username LIKE 'ws-client-%'"))
+            return [create_access_token({"sub": username}) for username in result.scalars()]
+
+    return run(create_users())
+
+
+def test_idle_clients_hold_no_connections(run, database, tokens):
+    pool_limit = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+    assert 10 <= pool_limit <= 20
+
+    checked_out = 0
+    peak = 0
+
+    def on_checkout(*args):
+        nonlocal checked_out, peak
+        checked_out += 1
+        peak = max(peak, checked_out)
+
+    def on_checkin(*args):
+        nonlocal checked_out
+        checked_out -= 1
+
+    async def scenario():
+        clients = [
+            ASGIWebSocketClient("/ws/outfits", tokens[number % len(tokens)], number)
+            for number in range(CLIENT_COUNT)
+        ]
+        await asyncio.wait_for(asyncio.gather(*(client.connect() for client in clients)), PHASE_TIMEOUT)
+
+        # Every client handles one message, all at once
+        for client in clients:
+            await client.send_json({"type": "get_outfits"})
+        replies = await asyncio.wait_for(
+            asyncio.gather(*(client.receive_json() for client in clients)), PHASE_TIMEOUT
+        )
+        assert all(reply["type"] == "outfits_list" for reply in replies)
+
+        # All clients are connected and idle, none of them holds a connection
+        assert outfit_hub.subscriber_count() >= CLIENT_COUNT
+        assert database.pool.checkedout() == 0
+
+        await asyncio.wait_for(asyncio.gather(*(client.close() for client in clients)), PHASE_TIMEOUT)
+        assert outfit_hub.subscriber_count() == 0
+
+    event.listen(database.sync_engine, "checkout", on_checkout)
+    event.listen(database.sync_engine, "checkin", on_checkin)
+    try:
+        run(scenario())
+    finally:
+        event.remove(database.sync_engine, "checkout", on_checkout)
+        event.remove(database.sync_engine, "checkin", on_checkin)
+
+    assert 0 < peak <= pool_limit
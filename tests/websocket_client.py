@@ -0,0 +1,63 @@
+"""In-memory WebSocket client for tests that drive the ASGI app directly"""
+import asyncio
+import json
+
+
+class ASGIWebSocketClient:
+    """Minimal WebSocket client driving the ASGI app through in-memory queues"""
+
+    def __init__(self, path: str, token: str, number: int = 0):
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver"), (b"cookie", f"access_token={token}".encode())],
+            "client": ("127.0.0.1", 10000 + number),
+            "server": ("testserver", 80),
+            "subprotocols": [],
+        }
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        self.task = None
+
+    async def next_message(self) -> dict:
+        """Next message from the app, raising the app's exception if it crashed instead"""
+        receive = asyncio.ensure_future(self.from_app.get())
+        await asyncio.wait({receive, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if receive.done():
+            return receive.result()
+        receive.cancel()
+        self.task.result()
+        raise AssertionError("The app returned without sending a message")
+
+    async def connect(self):
+        """Open the connection, failing unless the app accepts it"""
+        from app.main import app
+
+        self.task = asyncio.create_task(app(self.scope, self.to_app.get, self.from_app.put))
+        await self.to_app.put({"type": "websocket.connect"})
+        message = await self.next_message()
+        assert message["type"] == "websocket.accept", message
+
+    async def receive_close(self) -> int:
+        """Code of the close frame the app sends next"""
+        message = await self.next_message()
+        assert message["type"] == "websocket.close", message
+        await self.task
+        return message.get("code", 1000)
+
+    async def send_json(self, data: dict):
+        await self.to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self) -> dict:
+        message = await self.next_message()
+        assert message["type"] == "websocket.send", message
+        return json.loads(message.get("text") or message["bytes"])
+
+    async def close(self):
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task